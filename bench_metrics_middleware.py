@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del coste por petición del middleware de métricas.
+
+Compara el registro anterior (lock global + defaultdicts + sketch) con el
+registro por thread de metrics_registry (sin lock al escribir), y mide el
+middleware collect_api_metrics completo con una petición y un call_next
+simulados (sin servidor ni event loop). También mide el registro con
+varios threads escribiendo a la vez.
+
+Uso: python bench_metrics_middleware.py
+"""
+
+import os
+import sys
+import threading
+import time
+import timeit
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault("FORCE_LOCAL_DIRECTORY", "true")
+
+from latency_sketch import LatencySketch  # noqa: E402
+from metrics_registry import MetricsRegistry  # noqa: E402
+import main  # noqa: E402
+
+PATH = "/api/query"
+THREADS = 8
+
+
+class LockedMetrics:
+    """Implementación anterior: todo bajo un único lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_counts = defaultdict(int)
+        self.error_counts = defaultdict(int)
+        self.latency_sketches = defaultdict(LatencySketch)
+
+    def record(self, path, status_code, elapsed_ms):
+        with self.lock:
+            self.request_counts[path] += 1
+            if status_code >= 400:
+                self.error_counts[path] += 1
+            self.latency_sketches[path].add(elapsed_ms)
+
+
+class RegistryMetrics:
+    """Implementación actual: shards por thread."""
+
+    def __init__(self):
+        registry = MetricsRegistry()
+        self.requests = registry.counter("api_requests")
+        self.errors = registry.counter("api_errors")
+        self.latency = registry.histogram("api_latency_ms")
+
+    def record(self, path, status_code, elapsed_ms):
+        self.requests.inc(path)
+        if status_code >= 400:
+            self.errors.inc(path)
+        self.latency.observe(path, elapsed_ms)
+
+
+def run_middleware(request, call_next):
+    """Ejecuta la corrutina del middleware hasta el final sin event loop."""
+    coroutine = main.collect_api_metrics(request, call_next)
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+
+def threaded(metrics, per_thread):
+    def work():
+        for i in range(per_thread):
+            metrics.record(PATH, 200, 12.5 + i % 50)
+
+    threads = [threading.Thread(target=work) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main_bench():
+    number = 200000
+
+    print(f"{'registro':<28}{'por petición':>14}")
+    print("-" * 42)
+    for label, metrics in (("lock global (antes)", LockedMetrics()),
+                           ("shards por thread", RegistryMetrics())):
+        elapsed = timeit.timeit(lambda: metrics.record(PATH, 200, 12.5),
+                                number=number)
+        print(f"{label:<28}{elapsed / number * 1e6:>12.2f}µs")
+
+    response = SimpleNamespace(status_code=200)
+    request = SimpleNamespace(url=SimpleNamespace(path=PATH))
+
+    async def call_next(_request):
+        return response
+
+    elapsed = timeit.timeit(lambda: run_middleware(request, call_next),
+                            number=number)
+    print(f"{'collect_api_metrics':<28}{elapsed / number * 1e6:>12.2f}µs")
+
+    per_thread = 50000
+    print(f"\n{THREADS} threads x {per_thread} peticiones")
+    for label, metrics in (("lock global (antes)", LockedMetrics()),
+                           ("shards por thread", RegistryMetrics())):
+        elapsed = threaded(metrics, per_thread)
+        per_request = elapsed / (THREADS * per_thread) * 1e6
+        print(f"{label:<28}{per_request:>12.2f}µs")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de bots.utils.normalize.
+
+Compara la implementación original (NFKD + filtro carácter a carácter)
+con la actual (atajo ASCII, tabla str.translate y caché LRU).
+
+Uso: python bench_normalize.py
+"""
+
+import sys
+import timeit
+import unicodedata
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bots.utils import normalize  # noqa: E402
+
+
+def normalize_original(s):
+    if not s:
+        return ""
+    s = str(s).strip()
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    return s.lower()
+
+
+CASES = {
+    "pregunta ASCII": "I need a lawyer to renew my residency permit in Barcelona",
+    "pregunta con acentos": "¿Dónde puedo encontrar un médico de cabecera en Gràcia?",
+    "palabra clave": "educación",
+    "texto anunciante (largo)": (
+        "Clínica Dental Sonrisa Odontología integral, ortodoncia invisible e "
+        "implantes en el Eixample. Atención en español, català y English. "
+    ) * 3,
+}
+
+
+def main():
+    number = 20000
+    print(f"{'caso':<28}{'original':>12}{'actual':>12}{'speedup':>10}")
+    print("-" * 62)
+    for name, text in CASES.items():
+        assert normalize(text) == normalize_original(text)
+        before = timeit.timeit(lambda: normalize_original(text), number=number)
+        after = timeit.timeit(lambda: normalize(text), number=number)
+        print(
+            f"{name:<28}{before / number * 1e6:>10.2f}µs{after / number * 1e6:>10.2f}µs"
+            f"{before / after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
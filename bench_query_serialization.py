@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de la respuesta de /api/query.
+
+Compara el camino por defecto de FastAPI (jsonable_encoder + JSONResponse,
+json de la librería estándar) con QueryJSONResponse (orjson + fragmentos
+pre-codificados de anunciantes, guías y tips).
+
+Uso: python bench_query_serialization.py
+"""
+
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault("FORCE_LOCAL_DIRECTORY", "true")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from bots.json_fragments import ORJSON_AVAILABLE  # noqa: E402
+from bots.orchestrator import Orchestrator  # noqa: E402
+from main import QueryJSONResponse  # noqa: E402
+
+QUESTIONS = [
+    ("Busco un apartamento en Gràcia", "es"),
+    ("Necesito un dentista que hable inglés", "es"),
+    ("I need a lawyer for my residency permit", "en"),
+    ("Colegio internacional para mis hijos", "es"),
+]
+
+
+def fastapi_default(payload):
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def fragments(payload):
+    return QueryJSONResponse(payload).body
+
+
+def main():
+    orchestrator = Orchestrator()
+    number = 2000
+    print(f"orjson disponible: {ORJSON_AVAILABLE}")
+    print(f"{'pregunta':<42}{'bytes':>7}{'antes':>11}{'después':>11}{'speedup':>9}")
+    print("-" * 80)
+    for question, language in QUESTIONS:
+        payload = orchestrator.process_query(question, language, limit=10)
+        assert json.loads(fragments(payload)) == json.loads(fastapi_default(payload))
+
+        before = timeit.timeit(lambda: fastapi_default(payload), number=number)
+        after = timeit.timeit(lambda: fragments(payload), number=number)
+        print(
+            f"{question[:40]:<42}{len(fragments(payload)):>7}"
+            f"{before / number * 1e6:>9.1f}µs{after / number * 1e6:>9.1f}µs"
+            f"{before / after:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
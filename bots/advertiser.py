@@ -0,0 +1,164 @@
+# bots/advertiser.py
+"""
+Registro compacto de anunciante.
+
+Los anunciantes llegan del directorio (API) o de anunciantes.json con
+claves mezcladas en español e inglés (nombre/title, descripcion/description,
+contacto/contact...). Advertiser normaliza esas claves una sola vez al
+cargar, guarda los campos conocidos en __slots__ y cachea su representación
+dict/JSON (EncodedDict) para no reconstruirla en cada respuesta.
+
+Se comporta como un Mapping de solo lectura (``.get``, ``in``, ``dict(a)``),
+así que el resto del pipeline puede seguir tratándolo como un dict. La
+igualdad y el hash son por contenido: dos anunciantes con los mismos
+campos se deduplican en un ``set`` o ``dict.fromkeys``.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+from .json_fragments import EncodedDict
+
+# Campo canónico -> claves aceptadas en los datos de origen (por prioridad)
+FIELD_ALIASES = {
+    "nombre": ("nombre", "title", "name"),
+    "descripcion": ("descripcion", "descripcion_corta", "description"),
+    "beneficios": ("beneficios", "benefits"),
+    "precio": ("precio", "price"),
+    "contacto": ("contacto", "contact"),
+    "idiomas": ("idiomas", "languages"),
+    "ubicacion": ("ubicacion", "location"),
+    "faq": ("faq", "faqs"),
+}
+
+_CANONICAL_BY_KEY = {
+    alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases
+}
+_ALL_ALIASES = frozenset(_CANONICAL_BY_KEY)
+
+_MISSING = object()
+
+
+class Advertiser(Mapping):
+    """Anunciante inmutable con claves normalizadas."""
+
+    __slots__ = tuple(FIELD_ALIASES) + ("extra", "_dict", "_hash")
+
+    def __init__(self, fields: Dict[str, Any], extra: Optional[Dict[str, Any]] = None):
+        for field in FIELD_ALIASES:
+            object.__setattr__(self, field, fields.get(field, _MISSING))
+        object.__setattr__(self, "extra", extra or {})
+        object.__setattr__(self, "_dict", None)
+        object.__setattr__(self, "_hash", None)
+
+    @classmethod
+    def from_raw(cls, raw: Any) -> "Advertiser":
+        """Crea el registro a partir de un dict de origen (o devuelve el mismo Advertiser)."""
+        if isinstance(raw, Advertiser):
+            return raw
+
+        fields = {}
+        for field, aliases in FIELD_ALIASES.items():
+            # Igual que antes en make_standard_response: primer valor no vacío
+            value = _MISSING
+            for alias in aliases:
+                if alias in raw:
+                    candidate = raw[alias]
+                    if candidate:
+                        value = candidate
+                        break
+                    if value is _MISSING:
+                        value = candidate
+            if value is not _MISSING:
+                fields[field] = value
+
+        extra = {k: v for k, v in raw.items() if k not in _ALL_ALIASES}
+        return cls(fields, extra)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Advertiser es inmutable; usa with_flags()")
+
+    # --- Interfaz Mapping ---
+
+    def __getitem__(self, key: str) -> Any:
+        field = _CANONICAL_BY_KEY.get(key)
+        if field is not None:
+            value = getattr(self, field)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Mismo contenido que compara __eq__ (inmutable: se calcula una vez)
+        cached = self._hash
+        if cached is None:
+            cached = hash(_freeze(self.to_dict()))
+            object.__setattr__(self, "_hash", cached)
+        return cached
+
+    def __repr__(self) -> str:
+        return f"Advertiser({self.to_dict()!r})"
+
+    # --- Copias y serialización ---
+
+    def with_flags(self, **flags) -> "Advertiser":
+        """Copia con campos extra añadidos (p.ej. es_anunciante=True)."""
+        fields = {f: getattr(self, f) for f in FIELD_ALIASES if getattr(self, f) is not _MISSING}
+        return Advertiser(fields, {**self.extra, **flags})
+
+    def to_dict(self) -> EncodedDict:
+        """Dict (cacheado, de solo lectura) con las claves canónicas."""
+        cached = self._dict
+        if cached is None:
+            fields = {}
+            for field in FIELD_ALIASES:
+                value = getattr(self, field)
+                if value is not _MISSING:
+                    fields[field] = value
+            fields.update(self.extra)
+            cached = EncodedDict(fields)
+            object.__setattr__(self, "_dict", cached)
+        return cached
+
+    def to_json(self) -> str:
+        """JSON del anunciante, codificado una sola vez."""
+        return self.to_dict().encoded.decode("utf-8")
+
+
+def _freeze(value: Any) -> Any:
+    """Versión hashable de un valor JSON (listas -> tuplas, dicts -> frozenset)."""
+    if isinstance(value, Mapping):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def with_flags(advertiser: Mapping, **flags) -> Mapping:
+    """Copia de un anunciante (Advertiser o dict) con campos añadidos."""
+    if isinstance(advertiser, Advertiser):
+        return advertiser.with_flags(**flags)
+    return dict(advertiser, **flags)
+
+
+def to_plain(advertiser: Any) -> Any:
+    """Representación serializable (dict) de un anunciante."""
+    if isinstance(advertiser, Advertiser):
+        return advertiser.to_dict()
+    return advertiser
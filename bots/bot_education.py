@@ -1,5 +1,6 @@
 # bots/bot_education.py
 from .utils import filter_advertisers_by_keywords, build_key_points
+from .advertiser import with_flags
 from .maps_integration import search_healthcare_barcelona
 
 def responder_consulta(pregunta, anunciantes, language="en"):
@@ -18,9 +19,8 @@ def responder_consulta(pregunta, anunciantes, language="en"):
     # 1. PRIMERO: Filtrar anunciantes pagos
     selected_advertisers = filter_advertisers_by_keywords(pregunta, anunciantes, keywords)
 
-    # Marcar anunciantes como pagos
-    for advertiser in selected_advertisers:
-        advertiser["es_anunciante"] = True
+    # Marcar anunciantes como pagos (copias: no se modifica el almacén compartido)
+    selected_advertisers = [with_flags(advertiser, es_anunciante=True) for advertiser in selected_advertisers]
 
     # 2. SEGUNDO: Si hay pocos anunciantes, complementar con info adicional
     if len(selected_advertisers) < 2:
@@ -1,5 +1,6 @@
 # bots/bot_healthcare.py
 from .utils import filter_advertisers_by_keywords, build_key_points
+from .advertiser import with_flags
 from .maps_integration import search_healthcare_barcelona
 
 def responder_consulta(pregunta, anunciantes, language="en"):
@@ -20,10 +21,11 @@ def responder_consulta(pregunta, anunciantes, language="en"):
     selected_advertisers = filter_advertisers_by_keywords(pregunta, anunciantes, keywords)
 
     # Marcar anunciantes como pagos para que el frontend los destaque
-    for advertiser in selected_advertisers:
-        advertiser["es_anunciante"] = True
+    # (copias: no se modifica el almacén compartido)
+    selected_advertisers = [with_flags(advertiser, es_anunciante=True) for advertiser in selected_advertisers]
 
     # 2. SEGUNDO: Si hay pocos anunciantes (menos de 3), complementar con resultados de Maps
+    cacheable = True
     if len(selected_advertisers) < 3:
         # Determinar qué buscar según la pregunta
         search_term = "hospital"
@@ -38,13 +40,17 @@ def responder_consulta(pregunta, anunciantes, language="en"):
         elif any(word in pregunta_lower for word in ["urgencia", "emergency", "emergencia"]):
             search_term = "emergency hospital"
 
-        # Buscar en Maps
-        maps_results = search_healthcare_barcelona(search_term, limit=5)
+        # Buscar en Maps (desde caché; nunca espera a la red dentro de la consulta)
+        maps_results = search_healthcare_barcelona(search_term, limit=5, wait=False)
 
         # Agregar resultados de Maps DESPUÉS de los anunciantes
         selected_advertisers.extend(maps_results)
 
+        # Caché de Maps frío: los resultados llegan en background, así que
+        # esta respuesta incompleta no debe quedarse en el caché de respuestas
+        cacheable = bool(maps_results)
+
     key_points = build_key_points(selected_advertisers)
 
     # Devolver lista completa; el orquestador aplicará limit/offset
-    return {"key_points": key_points, "json_data": selected_advertisers}
+    return {"key_points": key_points, "json_data": selected_advertisers, "cacheable": cacheable}
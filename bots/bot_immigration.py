@@ -4,9 +4,14 @@ Proporciona información sobre visados, NIE, documentación y primeros pasos
 """
 
 import json
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from .immigration_knowledge import get_immigration_knowledge_base
+from .keyword_matcher import KeywordMatcher
+from .logger import logger
 
 # ============================================================================
 # CONFIGURACIÓN
@@ -25,334 +30,6 @@ LEGAL_RECOMMENDATIONS = {
     ]
 }
 
-# Información por país de origen (EXPANDIDA: USA, UK, Europa y más)
-VISA_INFO_BY_COUNTRY = {
-    "es": {
-        "Argentina": {
-            "visado": "No requerido (UE-MERCOSUR)",
-            "duracion": "90 días (luego solicitar residencia)",
-            "nie": "Sí, después de 90 días",
-            "documentacion": ["Pasaporte válido", "Demostrar solvencia económica", "Seguro de salud"],
-            "tiempo_tramite": "30-60 días",
-            "costo_estimado": "100-300€"
-        },
-        "Colombia": {
-            "visado": "Requerido (visa de turista o residencia)",
-            "duracion": "90 días (visa de turista)",
-            "nie": "Sí, una vez en España",
-            "documentacion": ["Pasaporte válido", "Reserva de alojamiento", "Demostrar fondos (800€/mes)"],
-            "tiempo_tramite": "15-30 días",
-            "costo_estimado": "80-150€"
-        },
-        "México": {
-            "visado": "No requerido (180 días como turista)",
-            "duracion": "180 días",
-            "nie": "Sí, después de establecer residencia",
-            "documentacion": ["Pasaporte válido", "Billete de vuelta", "Comprobante de fondos"],
-            "tiempo_tramite": "Automático al entrar",
-            "costo_estimado": "0€ (visado de turista)"
-        },
-        "Brasil": {
-            "visado": "Requerido",
-            "duracion": "90 días",
-            "nie": "Sí",
-            "documentacion": ["Pasaporte válido (6 meses mínimo)", "Comprobante económico", "Certificado de antecedentes"],
-            "tiempo_tramite": "10-15 días",
-            "costo_estimado": "90-120€"
-        },
-        "USA": {
-            "visado": "No requerido (90 días Schengen) ⚠️ ETIAS 80€ a partir 2025",
-            "duracion": "90 días",
-            "nie": "Sí, para residencia permanente",
-            "documentacion": ["Pasaporte válido (6 meses)", "Billete de vuelta", "Comprobante solvencia (1000€+)"],
-            "tiempo_tramite": "Automático + ETIAS online",
-            "costo_estimado": "0€ entrada + 80€ ETIAS"
-        },
-        "Reino Unido": {
-            "visado": "No requerido (post-Brexit) - 6 meses",
-            "duracion": "180 días",
-            "nie": "Sí si permanencia > 6 meses",
-            "documentacion": ["Pasaporte británico válido", "Billete de vuelta", "Fondos (1500€+)"],
-            "tiempo_tramite": "Automático",
-            "costo_estimado": "0€"
-        },
-        "Alemania": {
-            "visado": "No requerido (UE/EEE)",
-            "duracion": "Ilimitado",
-            "nie": "Sí al residir permanentemente",
-            "documentacion": ["DNI/Pasaporte UE", "Fondos mensuales (800€+)", "Contrato alquiler"],
-            "tiempo_tramite": "Inmediato",
-            "costo_estimado": "0€"
-        },
-        "Francia": {
-            "visado": "No requerido (UE/EEE)",
-            "duracion": "Ilimitado",
-            "nie": "Sí al residir permanentemente",
-            "documentacion": ["DNI/Pasaporte UE", "Fondos mensuales (800€+)", "Contrato alquiler"],
-            "tiempo_tramite": "Inmediato",
-            "costo_estimado": "0€"
-        },
-        "Italia": {
-            "visado": "No requerido (UE/EEE)",
-            "duracion": "Ilimitado",
-            "nie": "Sí al residir permanentemente",
-            "documentacion": ["DNI/Pasaporte UE", "Fondos mensuales (800€+)", "Contrato alquiler"],
-            "tiempo_tramite": "Inmediato",
-            "costo_estimado": "0€"
-        },
-        "Países Bajos": {
-            "visado": "No requerido (UE/EEE)",
-            "duracion": "Ilimitado",
-            "nie": "Sí al residir permanentemente",
-            "documentacion": ["DNI/Pasaporte UE", "Fondos mensuales (900€+)", "Contrato alquiler"],
-            "tiempo_tramite": "Inmediato",
-            "costo_estimado": "0€"
-        },
-        "Portugal": {
-            "visado": "No requerido (UE/EEE)",
-            "duracion": "Ilimitado",
-            "nie": "Sí al residir permanentemente",
-            "documentacion": ["DNI/Pasaporte UE", "Fondos mensuales (700€+)", "Contrato alquiler"],
-            "tiempo_tramite": "Inmediato",
-            "costo_estimado": "0€"
-        },
-        "Suiza": {
-            "visado": "No requerido (Schengen)",
-            "duracion": "90 días",
-            "nie": "Sí para residencia permanente",
-            "documentacion": ["Pasaporte válido", "Billete de vuelta", "Fondos", "Contrato trabajo/alquiler"],
-            "tiempo_tramite": "Automático",
-            "costo_estimado": "0€"
-        },
-        "Noruega": {
-            "visado": "No requerido (Schengen/EEE)",
-            "duracion": "90 días",
-            "nie": "Sí para residencia permanente",
-            "documentacion": ["Pasaporte válido", "Billete de vuelta", "Fondos"],
-            "tiempo_tramite": "Automático",
-            "costo_estimado": "0€"
-        },
-        "Irlanda": {
-            "visado": "No requerido (Common Travel Area)",
-            "duracion": "6 meses",
-            "nie": "Sí si permanencia > 6 meses",
-            "documentacion": ["Pasaporte válido", "Fondos (1200€+)", "Billete de vuelta"],
-            "tiempo_tramite": "Automático",
-            "costo_estimado": "0€"
-        },
-        "Canadá": {
-            "visado": "No requerido (90 días) - eVisitor 7€",
-            "duracion": "90 días",
-            "nie": "Sí para residencia",
-            "documentacion": ["Pasaporte válido", "eVisitor (trámite online)", "Fondos (1200€+)"],
-            "tiempo_tramite": "Online 24-72 horas",
-            "costo_estimado": "7€ (eVisitor)"
-        },
-        "Australia": {
-            "visado": "Requerido (eVisitor 20 AUD)",
-            "duracion": "90 días",
-            "nie": "Sí si trabajas",
-            "documentacion": ["Pasaporte válido (6 meses)", "Fondos (1500€+)", "Seguro obligatorio"],
-            "tiempo_tramite": "Online 1-2 días",
-            "costo_estimado": "20 AUD (≈13€)"
-        },
-        "Nueva Zelanda": {
-            "visado": "Requerido (eVisitor 9 NZD)",
-            "duracion": "90 días",
-            "nie": "Sí si trabajas",
-            "documentacion": ["Pasaporte válido (6 meses)", "Fondos (1300€+)", "Billete de vuelta"],
-            "tiempo_tramite": "Online 1-2 días",
-            "costo_estimado": "9 NZD (≈5€)"
-        },
-        "China": {
-            "visado": "Requerido",
-            "duracion": "90 días",
-            "nie": "Sí",
-            "documentacion": ["Pasaporte", "Invitación o reserva hotel", "Comprobante económico", "Carta de empleo"],
-            "tiempo_tramite": "15-20 días",
-            "costo_estimado": "100-150€"
-        },
-        "India": {
-            "visado": "Requerido",
-            "duracion": "90 días",
-            "nie": "Sí",
-            "documentacion": ["Pasaporte (6 meses)", "Prueba de fondos", "Reserva hotel", "Certificado antecedentes"],
-            "tiempo_tramite": "15-25 días",
-            "costo_estimado": "80-120€"
-        },
-        "Otro": {
-            "visado": "Consultar en embajada española de tu país",
-            "duracion": "Varía según país",
-            "nie": "Sí, una vez en España",
-            "documentacion": ["Pasaporte válido", "Documentación específica por país", "Comprobante de fondos"],
-            "tiempo_tramite": "15-60 días",
-            "costo_estimado": "50-300€"
-        }
-    },
-    "en": {
-        "Argentina": {
-            "visado": "Not required (EU-MERCOSUR)",
-            "duracion": "90 days (then request residency)",
-            "nie": "Yes, after 90 days",
-            "documentacion": ["Valid passport", "Proof of economic solvency", "Health insurance"],
-            "tiempo_tramite": "30-60 days",
-            "costo_estimado": "100-300€"
-        },
-        "Colombia": {
-            "visado": "Required (tourist or residence visa)",
-            "duracion": "90 days (tourist visa)",
-            "nie": "Yes, once in Spain",
-            "documentacion": ["Valid passport", "Accommodation booking", "Proof of funds (800€/month)"],
-            "tiempo_tramite": "15-30 days",
-            "costo_estimado": "80-150€"
-        },
-        "Mexico": {
-            "visado": "Not required (180 days as tourist)",
-            "duracion": "180 days",
-            "nie": "Yes, after establishing residency",
-            "documentacion": ["Valid passport", "Return ticket", "Proof of funds"],
-            "tiempo_tramite": "Automatic upon entry",
-            "costo_estimado": "0€ (tourist visa)"
-        },
-        "Brazil": {
-            "visado": "Required",
-            "duracion": "90 days",
-            "nie": "Yes",
-            "documentacion": ["Valid passport (6 months min)", "Economic proof", "Background certificate"],
-            "tiempo_tramite": "10-15 days",
-            "costo_estimado": "90-120€"
-        },
-        "USA": {
-            "visado": "Not required (90 days Schengen) ⚠️ ETIAS €80 from 2025",
-            "duracion": "90 days",
-            "nie": "Yes, for permanent residency",
-            "documentacion": ["Valid passport (6 months)", "Return ticket", "Proof of funds (1000€+)"],
-            "tiempo_tramite": "Automatic + ETIAS online",
-            "costo_estimado": "€0 entry + €80 ETIAS"
-        },
-        "United Kingdom": {
-            "visado": "Not required (post-Brexit) - 6 months",
-            "duracion": "180 days",
-            "nie": "Yes if stay > 6 months",
-            "documentacion": ["Valid British passport", "Return ticket", "Funds (1500€+)"],
-            "tiempo_tramite": "Automatic",
-            "costo_estimado": "€0"
-        },
-        "Germany": {
-            "visado": "Not required (EU/EEA)",
-            "duracion": "Unlimited",
-            "nie": "Yes when residing permanently",
-            "documentacion": ["EU ID/Passport", "Monthly funds (800€+)", "Lease contract"],
-            "tiempo_tramite": "Immediate",
-            "costo_estimado": "€0"
-        },
-        "France": {
-            "visado": "Not required (EU/EEA)",
-            "duracion": "Unlimited",
-            "nie": "Yes when residing permanently",
-            "documentacion": ["EU ID/Passport", "Monthly funds (800€+)", "Lease contract"],
-            "tiempo_tramite": "Immediate",
-            "costo_estimado": "€0"
-        },
-        "Italy": {
-            "visado": "Not required (EU/EEA)",
-            "duracion": "Unlimited",
-            "nie": "Yes when residing permanently",
-            "documentacion": ["EU ID/Passport", "Monthly funds (800€+)", "Lease contract"],
-            "tiempo_tramite": "Immediate",
-            "costo_estimado": "€0"
-        },
-        "Netherlands": {
-            "visado": "Not required (EU/EEA)",
-            "duracion": "Unlimited",
-            "nie": "Yes when residing permanently",
-            "documentacion": ["EU ID/Passport", "Monthly funds (900€+)", "Lease contract"],
-            "tiempo_tramite": "Immediate",
-            "costo_estimado": "€0"
-        },
-        "Portugal": {
-            "visado": "Not required (EU/EEA)",
-            "duracion": "Unlimited",
-            "nie": "Yes when residing permanently",
-            "documentacion": ["EU ID/Passport", "Monthly funds (700€+)", "Lease contract"],
-            "tiempo_tramite": "Immediate",
-            "costo_estimado": "€0"
-        },
-        "Switzerland": {
-            "visado": "Not required (Schengen)",
-            "duracion": "90 days",
-            "nie": "Yes for permanent residency",
-            "documentacion": ["Valid passport", "Return ticket", "Funds", "Employment/lease contract"],
-            "tiempo_tramite": "Automatic",
-            "costo_estimado": "€0"
-        },
-        "Norway": {
-            "visado": "Not required (Schengen/EEA)",
-            "duracion": "90 days",
-            "nie": "Yes for permanent residency",
-            "documentacion": ["Valid passport", "Return ticket", "Funds"],
-            "tiempo_tramite": "Automatic",
-            "costo_estimado": "€0"
-        },
-        "Ireland": {
-            "visado": "Not required (Common Travel Area)",
-            "duracion": "6 months",
-            "nie": "Yes if stay > 6 months",
-            "documentacion": ["Valid passport", "Funds (1200€+)", "Return ticket"],
-            "tiempo_tramite": "Automatic",
-            "costo_estimado": "€0"
-        },
-        "Canada": {
-            "visado": "Not required (90 days) - eVisitor €7",
-            "duracion": "90 days",
-            "nie": "Yes for residency",
-            "documentacion": ["Valid passport", "eVisitor (online)", "Funds (1200€+)"],
-            "tiempo_tramite": "Online 24-72 hours",
-            "costo_estimado": "€7 (eVisitor)"
-        },
-        "Australia": {
-            "visado": "Required (eVisitor 20 AUD)",
-            "duracion": "90 days",
-            "nie": "Yes if working",
-            "documentacion": ["Valid passport (6 months)", "Funds (1500€+)", "Mandatory insurance"],
-            "tiempo_tramite": "Online 1-2 days",
-            "costo_estimado": "20 AUD (≈€13)"
-        },
-        "New Zealand": {
-            "visado": "Required (eVisitor 9 NZD)",
-            "duracion": "90 days",
-            "nie": "Yes if working",
-            "documentacion": ["Valid passport (6 months)", "Funds (1300€+)", "Return ticket"],
-            "tiempo_tramite": "Online 1-2 days",
-            "costo_estimado": "9 NZD (≈€5)"
-        },
-        "China": {
-            "visado": "Required",
-            "duracion": "90 days",
-            "nie": "Yes",
-            "documentacion": ["Passport", "Invitation or hotel booking", "Economic proof", "Employment letter"],
-            "tiempo_tramite": "15-20 days",
-            "costo_estimado": "100-150€"
-        },
-        "India": {
-            "visado": "Required",
-            "duracion": "90 days",
-            "nie": "Yes",
-            "documentacion": ["Passport (6 months)", "Proof of funds", "Hotel booking", "Background certificate"],
-            "tiempo_tramite": "15-25 days",
-            "costo_estimado": "80-120€"
-        },
-        "Other": {
-            "visado": "Check with Spanish embassy in your country",
-            "duracion": "Varies by country",
-            "nie": "Yes, once in Spain",
-            "documentacion": ["Valid passport", "Country-specific documentation", "Proof of funds"],
-            "tiempo_tramite": "15-60 days",
-            "costo_estimado": "50-300€"
-        }
-    }
-}
-
 # Checklist de primeros pasos
 FIRST_STEPS_CHECKLIST = {
     "es": [
@@ -435,8 +112,29 @@ EMPADRONAMIENTO_INFO = {
 # CLASE BOT
 # ============================================================================
 
+# Palabras clave de intención, en orden de prioridad (igual que la cadena if/elif original)
+INTENT_KEYWORDS = (
+    ("first_steps", ("primero", "paso", "checklist", "pasos", "first", "steps")),
+    ("nie", ("nie", "identidad", "número")),
+    ("empadronamiento", ("empadron", "registro", "registro residencia")),
+    ("visa", ("visado", "visa", "requirement", "documento")),
+)
+
+_INTENT_PRIORITY = {intent: priority for priority, (intent, _) in enumerate(INTENT_KEYWORDS)}
+
+
 class ImmigrationBot:
-    """Bot especializado en información de inmigración y primeros pasos."""
+    """
+    Bot especializado en información de inmigración y primeros pasos.
+
+    Las respuestas se renderizan una sola vez por idioma y ``get_response``
+    solo detecta la intención (un único matcher Aho-Corasick) y el país
+    (índice de alias de la base de conocimiento, data/immigration_info.json)
+    y devuelve el texto ya construido. Las fichas de visado salen de la
+    base de conocimiento y se vuelven a renderizar cuando el fichero cambia
+    en disco. Usa ``get_immigration_bot(language)`` para compartir la
+    instancia entre peticiones.
+    """
 
     # OPTIMIZACIÓN: Caché de clase para evitar recargar JSON en cada instancia
     _legal_ads_cache = None
@@ -448,30 +146,100 @@ class ImmigrationBot:
             self.language = "es"
         self.legal_ads = self._load_legal_ads()
 
-    def _legal_note(self) -> str:
+        # Respuestas pre-renderizadas (no cambian entre peticiones)
+        self._legal_note_text = self._render_legal_note()
+        self._first_steps = self._render_first_steps()
+        self._nie_info = self._render_nie_info()
+        self._empadronamiento_info = self._render_empadronamiento_info()
+        if self.language == "es":
+            self._ask_country = "¿De qué país vienes? Dime tu país para mostrarte los requisitos específicos de visado." + self._legal_note_text
+            self._menu = "Puedo ayudarte con:\n• 📋 Primeros pasos\n• 🎫 Información de visados\n• 🆔 NIE\n• 🏠 Empadronamiento\n\n¿Sobre qué tema quieres información?" + self._legal_note_text
+        else:
+            self._ask_country = "What country are you from? Tell me your country to show you specific visa requirements." + self._legal_note_text
+            self._menu = "I can help you with:\n• 📋 First steps\n• 🎫 Visa information\n• 🆔 NIE\n• 🏠 Registration\n\nWhat topic would you like information about?" + self._legal_note_text
+
+        self._matcher = self._build_matcher()
+        self.knowledge_base = get_immigration_knowledge_base()
+        self._kb_version = None
+        # (clave -> ficha renderizada, código de país -> (orden, clave));
+        # se reemplaza entero en cada recarga
+        self._visa_cards: Tuple[Dict[str, Dict], Dict[str, Tuple[int, str]]] = ({}, {})
+
+    @property
+    def countries(self) -> List[str]:
+        """Países con información de visado en el idioma del bot."""
+        return list(self._country_cards()[0])
+
+    def _build_matcher(self) -> KeywordMatcher:
+        """Un solo matcher para todas las palabras clave de intención."""
+        matcher = KeywordMatcher()
+        for intent, keywords in INTENT_KEYWORDS:
+            for keyword in keywords:
+                matcher.add(keyword, (_INTENT_PRIORITY[intent], intent))
+        return matcher.compile()
+
+    def _country_cards(self) -> Tuple[Dict[str, Dict], Dict[str, Tuple[int, str]]]:
+        """
+        Fichas de visado renderizadas y código de país -> (orden, clave).
+
+        Se renderizan desde la base de conocimiento (``ficha.<idioma>``) y
+        solo se recalculan cuando esta se recarga. Una ficha incompleta se
+        descarta con un aviso en lugar de romper las respuestas.
+        """
+        kb = self.knowledge_base
+        kb.refresh()
+        version = kb.version
+        if self._kb_version != version:
+            rendered: Dict[str, Dict] = {}
+            by_code: Dict[str, Tuple[int, str]] = {}
+            for code, info in kb.visa_cards(self.language):
+                key = info.get("pais") or code
+                try:
+                    rendered[key] = self._render_visa_info(key, info)
+                except (KeyError, TypeError) as e:
+                    logger.warning(f"⚠️ Ficha de visado incompleta ({key}): {e}")
+                    continue
+                if code not in by_code:
+                    by_code[code] = (len(rendered) - 1, key)
+            self._visa_cards = (rendered, by_code)
+            self._kb_version = version
+        return self._visa_cards
+
+    def _find_country(self, text: str) -> Optional[str]:
+        """Clave del país mencionado (el primero de la lista si hay varios)."""
+        cards = self._country_cards()[1]
+        best = None
+        for code in self.knowledge_base.find_countries(text):
+            card = cards.get(code)
+            if card is not None and (best is None or card < best):
+                best = card
+        return best[1] if best else None
+
+    def _render_legal_note(self) -> str:
+        if self.language == "es":
+            header = "\n🤝 Recomendamos consultar con un profesional en leyes de extranjería. Prioridad a firmas anunciantes:"  # noqa: E501
+        else:
+            header = "\n🤝 We recommend speaking with an immigration lawyer. Priority to advertiser firms:"  # noqa: E501
+
         if self.legal_ads:
             if self.language == "es":
-                header = "\n🤝 Recomendamos consultar con un profesional en leyes de extranjería. Prioridad a firmas anunciantes:"  # noqa: E501
                 lines = [
                     f"🔹 {ad.get('nombre', 'Firma legal')} ({ad.get('contacto', ad.get('url', ''))}) — anuncio en la revista"
                     for ad in self.legal_ads
                 ]
             else:
-                header = "\n🤝 We recommend speaking with an immigration lawyer. Priority to advertiser firms:"  # noqa: E501
                 lines = [
                     f"🔹 {ad.get('nombre', 'Law firm')} ({ad.get('contacto', ad.get('url', ''))}) — advertiser in the magazine"
                     for ad in self.legal_ads
                 ]
-            return header + "\n" + "\n".join(lines)
-
-        # Fallback estático
-        lines = LEGAL_RECOMMENDATIONS[self.language]
-        if self.language == "es":
-            header = "\n🤝 Recomendamos consultar con un profesional en leyes de extranjería. Prioridad a firmas anunciantes:"  # noqa: E501
         else:
-            header = "\n🤝 We recommend speaking with an immigration lawyer. Priority to advertiser firms:"  # noqa: E501
+            # Fallback estático
+            lines = LEGAL_RECOMMENDATIONS[self.language]
         return header + "\n" + "\n".join(lines)
 
+    def _legal_note(self) -> str:
+        return self._legal_note_text
+
     def _load_legal_ads(self) -> List[Dict]:
         # OPTIMIZACIÓN: Usa caché de clase para evitar leer JSON en cada instancia (mejora 10-50ms)
         if ImmigrationBot._cache_loaded:
@@ -504,153 +272,201 @@ class ImmigrationBot:
         else:
             return f"{EMOJI} Hello! I'm your immigration assistant. I'll help you with information about visas, NIE, documentation and first steps to live in Spain. What country are you from?"
 
+    # --- Renderizado (una vez por idioma) ---
+
+    def _render_visa_info(self, key: str, info: Dict) -> Dict:
+        if self.language == "es":
+            lines = [
+                f"📋 **Información de Visado para {key}**\n",
+                f"🎫 **Visado:** {info['visado']}",
+                f"⏱️ **Duración:** {info['duracion']}",
+                f"🆔 **NIE:** {info['nie']}",
+                f"📄 **Documentación:** {', '.join(info['documentacion'])}",
+                f"⏳ **Tiempo de trámite:** {info['tiempo_tramite']}",
+                f"💰 **Costo estimado:** {info['costo_estimado']}\n",
+                "¿Necesitas información sobre NIE, empadronamiento o primeros pasos?",
+            ]
+        else:
+            lines = [
+                f"📋 **Visa Information for {key}**\n",
+                f"🎫 **Visa:** {info['visado']}",
+                f"⏱️ **Duration:** {info['duracion']}",
+                f"🆔 **NIE:** {info['nie']}",
+                f"📄 **Documentation:** {', '.join(info['documentacion'])}",
+                f"⏳ **Processing time:** {info['tiempo_tramite']}",
+                f"💰 **Estimated cost:** {info['costo_estimado']}\n",
+                "Need information about NIE, registration or first steps?",
+            ]
+
+        return {
+            "type": "visa_info",
+            "message": "\n".join(lines) + self._legal_note_text,
+            "country": key,
+            "data": info
+        }
+
+    def _render_first_steps(self) -> str:
+        if self.language == "es":
+            title = "📋 **Checklist: 10 Primeros Pasos**\n\n"
+        else:
+            title = "📋 **Checklist: First 10 Steps**\n\n"
+
+        steps = "".join(
+            f"{i}. {step}\n" for i, step in enumerate(FIRST_STEPS_CHECKLIST[self.language], 1)
+        )
+        return title + steps + self._legal_note_text
+
+    def _render_nie_info(self) -> str:
+        info = NIE_INFO[self.language]
+        docs = "".join(f"  • {doc}\n" for doc in info['documentos_necesarios'])
+
+        if self.language == "es":
+            parts = [
+                "🆔 **Información sobre el NIE (Número de Identidad de Extranjero)**\n\n",
+                f"**¿Qué es?** {info['que_es']}\n\n",
+                f"**¿Dónde solicitarlo?** {info['donde_solicitar']}\n\n",
+                "**Documentos necesarios:**\n",
+                docs,
+                f"\n**⏳ Tiempo:** {info['tiempo']}\n",
+                f"**💰 Costo:** {info['costo']}\n\n",
+                f"**Cita previa:** {info['cita_previa']}",
+            ]
+        else:
+            parts = [
+                "🆔 **Information about NIE (Foreigner Identification Number)**\n\n",
+                f"**What is it?** {info['que_es']}\n\n",
+                f"**Where to apply?** {info['donde_solicitar']}\n\n",
+                "**Required documents:**\n",
+                docs,
+                f"\n**⏳ Time:** {info['tiempo']}\n",
+                f"**💰 Cost:** {info['costo']}\n\n",
+                f"**Prior appointment:** {info['cita_previa']}",
+            ]
+        parts.append(self._legal_note_text)
+        return "".join(parts)
+
+    def _render_empadronamiento_info(self) -> str:
+        info = EMPADRONAMIENTO_INFO[self.language]
+
+        if self.language == "es":
+            parts = [
+                "🏠 **Información sobre Empadronamiento (Registro de Residencia)**\n\n",
+                f"**¿Qué es?** {info['que_es']}\n\n",
+                f"**¿Dónde?** {info['donde']}\n\n",
+                f"**Documentos:** {', '.join(info['documentos'])}\n\n",
+                f"**⏳ Tiempo:** {info['tiempo']}\n",
+                f"**💰 Costo:** {info['costo']}\n",
+                f"**❗ Importancia:** {info['importancia']}",
+            ]
+        else:
+            parts = [
+                "🏠 **Information about Registration (Empadronamiento)**\n\n",
+                f"**What is it?** {info['que_es']}\n\n",
+                f"**Where?** {info['donde']}\n\n",
+                f"**Documents:** {', '.join(info['documentos'])}\n\n",
+                f"**⏳ Time:** {info['tiempo']}\n",
+                f"**💰 Cost:** {info['costo']}\n",
+                f"**❗ Importance:** {info['importancia']}",
+            ]
+        parts.append(self._legal_note_text)
+        return "".join(parts)
+
+    # --- API pública ---
+
     def get_visa_info(self, country: str) -> Dict:
         """Obtener información de visado por país."""
-        visa_data = VISA_INFO_BY_COUNTRY[self.language]
+        # Alias exactos o dentro del texto ("EEUU", "Reino Unido", "UK")
+        visa_info = self._country_cards()[0]
+        key = self._find_country(country)
+        if key in visa_info:
+            return dict(visa_info[key])
 
-        # Buscar país (con aproximación)
+        # Aproximación por subcadena (p.ej. "Reino", "Otro")
         country_lower = country.lower()
-        for key in visa_data.keys():
+        for key, rendered in visa_info.items():
             if key.lower() in country_lower or country_lower in key.lower():
-                info = visa_data[key]
-                if self.language == "es":
-                    response = f"📋 **Información de Visado para {key}**\n\n"
-                    response += f"🎫 **Visado:** {info['visado']}\n"
-                    response += f"⏱️ **Duración:** {info['duracion']}\n"
-                    response += f"🆔 **NIE:** {info['nie']}\n"
-                    response += f"📄 **Documentación:** {', '.join(info['documentacion'])}\n"
-                    response += f"⏳ **Tiempo de trámite:** {info['tiempo_tramite']}\n"
-                    response += f"💰 **Costo estimado:** {info['costo_estimado']}\n\n"
-                    response += "¿Necesitas información sobre NIE, empadronamiento o primeros pasos?"
-                    response += self._legal_note()
-                else:
-                    response = f"📋 **Visa Information for {key}**\n\n"
-                    response += f"🎫 **Visa:** {info['visado']}\n"
-                    response += f"⏱️ **Duration:** {info['duracion']}\n"
-                    response += f"🆔 **NIE:** {info['nie']}\n"
-                    response += f"📄 **Documentation:** {', '.join(info['documentacion'])}\n"
-                    response += f"⏳ **Processing time:** {info['tiempo_tramite']}\n"
-                    response += f"💰 **Estimated cost:** {info['costo_estimado']}\n\n"
-                    response += "Need information about NIE, registration or first steps?"
-                    response += self._legal_note()
-
-                return {
-                    "type": "visa_info",
-                    "message": response,
-                    "country": key,
-                    "data": info
-                }
+                return dict(rendered)
 
         # Si no encuentra el país
         if self.language == "es":
             return {
                 "type": "visa_info",
-                "message": f"No tengo información específica de {country}. Por favor, consulta la embajada española de tu país o selecciona otro país de la lista." + self._legal_note(),
+                "message": f"No tengo información específica de {country}. Por favor, consulta la embajada española de tu país o selecciona otro país de la lista." + self._legal_note_text,
                 "data": None
             }
         else:
             return {
                 "type": "visa_info",
-                "message": f"I don't have specific information for {country}. Please check the Spanish embassy in your country or select another country." + self._legal_note(),
+                "message": f"I don't have specific information for {country}. Please check the Spanish embassy in your country or select another country." + self._legal_note_text,
                 "data": None
             }
 
     def get_first_steps(self) -> str:
         """Obtener checklist de primeros pasos."""
-        checklist = FIRST_STEPS_CHECKLIST[self.language]
-
-        if self.language == "es":
-            response = "📋 **Checklist: 10 Primeros Pasos**\n\n"
-        else:
-            response = "📋 **Checklist: First 10 Steps**\n\n"
-
-        for i, step in enumerate(checklist, 1):
-            response += f"{i}. {step}\n"
-        response += self._legal_note()
-        return response
+        return self._first_steps
 
     def get_nie_info(self) -> str:
         """Obtener información sobre NIE."""
-        info = NIE_INFO[self.language]
-
-        if self.language == "es":
-            response = "🆔 **Información sobre el NIE (Número de Identidad de Extranjero)**\n\n"
-            response += f"**¿Qué es?** {info['que_es']}\n\n"
-            response += f"**¿Dónde solicitarlo?** {info['donde_solicitar']}\n\n"
-            response += f"**Documentos necesarios:**\n"
-            for doc in info['documentos_necesarios']:
-                response += f"  • {doc}\n"
-            response += f"\n**⏳ Tiempo:** {info['tiempo']}\n"
-            response += f"**💰 Costo:** {info['costo']}\n\n"
-            response += f"**Cita previa:** {info['cita_previa']}"
-            response += self._legal_note()
-        else:
-            response = "🆔 **Information about NIE (Foreigner Identification Number)**\n\n"
-            response += f"**What is it?** {info['que_es']}\n\n"
-            response += f"**Where to apply?** {info['donde_solicitar']}\n\n"
-            response += f"**Required documents:**\n"
-            for doc in info['documentos_necesarios']:
-                response += f"  • {doc}\n"
-            response += f"\n**⏳ Time:** {info['tiempo']}\n"
-            response += f"**💰 Cost:** {info['costo']}\n\n"
-            response += f"**Prior appointment:** {info['cita_previa']}"
-            response += self._legal_note()
-
-        return response
+        return self._nie_info
 
     def get_empadronamiento_info(self) -> str:
         """Obtener información sobre empadronamiento."""
-        info = EMPADRONAMIENTO_INFO[self.language]
-
-        if self.language == "es":
-            response = "🏠 **Información sobre Empadronamiento (Registro de Residencia)**\n\n"
-            response += f"**¿Qué es?** {info['que_es']}\n\n"
-            response += f"**¿Dónde?** {info['donde']}\n\n"
-            response += f"**Documentos:** {', '.join(info['documentos'])}\n\n"
-            response += f"**⏳ Tiempo:** {info['tiempo']}\n"
-            response += f"**💰 Costo:** {info['costo']}\n"
-            response += f"**❗ Importancia:** {info['importancia']}"
-            response += self._legal_note()
-        else:
-            response = "🏠 **Information about Registration (Empadronamiento)**\n\n"
-            response += f"**What is it?** {info['que_es']}\n\n"
-            response += f"**Where?** {info['donde']}\n\n"
-            response += f"**Documents:** {', '.join(info['documentos'])}\n\n"
-            response += f"**⏳ Time:** {info['tiempo']}\n"
-            response += f"**💰 Cost:** {info['costo']}\n"
-            response += f"**❗ Importance:** {info['importancia']}"
-            response += self._legal_note()
-
-        return response
+        return self._empadronamiento_info
+
+    def detect_intent(self, user_input: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Detecta (intención, país) del mensaje.
+
+        La intención de mayor prioridad gana; el país es el primero de la
+        base de conocimiento que se menciona en el texto.
+        """
+        intent = None
+        best = None
+        for pattern in self._matcher.find(user_input.lower()):
+            for priority, value in self._matcher.tags(pattern):
+                if best is None or priority < best:
+                    best, intent = priority, value
+        return intent, self._find_country(user_input)
 
     def get_response(self, user_input: str) -> str:
         """Obtener respuesta según entrada del usuario."""
-        user_lower = user_input.lower()
-
-        # Detectar intención
-        if any(word in user_lower for word in ['primero', 'paso', 'checklist', 'pasos', 'first', 'steps']):
-            return self.get_first_steps()
-        elif any(word in user_lower for word in ['nie', 'identidad', 'número']):
-            return self.get_nie_info()
-        elif any(word in user_lower for word in ['empadron', 'registro', 'registro residencia']):
-            return self.get_empadronamiento_info()
-        elif any(word in user_lower for word in ['visado', 'visa', 'requirement', 'documento']):
-            # Extraer país si existe
-            for country in VISA_INFO_BY_COUNTRY[self.language].keys():
-                if country.lower() in user_lower:
-                    info = self.get_visa_info(country)
-                    return info['message']
+        intent, country = self.detect_intent(user_input)
+
+        if intent == "first_steps":
+            return self._first_steps
+        if intent == "nie":
+            return self._nie_info
+        if intent == "empadronamiento":
+            return self._empadronamiento_info
+        if intent == "visa":
             # Si no especifica país, pregunta
-            if self.language == "es":
-                return "¿De qué país vienes? Dime tu país para mostrarte los requisitos específicos de visado." + self._legal_note()
-            else:
-                return "What country are you from? Tell me your country to show you specific visa requirements." + self._legal_note()
-        else:
-            # Respuesta por defecto
-            if self.language == "es":
-                return f"Puedo ayudarte con:\n• 📋 Primeros pasos\n• 🎫 Información de visados\n• 🆔 NIE\n• 🏠 Empadronamiento\n\n¿Sobre qué tema quieres información?" + self._legal_note()
-            else:
-                return f"I can help you with:\n• 📋 First steps\n• 🎫 Visa information\n• 🆔 NIE\n• 🏠 Registration\n\nWhat topic would you like information about?" + self._legal_note()
+            card = self._country_cards()[0].get(country) if country else None
+            if card is None:
+                return self._ask_country
+            return card["message"]
+        # Respuesta por defecto
+        return self._menu
+
+
+# Instancias globales (una por idioma; el bot no guarda estado por petición)
+_immigration_bots: Dict[str, ImmigrationBot] = {}
+_immigration_bots_lock = threading.Lock()
+
+
+def get_immigration_bot(language: str = "es") -> ImmigrationBot:
+    """Singleton por idioma del ImmigrationBot."""
+    language = (language or "es").lower()
+    if language not in ("es", "en"):
+        language = "es"
+
+    bot = _immigration_bots.get(language)
+    if bot is None:
+        with _immigration_bots_lock:
+            bot = _immigration_bots.get(language)
+            if bot is None:
+                bot = ImmigrationBot(language=language)
+                _immigration_bots[language] = bot
+    return bot
 
 
 if __name__ == "__main__":
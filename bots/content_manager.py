@@ -8,14 +8,28 @@ import json
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from .json_fragments import EncodedDict
+
 class ContentManager:
     def __init__(self):
         self.base_dir = Path(__file__).resolve().parent.parent
         self.guides_dir = self.base_dir / "data" / "guides"
         self.articles_dir = self.base_dir / "data" / "articles"
         self.guides = self._load_guides()
+        self._summaries = self._build_summaries(self.guides)
+        # Se incrementa en cada recarga (permite invalidar cachés dependientes)
+        self.version = 0
         print(f"✅ Contenido editorial cargado: {len(self.guides)} guías disponibles")
 
+    def reload(self) -> int:
+        """Vuelve a leer las guías desde disco. Retorna el número de guías."""
+        guides = self._load_guides()
+        self._summaries = self._build_summaries(guides)
+        self.guides = guides
+        self.version += 1
+        print(f"🔄 Contenido editorial recargado: {len(self.guides)} guías disponibles")
+        return len(self.guides)
+
     def _load_guides(self) -> List[Dict]:
         """Carga todas las guías disponibles"""
         guides = []
@@ -71,10 +85,23 @@ class ContentManager:
         relevant_guides.sort(key=lambda x: x['relevancia'], reverse=True)
         return relevant_guides
 
+    def _build_summaries(self, guides: List[Dict]) -> Dict[int, tuple]:
+        """Resúmenes pre-codificados por guía: id(guía) -> (guía, resumen)."""
+        return {
+            id(guide): (guide, EncodedDict(self._make_summary(guide)))
+            for guide in guides
+        }
+
     def get_guide_summary(self, guide: Dict) -> Dict:
         """
         Devuelve un resumen corto de la guía para mostrar en el chat.
         """
+        entry = self._summaries.get(id(guide))
+        if entry is not None and entry[0] is guide:
+            return entry[1]
+        return self._make_summary(guide)
+
+    def _make_summary(self, guide: Dict) -> Dict:
         return {
             "tipo": "guia_revista",
             "titulo": guide.get('titulo'),
@@ -11,12 +11,20 @@ import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from .logger import logger
+from .http_client import get_http_client
+from .advertiser import Advertiser, to_plain
 
 
 class DirectoryConnector:
     """
     Conecta con la API del directorio de Barcelona Metropolitan.
     Si la API no está disponible, usa anunciantes.json como fallback.
+
+    Solo tiene interfaz síncrona (sobre el pool keep-alive compartido): sus
+    llamadas nunca corren en el event loop. El orquestador lo usa desde los
+    threads de query_executor y el tracking sale en lote desde el thread de
+    RecommendationTracker. Un llamador async debe usar ``asyncio.to_thread``
+    o la interfaz async de PooledHTTPClient.
     """
 
     def __init__(self):
@@ -30,6 +38,9 @@ class DirectoryConnector:
         self.max_retries = 2
         self.retry_delay = 1  # segundos
 
+        # Pool de conexiones compartido (keep-alive entre llamadas)
+        self.http = get_http_client()
+
         # Cache local
         base_dir = Path(__file__).resolve().parent.parent
         self.cache_file = base_dir / "data" / "directory_cache.json"
@@ -41,7 +52,7 @@ class DirectoryConnector:
         )
 
     def get_all_advertisers(self, category: str = None,
-                           limit: int = 50) -> List[Dict]:
+                           limit: int = 50) -> List[Advertiser]:
         """
         Obtiene todos los anunciantes del directorio.
 
@@ -67,7 +78,7 @@ class DirectoryConnector:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/advertisers",
                 headers=headers,
                 params=params,
@@ -76,7 +87,10 @@ class DirectoryConnector:
 
             if response.status_code == 200:
                 data = response.json()
-                advertisers = data.get("advertisers", [])
+                advertisers = [
+                    Advertiser.from_raw(a) for a in data.get("advertisers", [])
+                    if isinstance(a, dict)
+                ]
                 logger.info(
                     f"✅ Obtenidos {len(advertisers)} anunciantes de API"
                 )
@@ -102,7 +116,7 @@ class DirectoryConnector:
                         exc_info=True)
             return self._load_from_local()
 
-    def search_advertisers(self, query: str, category: str = None, limit: int = 10) -> List[Dict]:
+    def search_advertisers(self, query: str, category: str = None, limit: int = 10) -> List[Advertiser]:
         """
         Busca anunciantes por keywords.
 
@@ -125,7 +139,7 @@ class DirectoryConnector:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/advertisers/search",
                 headers=headers,
                 params=params,
@@ -133,7 +147,10 @@ class DirectoryConnector:
             )
 
             if response.status_code == 200:
-                results = response.json().get("results", [])
+                results = [
+                    Advertiser.from_raw(a) for a in response.json().get("results", [])
+                    if isinstance(a, dict)
+                ]
                 logger.info(f"✅ Encontrados {len(results)} resultados para '{query}'")
                 return results
 
@@ -145,7 +162,7 @@ class DirectoryConnector:
             logger.warning(f"⚠️ Error en búsqueda: {e}")
             return self._search_local(query, category)
 
-    def get_advertiser_details(self, advertiser_id: str) -> Optional[Dict]:
+    def get_advertiser_details(self, advertiser_id: str) -> Optional[Advertiser]:
         """
         Obtiene detalles completos de UN anunciante específico.
 
@@ -162,14 +179,14 @@ class DirectoryConnector:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/advertisers/{advertiser_id}",
                 headers=headers,
                 timeout=self.timeout
             )
 
             if response.status_code == 200:
-                return response.json()
+                return Advertiser.from_raw(response.json())
 
             return None
 
@@ -177,7 +194,7 @@ class DirectoryConnector:
             logger.warning(f"⚠️ Error obteniendo detalles: {e}")
             return None
 
-    def get_by_category(self, category: str, limit: int = 50) -> List[Dict]:
+    def get_by_category(self, category: str, limit: int = 50) -> List[Advertiser]:
         """
         Obtiene anunciantes por categoría.
 
@@ -201,20 +218,10 @@ class DirectoryConnector:
             session_id: ID de sesión
         """
         try:
-            headers = {}
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
-
-            requests.post(
+            self.http.post(
                 f"{self.base_url}/analytics/recommendation",
-                headers=headers,
-                json={
-                    "advertiser_id": advertiser_id,
-                    "query": query,
-                    "session_id": session_id,
-                    "source": "expat_ai_bot",
-                    "timestamp": datetime.now().isoformat()
-                },
+                headers=self._auth_headers(),
+                json=self.recommendation_payload(advertiser_id, query, session_id),
                 timeout=3
             )
             logger.info(f"✅ Recomendación tracked: {advertiser_id}")
@@ -223,7 +230,48 @@ class DirectoryConnector:
             # No bloquear si falla el tracking
             pass
 
-    def _load_from_local(self) -> List[Dict]:
+    def track_recommendations_bulk(self, events: List[Dict]) -> bool:
+        """
+        Envía un lote de recomendaciones en un único POST.
+        Lo usa RecommendationTracker desde su thread en background.
+
+        Args:
+            events: Lista de payloads de recommendation_payload()
+
+        Returns:
+            True si el directorio aceptó el lote
+        """
+        try:
+            response = self.http.post(
+                f"{self.base_url}/analytics/recommendations/bulk",
+                headers=self._auth_headers(),
+                json={"events": events},
+                timeout=5
+            )
+            if response.status_code < 300:
+                logger.info(f"✅ {len(events)} recomendaciones tracked")
+                return True
+            logger.debug(f"⚠️ Tracking en lote rechazado: HTTP {response.status_code}")
+        except Exception as e:
+            logger.debug(f"⚠️ No se pudo trackear el lote de recomendaciones: {e}")
+        return False
+
+    def _auth_headers(self) -> Dict:
+        headers = {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def recommendation_payload(self, advertiser_id: str, query: str, session_id: str) -> Dict:
+        return {
+            "advertiser_id": advertiser_id,
+            "query": query,
+            "session_id": session_id,
+            "source": "expat_ai_bot",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _load_from_local(self) -> List[Advertiser]:
         """
         Fallback: Carga anunciantes desde JSON local.
         """
@@ -238,8 +286,9 @@ class DirectoryConnector:
                 if isinstance(items, list):
                     for item in items:
                         if isinstance(item, dict):
-                            item['category'] = category
-                            all_advertisers.append(item)
+                            all_advertisers.append(
+                                Advertiser.from_raw({**item, 'category': category})
+                            )
 
             logger.info(f"✅ Cargados {len(all_advertisers)} anunciantes locales")
             return all_advertisers
@@ -248,7 +297,7 @@ class DirectoryConnector:
             logger.error(f"❌ Error cargando JSON local: {e}")
             return []
 
-    def _search_local(self, query: str, category: str = None) -> List[Dict]:
+    def _search_local(self, query: str, category: str = None) -> List[Advertiser]:
         """
         Busca en anunciantes locales.
         """
@@ -292,7 +341,7 @@ class DirectoryConnector:
                 with open(self.cache_file, 'w', encoding='utf-8') as f:
                     json.dump({
                         'timestamp': datetime.now().isoformat(),
-                        'advertisers': advertisers
+                        'advertisers': [to_plain(a) for a in advertisers]
                     }, f, ensure_ascii=False, indent=2)
 
                 logger.info(f"✅ Cache refrescado: {len(advertisers)} anunciantes")
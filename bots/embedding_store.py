@@ -0,0 +1,103 @@
+# bots/embedding_store.py
+"""
+Caché persistente de los embeddings de categorías.
+
+Evita que cada worker de gunicorn vuelva a codificar las descripciones de
+categorías al arrancar: la matriz se guarda como .npy junto a un .json con
+los metadatos (nombre y descripción de cada fila) y se carga con mmap.
+La clave del fichero es el nombre del modelo + hash de las descripciones,
+así que cualquier cambio en category_patterns o en el modelo invalida la caché.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .logger import logger
+
+
+def descriptions_hash(descriptions: Dict[str, str]) -> str:
+    """Hash estable de las descripciones {categoría: descripción}."""
+    payload = json.dumps(descriptions, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_paths(cache_dir: Path, model_name: str, digest: str) -> Tuple[Path, Path]:
+    safe_model = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    stem = f"category_embeddings-{safe_model}-{digest}"
+    return cache_dir / f"{stem}.npy", cache_dir / f"{stem}.json"
+
+
+def load_category_embeddings(cache_dir: Path, model_name: str,
+                             digest: str) -> Optional[Tuple[List[Dict], "np.ndarray"]]:
+    """
+    Carga (category_info, matriz) desde disco con mmap.
+
+    Returns:
+        None si no hay caché válida para este modelo y hash.
+    """
+    if np is None:
+        return None
+
+    matrix_path, info_path = _cache_paths(Path(cache_dir), model_name, digest)
+    if not matrix_path.exists() or not info_path.exists():
+        return None
+
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode="r")
+        categories = meta.get("categories", [])
+        if (
+            meta.get("model") != model_name
+            or meta.get("hash") != digest
+            or matrix.ndim != 2
+            or matrix.shape[0] != len(categories)
+        ):
+            logger.warning(f"Caché de embeddings inconsistente, se recalcula: {matrix_path}")
+            return None
+        return categories, matrix
+    except Exception as e:
+        logger.warning(f"Error cargando caché de embeddings: {e}")
+        return None
+
+
+def save_category_embeddings(cache_dir: Path, model_name: str, digest: str,
+                             categories: List[Dict], matrix: "np.ndarray") -> None:
+    """
+    Persiste la matriz y sus metadatos con escritura atómica (tmp + rename).
+    El .json se escribe al final: sin él la caché se considera inexistente.
+    """
+    if np is None:
+        return
+
+    cache_dir = Path(cache_dir)
+    matrix_path, info_path = _cache_paths(cache_dir, model_name, digest)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_matrix = matrix_path.with_suffix(f".npy.{os.getpid()}.tmp")
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(tmp_matrix, matrix_path)
+
+        tmp_info = info_path.with_suffix(f".json.{os.getpid()}.tmp")
+        with open(tmp_info, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": model_name,
+                "hash": digest,
+                "categories": categories,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_info, info_path)
+
+        logger.info(f"Embeddings de categorías guardados en {matrix_path}")
+    except Exception as e:
+        logger.warning(f"No se pudo guardar la caché de embeddings: {e}")
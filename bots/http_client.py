@@ -0,0 +1,160 @@
+# bots/http_client.py
+"""
+Cliente HTTP compartido con pool de conexiones (keep-alive).
+
+- Interfaz síncrona: requests.Session con un HTTPAdapter que limita las
+  conexiones reutilizables por host.
+- Interfaz asíncrona: httpx.AsyncClient (HTTP/2 si el paquete 'h2' está
+  instalado), uno por event loop; el de un loop ya cerrado se cierra en la
+  siguiente llamada async para no dejar sus conexiones abiertas. Si httpx
+  no está disponible, la versión async ejecuta la petición síncrona en un
+  thread.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .logger import logger
+
+# httpx es opcional: sin él, las llamadas async delegan en la sesión síncrona
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PooledHTTPClient:
+    """
+    Reutiliza conexiones TCP+TLS entre llamadas.
+
+    Args:
+        max_connections_per_host: conexiones keep-alive por host
+        max_hosts: número de hosts distintos con pool propio
+        timeout: timeout por defecto (segundos) si la llamada no indica otro
+    """
+
+    def __init__(self, max_connections_per_host: int = 10,
+                 max_hosts: int = 10, timeout: float = 5):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_hosts = max_hosts
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=max_connections_per_host,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._async_clients: Dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+        self._async_lock = threading.Lock()
+
+    # --- Interfaz síncrona ---
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    # --- Interfaz asíncrona ---
+
+    def _get_async_client(self):
+        """
+        Un AsyncClient por event loop (los de httpx no se comparten entre loops).
+
+        Returns:
+            (cliente del loop actual, [(loop cerrado, su cliente)] por cerrar)
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections_per_host * self.max_hosts,
+                        max_keepalive_connections=self.max_connections_per_host,
+                    ),
+                )
+            stale = [
+                (other, self._async_clients.pop(other))
+                for other in list(self._async_clients) if other.is_closed()
+            ]
+        return client, stale
+
+    @staticmethod
+    async def _close_async_client(client, loop: asyncio.AbstractEventLoop) -> None:
+        """Cierra un AsyncClient en su loop si sigue vivo, o aquí si ya terminó."""
+        try:
+            if loop.is_running() and loop is not asyncio.get_running_loop():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            else:
+                await client.aclose()
+        except Exception as e:
+            # Con su loop cerrado httpx cierra los sockets pero falla al
+            # notificarlo a ese loop
+            logger.debug(f"Cierre de cliente HTTP async: {e}")
+
+    async def arequest(self, method: str, url: str, **kwargs):
+        if httpx is None:
+            return await asyncio.to_thread(self.request, method, url, **kwargs)
+        kwargs.setdefault("timeout", self.timeout)
+        client, stale = self._get_async_client()
+        for loop, stale_client in stale:
+            await self._close_async_client(stale_client, loop)
+        return await client.request(method, url, **kwargs)
+
+    async def aget(self, url: str, **kwargs):
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs):
+        return await self.arequest("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Cierra los AsyncClient de todos los loops."""
+        with self._async_lock:
+            clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        for loop, client in clients:
+            await self._close_async_client(client, loop)
+
+
+# Instancia global del cliente
+_http_client: Optional[PooledHTTPClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Singleton para compartir el pool de conexiones en todo el proceso."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = PooledHTTPClient(
+                    max_connections_per_host=int(os.getenv("HTTP_POOL_MAXSIZE", "10")),
+                )
+                logger.info(
+                    f"Cliente HTTP compartido inicializado (HTTP/2 async: {HTTP2_AVAILABLE})"
+                )
+    return _http_client
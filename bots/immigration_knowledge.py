@@ -0,0 +1,191 @@
+# bots/immigration_knowledge.py
+"""
+Base de conocimiento de inmigración (data/immigration_info.json).
+
+Carga el catálogo de países de ``visados_espana.paises`` y construye un
+índice alias -> código de país con claves normalizadas (minúsculas, sin
+acentos, tokenizadas). Cada país aporta como alias su clave, su ``nombre``
+y la lista opcional ``alias`` del JSON ("EEUU", "UK", "United States"...).
+
+Resolver el país de un texto cuesta una búsqueda en el índice por token
+(probando primero los n-gramas más largos), en lugar de recorrer todos los
+países con comprobaciones de subcadena. Si el fichero cambia en disco se
+recarga en caliente (comprobando su mtime como mucho cada pocos segundos).
+
+Las fichas de visado que muestra el bot de inmigración también viven aquí:
+``ficha.<idioma>`` de cada país y la genérica de ``visados_espana.otros``,
+cuyos alias ("Otro", "Other"...) se resuelven al código ``OTHER_CODE``.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .logger import logger
+from .search_index import tokenize
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "immigration_info.json"
+RELOAD_CHECK_SECONDS = float(os.getenv("IMMIGRATION_INFO_RELOAD_SECONDS", "5"))
+# Código de la ficha genérica (visados_espana.otros); no es un país
+OTHER_CODE = "otros"
+
+
+def alias_key(text: str) -> str:
+    """Clave del índice: tokens normalizados separados por un espacio."""
+    return " ".join(tokenize(text))
+
+
+class ImmigrationKnowledgeBase:
+    """Catálogo de países con índice de alias y recarga por mtime."""
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = RELOAD_CHECK_SECONDS):
+        self.path = Path(path) if path else DATA_PATH
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        # Se reemplazan juntos en cada recarga (lecturas sin bloqueo)
+        self._data: Dict = {}
+        self._countries: Dict[str, Dict] = {}
+        self._index: Dict[str, str] = {}
+        self._max_alias_tokens = 1
+        self.reload()
+
+    # --- Carga ---
+
+    def reload(self) -> bool:
+        """Lee el fichero y reconstruye el índice. Devuelve False si falla."""
+        with self._lock:
+            try:
+                mtime = self.path.stat().st_mtime
+                with self.path.open(encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                # Se conserva la última versión válida
+                logger.warning(f"⚠️ No se pudo cargar {self.path.name}: {e}")
+                self._mtime = None
+                return False
+
+            countries: Dict[str, Dict] = {}
+            index: Dict[str, str] = {}
+            max_tokens = 1
+            visados = data.get("visados_espana", {})
+            entries = [(key, entry.get("codigo") or key, entry)
+                       for key, entry in visados.get("paises", {}).items()]
+            # La ficha genérica va al final: un país real gana cualquier alias
+            entries.append((OTHER_CODE, OTHER_CODE, visados.get("otros", {})))
+            for key, code, entry in entries:
+                if code != OTHER_CODE:
+                    countries[code] = entry
+                for alias in [key, entry.get("nombre", ""), *entry.get("alias", [])]:
+                    normalized = alias_key(alias)
+                    if not normalized:
+                        continue
+                    # El primer país que declara un alias se lo queda
+                    index.setdefault(normalized, code)
+                    max_tokens = max(max_tokens, normalized.count(" ") + 1)
+
+            self._data = data
+            self._countries = countries
+            self._index = index
+            self._max_alias_tokens = max_tokens
+            self._mtime = mtime
+            self.version += 1
+            logger.info(f"🌍 Base de inmigración cargada: {len(countries)} países, {len(index)} alias")
+            return True
+
+    def refresh(self) -> None:
+        """Recarga si el fichero ha cambiado (comprobación limitada en el tiempo)."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    # --- Consultas ---
+
+    @property
+    def data(self) -> Dict:
+        self.refresh()
+        return self._data
+
+    @property
+    def countries(self) -> Dict[str, Dict]:
+        """Ficha de cada país por código (``US``, ``UK``...)."""
+        self.refresh()
+        return self._countries
+
+    def get_country(self, code: str) -> Optional[Dict]:
+        return self.countries.get(code)
+
+    def visa_cards(self, language: str) -> List[Tuple[Optional[str], Dict]]:
+        """
+        Fichas de visado en ``language``, en el orden del fichero.
+
+        Devuelve (código, ficha) por cada país que tenga ficha en ese idioma
+        y, al final, la genérica de ``visados_espana.otros`` con ``OTHER_CODE``.
+        """
+        self.refresh()
+        cards = [
+            (code, entry["ficha"][language])
+            for code, entry in self._countries.items()
+            if entry.get("ficha", {}).get(language)
+        ]
+        other = self._data.get("visados_espana", {}).get("otros", {}).get("ficha", {}).get(language)
+        if other:
+            cards.append((OTHER_CODE, other))
+        return cards
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Código del país cuyo alias coincide exactamente con ``name``."""
+        self.refresh()
+        return self._index.get(alias_key(name))
+
+    def find_countries(self, text: str) -> List[str]:
+        """
+        Códigos de los países mencionados en ``text``, en orden de aparición.
+
+        Recorre los tokens una vez; en cada posición prueba el n-grama más
+        largo posible (hasta la longitud del alias más largo) y avanza tras
+        la primera coincidencia.
+        """
+        self.refresh()
+        index = self._index
+        max_tokens = self._max_alias_tokens
+        tokens = tokenize(text)
+
+        found: List[str] = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            for size in range(min(max_tokens, n - i), 0, -1):
+                code = index.get(" ".join(tokens[i:i + size]) if size > 1 else tokens[i])
+                if code is not None:
+                    if code not in found:
+                        found.append(code)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+
+# Instancia global
+_knowledge_base: Optional[ImmigrationKnowledgeBase] = None
+
+
+def get_immigration_knowledge_base() -> ImmigrationKnowledgeBase:
+    """Singleton de la base de conocimiento de inmigración."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = ImmigrationKnowledgeBase()
+    return _knowledge_base
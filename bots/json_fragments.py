@@ -0,0 +1,98 @@
+# bots/json_fragments.py
+"""
+Fragmentos JSON pre-codificados para la respuesta de /api/query.
+
+Las partes estáticas de la respuesta (registros de anunciantes, resúmenes
+de guías, tips por categoría) se codifican una sola vez y se guardan junto
+al propio objeto. ``encode_payload`` recorre el sobre de la respuesta e
+inserta esos bytes tal cual, codificando solo lo que cambia por petición.
+
+Usa orjson si está instalado; si no, json de la librería estándar.
+"""
+
+import json
+from typing import Any
+
+# orjson es opcional: sin él se usa json (más lento, mismo resultado)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto en UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} es de solo lectura (contiene JSON pre-codificado)")
+
+
+class EncodedDict(dict):
+    """dict de solo lectura que guarda su propia codificación JSON."""
+
+    __slots__ = ("_encoded",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded = None
+
+    @property
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = dumps(dict(self))
+        return self._encoded
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+
+class EncodedList(list):
+    """list de solo lectura que guarda su propia codificación JSON."""
+
+    __slots__ = ("_encoded",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._encoded = None
+
+    @property
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = b"[" + b",".join(_encode(item) for item in self) + b"]"
+        return self._encoded
+
+    __setitem__ = __delitem__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __iadd__ = __imul__ = _readonly
+
+
+def _encode(obj: Any) -> bytes:
+    if isinstance(obj, (EncodedDict, EncodedList)):
+        return obj.encoded
+
+    if isinstance(obj, dict):
+        # Sin contenedores dentro: se codifica entero de una vez
+        if not any(isinstance(v, (dict, list, tuple)) for v in obj.values()):
+            return dumps(obj)
+        return b"{" + b",".join(
+            dumps(str(key)) + b":" + _encode(value) for key, value in obj.items()
+        ) + b"}"
+
+    if isinstance(obj, (list, tuple)):
+        if not any(isinstance(v, (dict, list, tuple)) for v in obj):
+            return dumps(obj)
+        return b"[" + b",".join(_encode(item) for item in obj) + b"]"
+
+    return dumps(obj)
+
+
+def encode_payload(payload: Any) -> bytes:
+    """Codifica la respuesta completa reutilizando los fragmentos pre-codificados."""
+    return _encode(payload)
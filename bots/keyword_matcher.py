@@ -0,0 +1,105 @@
+# bots/keyword_matcher.py
+"""
+Matcher multi-patrón (Aho-Corasick) para clasificación por palabras clave.
+
+Se construye una sola vez con todos los patrones y encuentra todas las
+coincidencias (incluidas las solapadas) en una única pasada sobre el texto,
+con coste O(len(texto) + coincidencias) independientemente del número de
+patrones registrados.
+"""
+
+from collections import deque
+from typing import Any, Dict, Hashable, List, Set
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick con semántica de subcadena (igual que ``kw in texto``).
+
+    Cada patrón puede llevar asociadas varias etiquetas arbitrarias; ``find``
+    devuelve el conjunto de patrones presentes y ``tags`` permite recuperar
+    sus etiquetas.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._tags: Dict[str, List[Any]] = {}
+        self._compiled = True
+
+    def add(self, pattern: str, tag: Hashable = None) -> None:
+        """Registra un patrón (y opcionalmente una etiqueta asociada)."""
+        if not pattern:
+            return
+
+        if pattern not in self._tags:
+            self._tags[pattern] = []
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = nxt
+                state = nxt
+            self._output[state].append(pattern)
+            self._compiled = False
+
+        if tag is not None:
+            self._tags[pattern].append(tag)
+
+    def compile(self) -> "KeywordMatcher":
+        """Calcula los enlaces de fallo (BFS). Se llama automáticamente."""
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Hereda las salidas del estado de fallo (patrones sufijo)
+                self._output[nxt] = self._output[nxt] + [
+                    p for p in self._output[self._fail[nxt]]
+                    if p not in self._output[nxt]
+                ]
+
+        self._compiled = True
+        return self
+
+    def find(self, text: str) -> Set[str]:
+        """Devuelve el conjunto de patrones que aparecen en ``text``."""
+        if not self._compiled:
+            self.compile()
+
+        found: Set[str] = set()
+        if not text:
+            return found
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def tags(self, pattern: str) -> List[Any]:
+        """Etiquetas registradas para un patrón."""
+        return self._tags.get(pattern, [])
+
+    def __len__(self) -> int:
+        return len(self._tags)
@@ -2,13 +2,370 @@
 """
 Integración con APIs de mapas para buscar servicios locales.
 Prioriza siempre los anunciantes pagos sobre los resultados gratuitos.
+
+Con varios workers de gunicorn cada proceso tiene su propio MapsClient,
+pero comparten por disco lo que importa para Nominatim: el siguiente hueco
+del rate limit (fichero bajo bloqueo, así el ritmo de 1 req/s es el total
+de todos los procesos), el caché de resultados (cada proceso recoge lo que
+escriben los demás) y la precarga, que solo ejecuta el proceso que toma su
+bloqueo. Sin ``fcntl`` (Windows) todo esto queda por proceso.
 """
 
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
 import requests
-from typing import List, Dict
 
-def search_healthcare_barcelona(query: str = "hospital", limit: int = 5) -> List[Dict]:
+from .http_client import get_http_client
+from .logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: bloqueos solo dentro del proceso
+    fcntl = None
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {
+    "User-Agent": "RevistaExpatsAI/1.0 (contact@revistaexpats.com)"
+}
+# Política de uso de Nominatim: como máximo 1 petición por segundo
+NOMINATIM_MIN_INTERVAL_SECONDS = float(os.getenv("NOMINATIM_MIN_INTERVAL_SECONDS", "1.0"))
+
+# Términos que usa el bot de salud (se precargan en background)
+HEALTHCARE_SEARCH_TERMS = ("hospital", "dentist", "pharmacy", "clinic", "emergency hospital")
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache"
+MAPS_CACHE_PATH = CACHE_DIR / "maps_cache.json"
+MAPS_CACHE_TTL_SECONDS = int(os.getenv("MAPS_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Siguiente hueco libre de Nominatim, compartido por todos los workers
+NOMINATIM_RATE_STATE_PATH = CACHE_DIR / "nominatim_rate.lock"
+# Cada cuántos segundos se mira si otro proceso actualizó el caché en disco
+MAPS_CACHE_RELOAD_SECONDS = 5.0
+
+
+@contextmanager
+def _file_lock(path: Path, blocking: bool = True):
+    """
+    Bloqueo exclusivo entre procesos sobre ``path`` (fcntl.flock).
+
+    Devuelve el fichero abierto, o None si ``blocking`` es False y otro
+    proceso tiene el bloqueo. Sin fcntl no bloquea nada.
+    """
+    if fcntl is None:
+        yield None
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+            return
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Espaciado mínimo entre peticiones, compartido por threads.
+
+    Cada llamada reserva el siguiente hueco libre y espera hasta él. Con
+    ``state_path`` el hueco se guarda en ese fichero bajo bloqueo, así que
+    el límite se reparte entre todos los procesos que usen el mismo fichero.
+    """
+
+    def __init__(self, min_interval: float = NOMINATIM_MIN_INTERVAL_SECONDS,
+                 state_path: Optional[Path] = None):
+        self.min_interval = min_interval
+        self.state_path = Path(state_path) if state_path else None
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            if self.state_path is not None and fcntl is not None:
+                try:
+                    return self._reserve_shared()
+                except OSError as e:
+                    logger.warning(f"⚠️ Rate limit compartido no disponible, se usa el local: {e}")
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            return slot - now
+
+    def _reserve_shared(self) -> float:
+        """Reserva sobre el fichero compartido (reloj de pared: válido entre procesos)."""
+        with _file_lock(self.state_path) as f:
+            f.seek(0)
+            try:
+                next_slot = float(f.read().strip() or 0)
+            except ValueError:
+                next_slot = 0.0
+            now = time.time()
+            slot = max(now, next_slot)
+            f.seek(0)
+            f.truncate()
+            f.write(repr(slot + self.min_interval))
+            f.flush()
+            return slot - now
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class MapsCache:
+    """
+    Caché persistente (JSON) de resultados por término de búsqueda.
+
+    Las entradas caducadas se siguen sirviendo (stale-while-revalidate);
+    ``get`` indica si la entrada está fresca para que el llamador decida
+    si refrescarla en background. El fichero se comparte entre procesos:
+    si otro lo reescribe se recarga (comprobando su mtime como mucho cada
+    ``reload_interval`` segundos) y ``set`` fusiona con lo que haya en disco.
+    """
+
+    def __init__(self, path: Path = MAPS_CACHE_PATH, ttl: int = MAPS_CACHE_TTL_SECONDS,
+                 reload_interval: float = MAPS_CACHE_RELOAD_SECONDS):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = self._stat_mtime()
+        self._next_check = time.monotonic() + reload_interval
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> None:
+        """Recarga el fichero si otro proceso lo ha reescrito."""
+        now = time.monotonic()
+        if now < self._next_check and not force:
+            return
+        self._next_check = now + self.reload_interval
+        mtime = self._stat_mtime()
+        if mtime is not None and mtime != self._mtime:
+            with self._lock:
+                self._mtime = mtime
+                self._entries = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de mapas ilegible, se ignora: {e}")
+            return {}
+
+    def _save(self) -> None:
+        """Escribe el caché de forma atómica (tmp + rename)."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".json.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando caché de mapas: {e}")
+
+    def get(self, term: str, limit: int) -> Optional[Tuple[List[Dict], bool]]:
+        """(resultados, fresco) o None si no hay entrada suficiente para ``limit``."""
+        self.refresh()
+        entry = self._entries.get(term)
+        if entry is None:
+            return None
+        results = entry["results"]
+        # Una entrada pedida con menos resultados no sirve para un limit mayor
+        if entry["limit"] < limit and len(results) >= entry["limit"]:
+            return None
+        fresh = time.time() - entry["fetched_at"] < self.ttl
+        return [dict(r) for r in results[:limit]], fresh
+
+    def age(self, term: str) -> Optional[float]:
+        self.refresh()
+        entry = self._entries.get(term)
+        return None if entry is None else time.time() - entry["fetched_at"]
+
+    def set(self, term: str, limit: int, results: List[Dict]) -> None:
+        lock_path = self.path.with_suffix(".json.lock")
+        with self._lock, _file_lock(lock_path):
+            # Partir de lo que hay en disco para no pisar entradas de otro proceso
+            entries = self._load() if self._stat_mtime() != self._mtime else self._entries
+            self._entries = {
+                **entries,
+                term: {"fetched_at": time.time(), "limit": limit, "results": results},
+            }
+            self._save()
+            self._mtime = self._stat_mtime()
+
+
+def _format_nominatim_results(data: List[Dict]) -> List[Dict]:
+    """Formatea los resultados de Nominatim al formato de anunciantes."""
+    formatted_results = []
+    for place in data:
+        result = {
+            "nombre": place.get("display_name", "").split(",")[0],
+            "descripcion": f"Servicio médico encontrado en {place.get('address', {}).get('suburb', 'Barcelona')}",
+            "contacto": "Información disponible en Google Maps",
+            "beneficios": ["Servicio público/privado", "Ubicación verificada"],
+            "precio": "Consultar tarifas",
+            "idiomas": "Consultar disponibilidad",
+            "ubicacion": place.get("display_name", "Barcelona"),
+            "lat": place.get("lat"),
+            "lon": place.get("lon"),
+            "es_anunciante": False  # Marca para distinguir de anunciantes pagos
+        }
+        formatted_results.append(result)
+    return formatted_results
+
+
+def _nominatim_params(query: str, limit: int) -> Dict:
+    return {
+        "q": f"{query} Barcelona Spain",
+        "format": "json",
+        "limit": limit,
+        "addressdetails": 1,
+        "extratags": 1
+    }
+
+
+class MapsClient:
+    """
+    Búsquedas en Nominatim (OpenStreetMap) con caché, rate limit y refresco
+    en background.
+
+    En régimen estable los términos del bot de salud están en caché
+    (precargados por ``prefetch``), así que ``search(..., wait=False)`` nunca
+    toca la red dentro de una petición: una entrada caducada se devuelve tal
+    cual y se refresca en background; un fallo de caché devuelve [] y lanza
+    la descarga para la siguiente consulta.
+    """
+
+    def __init__(self, cache: Optional[MapsCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None, timeout: float = 5):
+        self.http = get_http_client()
+        self.cache = cache if cache is not None else MapsCache()
+        self.rate_limiter = rate_limiter or RateLimiter(state_path=NOMINATIM_RATE_STATE_PATH)
+        self.timeout = timeout
+        # Un solo worker: las peticiones a Nominatim van en serie de todos modos
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maps-refresh")
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+
+    # --- Descarga ---
+
+    def fetch(self, query: str, limit: int = 5) -> Optional[List[Dict]]:
+        """Consulta Nominatim (bloqueante) y guarda el resultado en caché."""
+        try:
+            self.rate_limiter.acquire()
+            response = self.http.get(
+                NOMINATIM_URL,
+                params=_nominatim_params(query, limit),
+                headers=NOMINATIM_HEADERS,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            results = _format_nominatim_results(response.json()[:limit])
+        except Exception as e:
+            logger.warning(f"⚠️  Error buscando en Maps: {e}")
+            return None
+        self.cache.set(query, limit, results)
+        return [dict(r) for r in results]
+
+    def refresh_in_background(self, query: str, limit: int = 5) -> bool:
+        """Programa la descarga de un término (una sola vez aunque se pida varias)."""
+        with self._inflight_lock:
+            if query in self._inflight:
+                return False
+            self._inflight.add(query)
+
+        def run():
+            try:
+                self.fetch(query, limit)
+            finally:
+                with self._inflight_lock:
+                    self._inflight.discard(query)
+
+        self._executor.submit(run)
+        return True
+
+    # --- Búsqueda ---
+
+    def search(self, query: str = "hospital", limit: int = 5, wait: bool = True) -> List[Dict]:
+        """
+        Resultados desde caché; si faltan, descarga (``wait=True``) o los
+        pide en background y devuelve [] (``wait=False``).
+        """
+        cached = self.cache.get(query, limit)
+        if cached is not None:
+            results, fresh = cached
+            if not fresh:
+                self.refresh_in_background(query, limit)
+            return results
+
+        if not wait:
+            self.refresh_in_background(query, limit)
+            return []
+        return self.fetch(query, limit) or []
+
+    def prefetch(self, terms=HEALTHCARE_SEARCH_TERMS, limit: int = 5) -> int:
+        """
+        Calienta el caché con los términos del bot de salud.
+
+        Solo descarga los términos ausentes o con más de la mitad del TTL
+        consumido, para que las consultas nunca encuentren la entrada
+        caducada. Si otro proceso ya está precargando no hace nada (los
+        demás workers recogen sus resultados del caché en disco). Devuelve
+        cuántos términos se descargaron.
+        """
+        lock_path = self.cache.path.with_suffix(".prefetch.lock")
+        with _file_lock(lock_path, blocking=False) as locked:
+            if locked is None and fcntl is not None:
+                logger.info("Precarga de Maps en curso en otro proceso, se omite")
+                return 0
+            self.cache.refresh(force=True)
+            refreshed = 0
+            for term in terms:
+                age = self.cache.age(term)
+                if age is not None and age < self.cache.ttl / 2 and self.cache.get(term, limit):
+                    continue
+                if self.fetch(term, limit) is not None:
+                    refreshed += 1
+            return refreshed
+
+
+# Instancia global
+_maps_client: Optional[MapsClient] = None
+_maps_client_lock = threading.Lock()
+
+
+def get_maps_client() -> MapsClient:
+    """Singleton del cliente de mapas (caché y rate limit compartidos)."""
+    global _maps_client
+    if _maps_client is None:
+        with _maps_client_lock:
+            if _maps_client is None:
+                _maps_client = MapsClient()
+    return _maps_client
+
+
+def search_healthcare_barcelona(query: str = "hospital", limit: int = 5, wait: bool = True) -> List[Dict]:
     """
     Busca servicios de salud en Barcelona usando Nominatim (OpenStreetMap).
     API gratuita, sin necesidad de clave. Alternativa a Google Places.
@@ -16,50 +373,18 @@ def search_healthcare_barcelona(query: str = "hospital", limit: int = 5) -> List
     Args:
         query: Tipo de servicio (hospital, clinic, pharmacy, etc.)
         limit: Número máximo de resultados
+        wait: Si no hay caché, esperar a la descarga (True) o devolver []
+              y descargar en background (False)
 
     Returns:
         Lista de diccionarios con información de los lugares
     """
-    try:
-        # Nominatim API (OpenStreetMap) - No requiere API key
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "q": f"{query} Barcelona Spain",
-            "format": "json",
-            "limit": limit,
-            "addressdetails": 1,
-            "extratags": 1
-        }
-        headers = {
-            "User-Agent": "RevistaExpatsAI/1.0 (contact@revistaexpats.com)"
-        }
+    return get_maps_client().search(query, limit=limit, wait=wait)
 
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        response.raise_for_status()
-        data = response.json()
 
-        # Formatear resultados al formato de anunciantes
-        formatted_results = []
-        for place in data:
-            result = {
-                "nombre": place.get("display_name", "").split(",")[0],
-                "descripcion": f"Servicio médico encontrado en {place.get('address', {}).get('suburb', 'Barcelona')}",
-                "contacto": "Información disponible en Google Maps",
-                "beneficios": ["Servicio público/privado", "Ubicación verificada"],
-                "precio": "Consultar tarifas",
-                "idiomas": "Consultar disponibilidad",
-                "ubicacion": place.get("display_name", "Barcelona"),
-                "lat": place.get("lat"),
-                "lon": place.get("lon"),
-                "es_anunciante": False  # Marca para distinguir de anunciantes pagos
-            }
-            formatted_results.append(result)
-
-        return formatted_results
-
-    except Exception as e:
-        print(f"⚠️  Error buscando en Maps: {e}")
-        return []
+def prefetch_healthcare_searches() -> int:
+    """Precarga en caché los términos de búsqueda del bot de salud."""
+    return get_maps_client().prefetch(HEALTHCARE_SEARCH_TERMS)
 
 
 def search_google_places(query: str, location: str = "Barcelona, Spain") -> List[Dict]:
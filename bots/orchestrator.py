@@ -2,6 +2,7 @@
 import json
 import os
 import random
+import warnings
 from pathlib import Path
 
 # ML dependencies para clasificación semántica
@@ -20,11 +21,21 @@ except ImportError:
 if os.getenv("PRODUCTION", "false").lower() == "true" or os.getenv("DISABLE_ML", "false").lower() == "true":
     ML_AVAILABLE = False
 
-from .utils import normalize
+from .utils import normalize, register_search_profiles
+from .advertiser import Advertiser, to_plain
+from .json_fragments import EncodedList
+from .keyword_matcher import KeywordMatcher
+from .lru_cache import LRUCache
+from .embedding_store import (
+    descriptions_hash,
+    load_category_embeddings,
+    save_category_embeddings,
+)
 from .content_manager import ContentManager
 from .logger import logger
 from .rss_manager import get_rss_manager
 from .directory_connector import get_directory_connector
+from .recommendation_tracker import get_recommendation_tracker
 
 # Importa bots disponibles
 from .bot_accommodation import responder_consulta as acc_responder
@@ -34,7 +45,14 @@ from .bot_education import responder_consulta as edu_responder
 from .bot_healthcare import responder_consulta as hea_responder
 from .bot_work import responder_consulta as work_responder
 from .bot_service import responder_consulta as srv_responder
-from .bot_immigration import ImmigrationBot
+from .bot_immigration import get_immigration_bot
+
+
+# Caché de embeddings de preguntas (solo memoiza model.encode). Es de
+# módulo para que sobreviva a recargas/reconstrucciones del orquestador.
+_question_embedding_cache = LRUCache(
+    maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+)
 
 
 def generic_responder(pregunta, anunciantes, language="en"):
@@ -60,9 +78,24 @@ class Orchestrator:
         self.enable_recommendation_tracking = (
             os.getenv("ENABLE_RECOMMENDATION_TRACKING", "false").lower() == "true"
         )
+        # Los POST de tracking salen del camino de la petición: se encolan
+        # y un worker los envía por lotes
+        self.recommendation_tracker = (
+            get_recommendation_tracker() if self.enable_recommendation_tracking else None
+        )
 
         # Cargar anunciantes desde directorio real (o JSON local)
-        self.advertisers = self._load_advertisers_from_directory()
+        self.advertisers = self._load_advertiser_store()
+        self.advertisers_version = 0
+
+        # --- CACHÉ DE RESPUESTAS (LRU + TTL) ---
+        # Clave: (pregunta normalizada, idioma). Se invalida al recargar
+        # anunciantes, guías o artículos RSS.
+        self.response_cache = LRUCache(
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600")),
+        )
+        self._response_cache_generation = None
 
         # --- INICIALIZAR GESTOR DE CONTENIDO EDITORIAL ---
         self.content_manager = ContentManager()
@@ -72,9 +105,9 @@ class Orchestrator:
 
         # Modelo semántico para clasificación inteligente
         # Modelo semántico para clasificación inteligente (opcional)
+        self.model_name = 'paraphrase-multilingual-MiniLM-L12-v2'
         if ML_AVAILABLE:
-            model_name = 'paraphrase-multilingual-MiniLM-L12-v2'
-            self.model = SentenceTransformer(model_name)
+            self.model = SentenceTransformer(self.model_name)
         else:
             self.model = None
             logger.warning("Torch/sentence-transformers no disponible. Clasificación por palabras clave.")
@@ -483,31 +516,38 @@ class Orchestrator:
         # --- PRE-CÁLCULO DE EMBEDDINGS (solo si ML disponible) ---
         self.category_info = []
         self.category_embeddings_tensor = None
+        self.category_embeddings_normalized = None
         if ML_AVAILABLE and self.model is not None:
-            all_categories = set(self.category_patterns.get("es", {}).keys()) | set(self.category_patterns.get("en", {}).keys())
-            for category in all_categories:
-                keywords_es = self.category_patterns.get("es", {}).get(category, [])
-                keywords_en = self.category_patterns.get("en", {}).get(category, [])
-                description = f"Servicios sobre {category.lower()}: " + ", ".join(keywords_es + keywords_en)
-                self.category_info.append({
-                    "name": category,
-                    "description": description,
-                    "embedding": self.model.encode(description, convert_to_tensor=True)
-                })
-            self.category_embeddings_tensor = torch.stack([cat["embedding"] for cat in self.category_info])
-            logger.info(f"Tensor de embeddings pre-calculado: {self.category_embeddings_tensor.shape}")
+            self._load_category_embeddings()
+        if self.category_embeddings_tensor is not None:
+            # Normalizado una vez: el coseno por lote es un único producto de matrices
+            self.category_embeddings_normalized = torch.nn.functional.normalize(
+                self.category_embeddings_tensor, p=2, dim=1
+            )
         else:
             logger.info("Clasificación semántica deshabilitada. Usando solo palabras clave.")
 
         # --- OPTIMIZACIÓN: ÍNDICE DE NOMBRES DE NEGOCIOS ---
         # Crea un índice para búsqueda O(1) en lugar de O(n²)
-        self.business_name_index = {}
-        for category, businesses in self.advertisers.items():
-            for business in businesses:
-                name = normalize(business.get('nombre', ''))
-                if name:
-                    self.business_name_index[name] = (category, business)
-        logger.info(f"Índice de negocios creado: {len(self.business_name_index)} nombres indexados")
+        self._build_business_name_index()
+
+        # --- PRIORIDAD CRÍTICA: Palabras clave de inmigración ---
+        # NIE, visados, mudanza son términos muy específicos que deben ir a Immigration
+        self.critical_immigration_keywords = {
+                 'es': ['nie', 'visado', 'visa', 'mudarme', 'mudanza', 'residencia',
+                     'empadronamiento', 'empadronar', 'empadronarme', 'trasladarme',
+                     'desde usa', 'desde reino unido', 'desde canada', 'desde australia',
+                     'inmigrar', 'emigrar', 'permiso de residencia', 'permiso residencia'],
+                 'en': ['nie', 'visa', 'residency', 'residence permit', 'relocat',
+                     'move to spain', 'moving to spain', 'from usa', 'from uk',
+                     'from canada', 'from australia', 'immigrat', 'emigrat',
+                     'registration padrón', 'padrón', 'empadronamiento']
+        }
+
+        # --- OPTIMIZACIÓN: AUTÓMATA ÚNICO DE PALABRAS CLAVE POR IDIOMA ---
+        # Palabras críticas, nombres de negocios y patrones de categoría en
+        # una sola pasada sobre la pregunta normalizada.
+        self._build_intent_matchers()
 
         # --- CONSEJOS RÁPIDOS POR CATEGORÍA ---
         self.tips_map = {
@@ -592,14 +632,93 @@ class Orchestrator:
             }
         }
 
+        # Tips pre-codificados: el mismo fragmento JSON se reutiliza en cada respuesta
+        self.tips_map = {
+            lang: {category: EncodedList(tips) for category, tips in by_category.items()}
+            for lang, by_category in self.tips_map.items()
+        }
+
+    def _build_business_name_index(self):
+        self.business_name_index = {}
+        for category, businesses in self.advertisers.items():
+            for business in businesses:
+                name = normalize(business.get('nombre', ''))
+                if name:
+                    self.business_name_index[name] = (category, business)
+        logger.info(f"Índice de negocios creado: {len(self.business_name_index)} nombres indexados")
+
+    def reload_advertisers(self):
+        """
+        Recarga los anunciantes (directorio o JSON local), reconstruye los
+        índices de clasificación e invalida la caché de respuestas.
+        """
+        self.advertisers = self._load_advertiser_store()
+        self._build_business_name_index()
+        self._build_intent_matchers()
+        self.advertisers_version += 1
+        logger.info("Anunciantes recargados")
+
+    def _load_category_embeddings(self):
+        """
+        Rellena category_info y category_embeddings_tensor.
+
+        Reutiliza la matriz persistida en data/cache/embeddings (mmap) si el
+        modelo y las descripciones no han cambiado; si no, la recalcula con
+        un único encode por lotes y la guarda para los siguientes arranques.
+        """
+        all_categories = sorted(
+            set(self.category_patterns.get("es", {}).keys()) | set(self.category_patterns.get("en", {}).keys())
+        )
+        descriptions = {}
+        for category in all_categories:
+            keywords_es = self.category_patterns.get("es", {}).get(category, [])
+            keywords_en = self.category_patterns.get("en", {}).get(category, [])
+            descriptions[category] = f"Servicios sobre {category.lower()}: " + ", ".join(keywords_es + keywords_en)
+
+        cache_dir = Path(os.getenv(
+            "EMBEDDINGS_CACHE_DIR",
+            str(Path(__file__).resolve().parent.parent / "data" / "cache" / "embeddings"),
+        ))
+        digest = descriptions_hash(descriptions)
+        cached = load_category_embeddings(cache_dir, self.model_name, digest)
+
+        if cached is not None:
+            categories, matrix = cached
+            with warnings.catch_warnings():
+                # El array mmap es de solo lectura; el tensor nunca se modifica
+                warnings.simplefilter("ignore", UserWarning)
+                tensor = torch.from_numpy(matrix)
+            self.category_embeddings_tensor = tensor.to(self.model.device)
+            logger.info(f"Embeddings de categorías cargados desde caché: {self.category_embeddings_tensor.shape}")
+        else:
+            categories = [
+                {"name": category, "description": descriptions[category]}
+                for category in all_categories
+            ]
+            self.category_embeddings_tensor = self.model.encode(
+                [descriptions[category] for category in all_categories],
+                convert_to_tensor=True,
+            )
+            save_category_embeddings(
+                cache_dir, self.model_name, digest, categories,
+                self.category_embeddings_tensor.detach().cpu().numpy(),
+            )
+            logger.info(f"Tensor de embeddings pre-calculado: {self.category_embeddings_tensor.shape}")
+
+        self.category_info = [
+            {**category, "embedding": self.category_embeddings_tensor[index]}
+            for index, category in enumerate(categories)
+        ]
+
     def _immigration_responder(self, question, anunciantes, language="es"):
         """
         Bot adapter para inmigración que devuelve formato compatible
         con orquestador.
         Incluye legal_ads en la respuesta.
         """
-        bot = ImmigrationBot(language=language)
-        mensaje = bot.get_response(question)
+        # Instancia compartida por idioma; el mensaje del bot no se usa aquí,
+        # solo sus firmas legales
+        bot = get_immigration_bot(language)
 
         return {
             "key_points": [
@@ -610,6 +729,18 @@ class Orchestrator:
             "json_data": bot.legal_ads  # Anunciantes legales de la revista
         }
 
+    def _load_advertiser_store(self) -> dict:
+        """
+        Carga los anunciantes y los guarda como tuplas (solo lectura).
+
+        Cada consulta construye sus propias listas a partir de estas tuplas,
+        así que el almacén no crece ni cambia entre peticiones.
+        """
+        categorized = self._load_advertisers_from_directory()
+        store = {category: tuple(items) for category, items in categorized.items()}
+        register_search_profiles(store)
+        return store
+
     def _load_advertisers_from_directory(self) -> dict:
         """
         Carga anunciantes desde el directorio real de Barcelona Metropolitan.
@@ -669,7 +800,14 @@ class Orchestrator:
             data_path = base_dir / "data" / "anunciantes.json"
 
             with open(str(data_path), 'r', encoding='utf-8') as f:
-                advertisers = json.load(f)
+                data = json.load(f)
+
+            # Normalizar claves una sola vez (registro Advertiser)
+            advertisers = {
+                category: [Advertiser.from_raw(item) for item in items if isinstance(item, dict)]
+                for category, items in data.items()
+                if isinstance(items, list)
+            }
 
             logger.info(f"✅ Anunciantes JSON cargados: {len(advertisers)} categorías")
             return advertisers
@@ -678,55 +816,160 @@ class Orchestrator:
             logger.error(f"❌ Error cargando JSON local: {e}")
             return {}
 
-    def classify_intent(self, question, language="en"):
-        qn = normalize(question)
+    def _build_intent_matchers(self):
+        """
+        Construye un KeywordMatcher por idioma con todas las palabras clave
+        que usa classify_intent. Las etiquetas indican el tipo de coincidencia:
+        ("critical", posición), ("business", posición) o ("category", nombre).
+        """
+        self._business_entries = [
+            (name, category, business)
+            for name, (category, business) in self.business_name_index.items()
+        ]
 
-        # --- PRIORIDAD CRÍTICA: Palabras clave de inmigración ---
-        # NIE, visados, mudanza son términos muy específicos que deben ir a Immigration
-        critical_immigration_keywords = {
-                 'es': ['nie', 'visado', 'visa', 'mudarme', 'mudanza', 'residencia',
-                     'empadronamiento', 'empadronar', 'empadronarme', 'trasladarme',
-                     'desde usa', 'desde reino unido', 'desde canada', 'desde australia',
-                     'inmigrar', 'emigrar', 'permiso de residencia', 'permiso residencia'],
-                 'en': ['nie', 'visa', 'residency', 'residence permit', 'relocat',
-                     'move to spain', 'moving to spain', 'from usa', 'from uk',
-                     'from canada', 'from australia', 'immigrat', 'emigrat',
-                     'registration padrón', 'padrón', 'empadronamiento']
+        def build(critical_keywords, category_keywords):
+            matcher = KeywordMatcher()
+            for position, keyword in enumerate(critical_keywords):
+                matcher.add(keyword, ("critical", position))
+            for position, (name, _, _) in enumerate(self._business_entries):
+                matcher.add(name, ("business", position))
+            for category, keywords in category_keywords.items():
+                for keyword in keywords:
+                    matcher.add(keyword, ("category", category))
+            return matcher.compile()
+
+        self._intent_matchers = {
+            lang: build(
+                self.critical_immigration_keywords.get(lang, self.critical_immigration_keywords['en']),
+                self.category_patterns.get(lang, {}),
+            )
+            for lang in self.category_patterns
         }
+        # Idiomas sin patrones propios: críticas en inglés y nombres de negocios
+        self._default_intent_matcher = build(self.critical_immigration_keywords['en'], {})
+
+    def _match_intent_keywords(self, qn, language):
+        """
+        Recorre una sola vez la pregunta normalizada y devuelve
+        (palabra crítica, (categoría, negocio), hits por categoría).
+        """
+        matcher = self._intent_matchers.get(language, self._default_intent_matcher)
+        critical_position = None
+        business_position = None
+        category_hits = {}
+        for pattern in matcher.find(qn):
+            for kind, value in matcher.tags(pattern):
+                if kind == "critical":
+                    if critical_position is None or value < critical_position:
+                        critical_position = value
+                elif kind == "business":
+                    if business_position is None or value < business_position:
+                        business_position = value
+                else:
+                    category_hits[value] = category_hits.get(value, 0) + 1
+
+        critical_keyword = None
+        if critical_position is not None:
+            keywords = self.critical_immigration_keywords.get(language, self.critical_immigration_keywords['en'])
+            critical_keyword = keywords[critical_position]
+
+        business_hit = None
+        if business_position is not None:
+            _, category, business = self._business_entries[business_position]
+            business_hit = (category, business)
+
+        return critical_keyword, business_hit, category_hits
 
-        keywords_to_check = critical_immigration_keywords.get(language, critical_immigration_keywords['en'])
-        for keyword in keywords_to_check:
-            if keyword in qn:
-                logger.debug(f"🔒 OVERRIDE CRÍTICO: '{keyword}' detectado → Immigration")
-                return "Immigration", 0.95, None
-
-        # --- LÓGICA DE BÚSQUEDA SEMÁNTICA ---
-        # --- LÓGICA DE BÚSQUEDA SEMÁNTICA (solo si ML disponible) ---
-        best_score = 0.0
-        best_match_category = None
-        if ML_AVAILABLE and self.model is not None and self.category_embeddings_tensor is not None:
-            question_embedding = self.model.encode(question, convert_to_tensor=True)
-            cos_scores = st_util.cos_sim(question_embedding, self.category_embeddings_tensor)[0]
-            top_result = int(cos_scores.argmax().item())
-            best_score = float(cos_scores[top_result].item())
-            best_match_category = self.category_info[top_result]["name"]
-            logger.debug(f"Clasificación semántica: '{best_match_category}' conf={best_score:.4f}")
+    def _semantic_matches(self, questions):
+        """
+        Clasificación semántica por lotes: un único encode para todas las
+        preguntas y un producto de matrices contra el tensor de categorías.
+
+        Returns:
+            Lista de (categoría, score) por pregunta; (None, 0.0) sin ML.
+        """
+        if not questions:
+            return []
+        if not (ML_AVAILABLE and self.model is not None and self.category_embeddings_normalized is not None):
+            return [(None, 0.0)] * len(questions)
+
+        keys = [(self.model_name, " ".join(normalize(question).split())) for question in questions]
+        embeddings = [_question_embedding_cache.get(key) for key in keys]
+
+        # Solo las preguntas no cacheadas pasan por el modelo (en un único lote)
+        pending = {}
+        for index, embedding in enumerate(embeddings):
+            if embedding is None:
+                pending.setdefault(keys[index], []).append(index)
+        if pending:
+            first_indexes = [indexes[0] for indexes in pending.values()]
+            encoded = self.model.encode([questions[index] for index in first_indexes], convert_to_tensor=True)
+            for key, row in zip(pending, encoded):
+                row = row.clone()
+                _question_embedding_cache.set(key, row)
+                for index in pending[key]:
+                    embeddings[index] = row
+
+        embeddings = torch.nn.functional.normalize(torch.stack(embeddings), p=2, dim=1)
+        cos_scores = embeddings @ self.category_embeddings_normalized.T
+        best_scores, best_indexes = cos_scores.max(dim=1)
+
+        matches = []
+        for score, index in zip(best_scores.tolist(), best_indexes.tolist()):
+            category = self.category_info[index]["name"]
+            logger.debug(f"Clasificación semántica: '{category}' conf={score:.4f}")
+            matches.append((category, float(score)))
+        return matches
+
+    def classify_intent(self, question, language="en"):
+        return self.classify_intents([question], language)[0]
 
+    def classify_intents(self, questions, language="en"):
+        """
+        Clasifica varias preguntas a la vez con las mismas reglas que
+        classify_intent. Devuelve una lista de (categoría, confianza, negocio).
+        """
+        keyword_matches = [
+            self._match_intent_keywords(normalize(question), language)
+            for question in questions
+        ]
+
+        # Las preguntas con palabra crítica no necesitan pasar por el modelo
+        semantic = iter(self._semantic_matches([
+            question for question, (critical_keyword, _, _) in zip(questions, keyword_matches)
+            if critical_keyword is None
+        ]))
+
+        results = []
+        for critical_keyword, business_hit, category_hits in keyword_matches:
+            # --- PRIORIDAD CRÍTICA: Palabras clave de inmigración ---
+            if critical_keyword is not None:
+                logger.debug(f"🔒 OVERRIDE CRÍTICO: '{critical_keyword}' detectado → Immigration")
+                results.append(("Immigration", 0.95, None))
+                continue
+
+            best_match_category, best_score = next(semantic)
+            results.append(self._resolve_intent(
+                language, business_hit, category_hits, best_match_category, best_score
+            ))
+        return results
+
+    def _resolve_intent(self, language, business_hit, category_hits, best_match_category, best_score):
         # --- LÓGICA DE OVERRIDE: Coincidencia directa con nombres de negocios ---
         # Si la pregunta menciona un negocio por su nombre, esa intención tiene prioridad.
-        # OPTIMIZADO: Usa índice pre-calculado O(n) en lugar de O(n²)
-        for name, (category, business) in self.business_name_index.items():
-            if name in qn:
-                logger.debug(f"Coincidencia directa negocio='{business.get('nombre', '')}' categoria='{category}'")
-                return category, 0.9, business
+        # Ante varias coincidencias gana la primera del índice de negocios.
+        if business_hit is not None:
+            category, business = business_hit
+            logger.debug(f"Coincidencia directa negocio='{business.get('nombre', '')}' categoria='{category}'")
+            return category, 0.9, business
 
         # --- LÓGICA DE OVERRIDE: Coincidencia por palabras clave declarativas ---
         # Contamos hits por categoría usando los patrones declarados para el idioma.
-        kw_map = self.category_patterns.get(language, {})
+        # En caso de empate gana la primera categoría declarada.
         best_kw_cat = None
         best_hits = 0
-        for cat, kws in kw_map.items():
-            hits = sum(1 for kw in kws if kw in qn)
+        for cat in self.category_patterns.get(language, {}):
+            hits = category_hits.get(cat, 0)
             if hits > best_hits:
                 best_hits = hits
                 best_kw_cat = cat
@@ -740,38 +983,88 @@ class Orchestrator:
         else:
             return "Desconocida", best_score, None
 
+    def _current_generation(self):
+        """Versiones de anunciantes, guías y artículos RSS."""
+        return (
+            self.advertisers_version,
+            getattr(self.content_manager, "version", 0),
+            getattr(self.rss_manager, "version", 0),
+        )
+
+    def _check_response_cache_generation(self):
+        """
+        Invalida la caché de respuestas si han cambiado los anunciantes,
+        las guías o los artículos RSS desde que se llenó.
+
+        Returns:
+            La generación comprobada (para no guardar resultados calculados
+            con datos que se recargaron mientras tanto).
+        """
+        generation = self._current_generation()
+        if generation != self._response_cache_generation:
+            if self._response_cache_generation is not None:
+                logger.info("Datos recargados: invalidando caché de respuestas")
+                self.response_cache.clear()
+            self._response_cache_generation = generation
+        return generation
+
+    def get_cache_stats(self) -> dict:
+        """Contadores de las cachés internas (para /api/metrics)."""
+        return {
+            "response_cache": self.response_cache.stats(),
+            "embedding_cache": _question_embedding_cache.stats(),
+        }
+
     def process_query(self, question, language="en", limit: int = 3, offset: int = 0):
-        categoria, confidence, advertiser = self.classify_intent(question, language)
-        lang = language if language in self.responses_map else "en"
-        resultados = self.advertisers.get(categoria, [])
-        if advertiser and advertiser not in resultados:
-            resultados.insert(0, advertiser)
+        return self.process_queries([question], language, limit=limit, offset=offset)[0]
 
-        # Mensaje amigable del orquestador
-        friendly_msg = ""
-        if categoria in self.responses_map[lang]:
-            friendly_msg = random.choice(self.responses_map[lang][categoria])
+    def process_queries(self, questions, language="en", limit: int = 3, offset: int = 0):
+        """
+        Versión por lotes de process_query: clasifica todas las preguntas con
+        classify_intents y devuelve una respuesta por pregunta con la misma forma.
 
-        # --- BUSCAR CONTENIDO EDITORIAL RELEVANTE ---
-        # Buscar guías/artículos relacionados con la pregunta
-        keywords = [word.lower() for word in question.split() if len(word) > 3]
-        guias_relevantes = self.content_manager.search_guides(keywords, categoria)
+        El resultado completo (sin paginar) se cachea por
+        (pregunta normalizada, idioma); el mensaje amigable, las guías y
+        limit/offset se aplican después, en cada petición.
+        """
+        generation = self._check_response_cache_generation()
+        # Espacios colapsados: "busco  piso" y "Busco piso" comparten entrada
+        keys = [(" ".join(normalize(question).split()), language) for question in questions]
+        results = [self.response_cache.get(key) for key in keys]
 
-        # --- BUSCAR ARTÍCULOS EN RSS CACHE ---
-        articulos_revista = self.rss_manager.get_articles_by_category(categoria, limit=3)
+        pending = [index for index, result in enumerate(results) if result is None]
+        if pending:
+            intents = self.classify_intents([questions[index] for index in pending], language)
+            for index, intent in zip(pending, intents):
+                result, cacheable = self._compute_query_result(questions[index], intent, language)
+                # Si los datos se recargaron durante el cálculo, el resultado ya es viejo
+                if cacheable and self._current_generation() == generation:
+                    self.response_cache.set(keys[index], result)
+                results[index] = result
 
-        # Agregar referencia a guías en el mensaje si hay contenido relevante
-        guias_resumen = []
-        if guias_relevantes:
-            # Tomar las 2 guías más relevantes
-            for guia in guias_relevantes[:2]:
-                guias_resumen.append(self.content_manager.get_guide_summary(guia))
+        return [
+            self._paginate_query_result(question, result, language, limit, offset)
+            for question, result in zip(questions, results)
+        ]
 
-            # Mejorar el mensaje con referencia al contenido
-            if lang == "es":
-                friendly_msg += f"\n\n📖 Para más información, consulta nuestra guía: '{guias_relevantes[0]['titulo']}'"
-            else:
-                friendly_msg += f"\n\n📖 For more information, check our guide: '{guias_relevantes[0]['titulo']}'"
+    def _compute_query_result(self, question, intent, language):
+        """
+        Ejecuta bot y artículos para una pregunta ya clasificada.
+
+        Returns:
+            (resultado sin paginar, cacheable). Los errores del bot no se
+            cachean, ni las respuestas que el bot marca como incompletas
+            (``"cacheable": False``, p.ej. salud sin resultados de Maps).
+        """
+        categoria, confidence, advertiser = intent
+        lang = language if language in self.responses_map else "en"
+        resultados = self.advertisers.get(categoria, ())
+        if advertiser and advertiser not in resultados:
+            # Vista por petición: el anunciante detectado va primero
+            resultados = (advertiser,) + resultados
+
+        # --- BUSCAR ARTÍCULOS EN RSS CACHE ---
+        articulos_revista = self.rss_manager.get_articles_by_category(categoria, limit=3)
 
         # Preparar consejos rápidos
         tips = self.tips_map.get(lang, {}).get(categoria, [])
@@ -782,54 +1075,101 @@ class Orchestrator:
                 # 1. Llamamos al bot específico
                 bot_response = self.bots_map[categoria](question, resultados, language=lang)
 
-                # 2. Slicing de resultados en el orquestador
-                all_items = bot_response.get("json_data", [])
-                total = len(all_items)
-                if limit is None or limit == 0:
-                    sliced = all_items[offset:]
-                else:
-                    sliced = all_items[offset:offset + limit]
-                has_more = (offset + (limit or 0)) < total if limit not in (None, 0) else False
-                next_offset = (offset + (limit or 0)) if has_more else None
-
-                # 2.5 NUEVO: Trackear recomendaciones en el directorio
-                if sliced and self.enable_recommendation_tracking:
-                    session_id = f"session_{offset}_{hash(question) % 10000}"
-                    for advertiser in sliced[:limit or 3]:
-                        advertiser_id = advertiser.get('id', advertiser.get('nombre', 'unknown'))
-                        try:
-                            self.directory.track_recommendation(
-                                advertiser_id=advertiser_id,
-                                query=question,
-                                session_id=session_id
-                            )
-                        except Exception as e:
-                            logger.debug(f"⚠️ Error trackeando recomendación: {e}")
-                            pass  # No bloquear si falla el tracking
-
-                # 3. Preparamos la respuesta final para el frontend
                 return {
-                    "respuesta": friendly_msg,
                     "agente": categoria,
                     "confidence": confidence,
-                    "json": sliced,
-                    "total_results": total,
-                    "has_more": has_more,
-                    "next_offset": next_offset,
-                    "guias": guias_resumen,
+                    "items": bot_response.get("json_data", []),
                     "articulos": articulos_revista,
                     "tips": tips
-                }
+                }, bot_response.get("cacheable", True)
             except Exception as e:
                 logger.error(f"ERROR ejecutando bot '{categoria}': {e}")
                 import traceback
                 traceback.print_exc()
                 # Si el bot falla, devolvemos una respuesta de error controlada
-                return {
+                return {"response": {
                     "respuesta": f"Lo siento, hubo un problema con el asistente de '{categoria}'. Inténtalo de nuevo.",
                     "agente": categoria, "confidence": 0.5, "json": [], "guias": [], "articulos": [], "has_more": False
-                }
+                }}, False
 
 
         # Si la categoría no está en el mapa de bots (no debería pasar ahora), devolvemos un error.
-        return { "respuesta": "Lo siento, no tengo un asistente configurado para esa categoría.", "agente": "Orchestrator", "confidence": confidence, "json": [], "articulos": [], "has_more": False }
+        return {"response": { "respuesta": "Lo siento, no tengo un asistente configurado para esa categoría.", "agente": "Orchestrator", "confidence": confidence, "json": [], "articulos": [], "has_more": False }}, True
+
+    def _friendly_message(self, question, categoria, lang):
+        """
+        Mensaje amigable (elegido al azar en cada petición) y guías
+        relacionadas con el texto exacto de la pregunta.
+
+        Returns:
+            (mensaje, resúmenes de las 2 guías más relevantes)
+        """
+        friendly_msg = ""
+        if categoria in self.responses_map[lang]:
+            friendly_msg = random.choice(self.responses_map[lang][categoria])
+
+        # --- BUSCAR CONTENIDO EDITORIAL RELEVANTE ---
+        keywords = [word.lower() for word in question.split() if len(word) > 3]
+        guias_relevantes = self.content_manager.search_guides(keywords, categoria)
+
+        # Agregar referencia a guías en el mensaje si hay contenido relevante
+        guias_resumen = []
+        if guias_relevantes:
+            # Tomar las 2 guías más relevantes
+            for guia in guias_relevantes[:2]:
+                guias_resumen.append(self.content_manager.get_guide_summary(guia))
+
+            # Mejorar el mensaje con referencia al contenido
+            if lang == "es":
+                friendly_msg += f"\n\n📖 Para más información, consulta nuestra guía: '{guias_relevantes[0]['titulo']}'"
+            else:
+                friendly_msg += f"\n\n📖 For more information, check our guide: '{guias_relevantes[0]['titulo']}'"
+        return friendly_msg, guias_resumen
+
+    def _paginate_query_result(self, question, result, language, limit, offset):
+        """
+        Aplica mensaje amigable, guías, limit/offset y el tracking sobre un
+        resultado (cacheado o no).
+        """
+        if "response" in result:
+            return dict(result["response"])
+
+        lang = language if language in self.responses_map else "en"
+        friendly_msg, guias_resumen = self._friendly_message(question, result["agente"], lang)
+
+        # 2. Slicing de resultados en el orquestador
+        all_items = result["items"]
+        total = len(all_items)
+        if limit is None or limit == 0:
+            sliced = all_items[offset:]
+        else:
+            sliced = all_items[offset:offset + limit]
+        has_more = (offset + (limit or 0)) < total if limit not in (None, 0) else False
+        next_offset = (offset + (limit or 0)) if has_more else None
+
+        # 2.5 Trackear recomendaciones en el directorio (en background)
+        if sliced and self.recommendation_tracker is not None:
+            session_id = f"session_{offset}_{hash(question) % 10000}"
+            for advertiser in sliced[:limit or 3]:
+                advertiser_id = advertiser.get('id', advertiser.get('nombre', 'unknown'))
+                self.recommendation_tracker.track(
+                    self.directory.recommendation_payload(
+                        advertiser_id=advertiser_id,
+                        query=question,
+                        session_id=session_id
+                    )
+                )
+
+        # 3. Preparamos la respuesta final para el frontend
+        return {
+            "respuesta": friendly_msg,
+            "agente": result["agente"],
+            "confidence": result["confidence"],
+            "json": [to_plain(a) for a in sliced],
+            "total_results": total,
+            "has_more": has_more,
+            "next_offset": next_offset,
+            "guias": guias_resumen,
+            "articulos": result["articulos"],
+            "tips": result["tips"]
+        }
@@ -0,0 +1,282 @@
+# bots/recommendation_tracker.py
+"""
+Tracking de recomendaciones fuera del camino de la petición.
+
+process_query solo encola el evento (put_nowait sobre una cola acotada).
+Un thread en background agrupa los eventos en lotes, los envía al
+directorio con un único POST por lote, reintenta con backoff exponencial
+y, si la API sigue caída, los vuelca a un JSONL local que se reenvía en
+cuanto un envío vuelve a funcionar.
+
+Durante el reenvío el fichero se renombra a ``.replaying``; si el proceso
+muere a medias, ese fichero se vuelve a fusionar con el de pendientes al
+arrancar y antes de cada reenvío (entrega al menos una vez: algún evento
+puede enviarse dos veces, pero no se pierde).
+"""
+
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .logger import logger
+
+
+class RecommendationTracker:
+    """
+    Cola acotada + worker de envío por lotes.
+
+    Args:
+        send_batch: función que recibe una lista de eventos y devuelve True
+                    si el directorio los aceptó
+        spill_path: JSONL donde se guardan los lotes que no se pudieron enviar
+    """
+
+    def __init__(self, send_batch: Callable[[List[Dict]], bool], spill_path: Path,
+                 max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 2.0, max_retries: int = 3,
+                 backoff_base: float = 0.5):
+        self._send_batch = send_batch
+        self.spill_path = Path(spill_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Protege el arranque del worker y los contadores
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.spilled = 0
+        self.replayed = 0
+
+        # Recuperar un reenvío interrumpido de una ejecución anterior
+        self._recover_replay()
+
+    @property
+    def replay_path(self) -> Path:
+        return self.spill_path.with_suffix(".replaying")
+
+    def _count(self, **deltas: int) -> None:
+        """Actualiza contadores (se llaman desde el worker y desde track)."""
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def track(self, event: Dict) -> bool:
+        """
+        Encola una recomendación sin bloquear.
+
+        Returns:
+            False si la cola está llena y el evento se descarta.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count(dropped=1)
+            return False
+
+        self._count(enqueued=1)
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="recommendation-tracker", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch(timeout=self.flush_interval)
+            if batch:
+                self._flush(batch)
+
+        # Al parar, vaciar lo que quede en la cola
+        while True:
+            batch = self._next_batch(timeout=0)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _next_batch(self, timeout: float) -> List[Dict]:
+        batch = []
+        try:
+            if timeout:
+                batch.append(self._queue.get(timeout=timeout))
+            else:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch: List[Dict]) -> bool:
+        try:
+            return bool(self._send_batch(batch))
+        except Exception as e:
+            logger.debug(f"⚠️ Error enviando lote de recomendaciones: {e}")
+            return False
+
+    def _flush(self, batch: List[Dict]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if self._send(batch):
+                self._count(sent=len(batch))
+                self._replay_spill()
+                return True
+            if attempt < self.max_retries:
+                self._count(retries=1)
+                # Backoff exponencial; si se está parando, no seguir esperando
+                if self._stop.wait(self.backoff_base * (2 ** attempt)):
+                    break
+
+        self._count(failed_batches=1)
+        self._spill(batch)
+        return False
+
+    def _write_spill(self, events: List[Dict]) -> bool:
+        """Añade eventos al fichero de pendientes (sin tocar contadores)."""
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            logger.error(f"❌ No se pudieron guardar recomendaciones pendientes: {e}")
+            return False
+
+    def _spill(self, batch: List[Dict]) -> None:
+        if self._write_spill(batch):
+            self._count(spilled=len(batch))
+            logger.warning(
+                f"⚠️ Directorio no disponible: {len(batch)} recomendaciones guardadas en {self.spill_path}"
+            )
+        else:
+            self._count(dropped=len(batch))
+
+    @staticmethod
+    def _read_events(path: Path) -> List[Dict]:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _recover_replay(self) -> None:
+        """Devuelve al fichero de pendientes un reenvío que no terminó."""
+        replay_path = self.replay_path
+        if not replay_path.exists():
+            return
+        try:
+            events = self._read_events(replay_path)
+        except Exception as e:
+            logger.error(f"❌ Error leyendo recomendaciones pendientes: {e}")
+            return
+        if self._write_spill(events):
+            replay_path.unlink(missing_ok=True)
+            if events:
+                logger.info(f"↩️ {len(events)} recomendaciones de un reenvío interrumpido recuperadas")
+
+    def _replay_spill(self) -> None:
+        """Reenvía los eventos volcados a disco (solo desde el worker)."""
+        self._recover_replay()
+        if self.replay_path.exists():
+            # No se pudo fusionar el reenvío anterior: no pisarlo
+            return
+        if not self.spill_path.exists() or self.spill_path.stat().st_size == 0:
+            return
+
+        replay_path = self.replay_path
+        try:
+            os.replace(self.spill_path, replay_path)
+            events = self._read_events(replay_path)
+        except Exception as e:
+            logger.error(f"❌ Error leyendo recomendaciones pendientes: {e}")
+            return
+
+        for start in range(0, len(events), self.batch_size):
+            chunk = events[start:start + self.batch_size]
+            if not self._send(chunk):
+                # La API ha vuelto a fallar: devolver el resto al fichero
+                # (ya contaban como volcados)
+                rest = events[start:]
+                if not self._write_spill(rest):
+                    self._count(dropped=len(rest))
+                break
+            self._count(replayed=len(chunk), sent=len(chunk))
+
+        replay_path.unlink(missing_ok=True)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Para el worker tras enviar (o volcar) los eventos pendientes."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Contadores para exponer en /api/metrics."""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "retries": self.retries,
+                "failed_batches": self.failed_batches,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+            }
+
+
+# Instancia global
+_tracker: Optional[RecommendationTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_recommendation_tracker() -> RecommendationTracker:
+    """Singleton conectado al DirectoryConnector global."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                from .directory_connector import get_directory_connector
+
+                base_dir = Path(__file__).resolve().parent.parent
+                _tracker = RecommendationTracker(
+                    send_batch=get_directory_connector().track_recommendations_bulk,
+                    spill_path=base_dir / "data" / "logs" / "recommendation_spill.jsonl",
+                    max_queue=int(os.getenv("TRACKING_QUEUE_SIZE", "1000")),
+                    batch_size=int(os.getenv("TRACKING_BATCH_SIZE", "50")),
+                )
+    return _tracker
+
+
+def get_recommendation_tracker_stats() -> Dict:
+    """Estadísticas del tracker sin crearlo si el tracking está desactivado."""
+    if _tracker is None:
+        return {"enabled": False}
+    return {"enabled": True, **_tracker.stats()}
+
+
+def shutdown_recommendation_tracker(timeout: float = 5.0) -> None:
+    if _tracker is not None:
+        _tracker.flush(timeout)
@@ -1,15 +1,12 @@
-import unicodedata
 import json
+from .utils import fold_accents
+from .advertiser import Advertiser
 
 
 def _normalize_text(s):
     if not s:
         return ""
-    s = str(s)
-    s = s.strip()
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join(c for c in s if not unicodedata.combining(c))
-    return s
+    return fold_accents(str(s).strip())
 
 
 def make_standard_response(categoria, anunciantes, pregunta=None, language="en"):
@@ -22,15 +19,18 @@ def make_standard_response(categoria, anunciantes, pregunta=None, language="en")
     categoria = categoria or "Desconocida"
     opciones = []
     for a in anunciantes or []:
+        # Claves ya normalizadas (nombre/title, contacto/contact...) en Advertiser
+        a = Advertiser.from_raw(a)
+        beneficios = a.get("beneficios")
         opcion = {
-            "nombre": a.get("nombre") or a.get("title") or None,
-            "descripcion": a.get("descripcion") or a.get("descripcion_corta") or a.get("description") or None,
-            "beneficios": a.get("beneficios") if isinstance(a.get("beneficios"), list) else ([a.get("beneficios")] if a.get("beneficios") else []),
-            "precio": a.get("precio") or a.get("price") or None,
-            "contacto": a.get("contacto") or a.get("contact") or None,
-            "idiomas": a.get("idiomas") or a.get("languages") or None,
-            "ubicacion": a.get("ubicacion") or a.get("location") or None,
-            "faq": a.get("faq") or a.get("faqs") or []
+            "nombre": a.get("nombre") or None,
+            "descripcion": a.get("descripcion") or None,
+            "beneficios": beneficios if isinstance(beneficios, list) else ([beneficios] if beneficios else []),
+            "precio": a.get("precio") or None,
+            "contacto": a.get("contacto") or None,
+            "idiomas": a.get("idiomas") or None,
+            "ubicacion": a.get("ubicacion") or None,
+            "faq": a.get("faq") or []
         }
         opciones.append(opcion)
 
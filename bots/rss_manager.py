@@ -4,22 +4,51 @@ Actualiza cada 6-12 horas en background.
 """
 
 import json
+import os
 import feedparser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from .logger import logger
-import socket
+from .http_client import get_http_client
+from .search_index import BM25Index, article_search_text
 
-# OPTIMIZACIÓN: Timeout global para feedparser (evita colgarse indefinidamente)
-socket.setdefaulttimeout(10)
+# Palabras clave por categoría del orquestador para asociar artículos
+CATEGORY_KEYWORDS = {
+    "Legal and Financial": ["legal", "visa", "nie", "impuesto", "contrato", "bank", "immigration"],
+    "Healthcare": ["salud", "doctor", "hospital", "dentista", "health", "medical", "clinic"],
+    "Education": ["escuela", "colegio", "university", "idioma", "course", "school", "education"],
+    "Accommodation": ["alojamiento", "hotel", "apartamento", "vivienda", "housing", "apartment", "rent"],
+    "Restaurants": ["restaurante", "comida", "food", "restaurant", "dining", "cuisine"],
+    "Arts and Culture": ["arte", "cultura", "museo", "gallery", "culture", "exhibition"],
+    "Work and Networking": ["trabajo", "empleo", "job", "networking", "business", "work"],
+}
+
+# Artículos precalculados por categoría (mayor que cualquier limit habitual)
+CATEGORY_TOP_N = 10
+
+# Retención del caché de artículos y campos que se persisten en disco
+MAX_CACHED_ARTICLES = 1000
+PERSISTED_FIELDS = ("url", "title", "description", "published", "categories", "source", "synced_at")
+
+# Descarga de feeds: timeout por petición y máximo de descargas en paralelo
+FEED_TIMEOUT_SECONDS = float(os.getenv("RSS_FEED_TIMEOUT_SECONDS", "10"))
+FEED_FETCH_WORKERS = int(os.getenv("RSS_FEED_WORKERS", "8"))
 
 class RSSManager:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[Path] = None):
         self.base_dir = Path(__file__).resolve().parent.parent
-        self.cache_dir = self.base_dir / "data" / "cache"
+        self.cache_dir = Path(cache_dir) if cache_dir else self.base_dir / "data" / "cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.articles_cache = self.cache_dir / "articles.json"
+        # JSONL compacto: un artículo por línea, los nuevos se añaden al final
+        self.articles_cache = self.cache_dir / "articles.jsonl"
+        # Formato anterior (JSON indentado); se migra al cargar si no hay JSONL
+        self.legacy_articles_cache = self.cache_dir / "articles.json"
+        self._cache_lines = 0
+        # ETag / Last-Modified por feed para peticiones condicionales
+        self.feed_state_file = self.cache_dir / "feed_state.json"
+        self.http = get_http_client()
 
         # URLs de feeds a parsear (Barcelona Metropolitan)
         self.feed_urls = [
@@ -30,39 +59,176 @@ class RSSManager:
         ]
 
         self.articles = self.load_cache()
+        self.feed_state = self.load_feed_state()
+        # Índice invertido BM25 (clave: URL del artículo)
+        self.search_index = BM25Index()
+        for article in self.articles:
+            self._index_article(article)
+        # Top-N artículos por categoría, recalculado en cada sync
+        self.category_articles: Dict[str, List[Dict]] = {}
+        self._rebuild_category_articles()
+        # Se incrementa cada vez que cambia el conjunto de artículos
+        # (permite invalidar cachés que dependen de ellos)
+        self.version = 0
         logger.info(f"RSS Manager inicializado. {len(self.articles)} artículos en caché.")
 
     def load_cache(self) -> List[Dict]:
-        """Carga artículos desde caché local."""
+        """Carga artículos desde caché local (migrando el formato antiguo)."""
         if self.articles_cache.exists():
+            articles = {}
+            lines = 0
             try:
                 with open(self.articles_cache, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    for line in f:
+                        lines += 1
+                        try:
+                            article = json.loads(line)
+                        except ValueError:
+                            # Línea incompleta (p.ej. proceso cortado a mitad de un append)
+                            continue
+                        articles[article.get('url') or lines] = article
+            except Exception as e:
+                logger.warning(f"Error cargando caché: {e}")
+                return []
+            self._cache_lines = lines
+            return list(articles.values())
+
+        if self.legacy_articles_cache.exists():
+            try:
+                with open(self.legacy_articles_cache, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                articles = [self._persisted(a) for a in legacy][-MAX_CACHED_ARTICLES:]
+                self._write_cache(articles)
+                logger.info(f"Caché de artículos migrado a {self.articles_cache.name}")
+                return articles
             except Exception as e:
                 logger.warning(f"Error cargando caché: {e}")
         return []
 
+    @staticmethod
+    def _persisted(article: Dict) -> Dict:
+        """Copia del artículo solo con los campos que se guardan en disco."""
+        return {k: article[k] for k in PERSISTED_FIELDS if k in article}
+
+    @staticmethod
+    def _dump_line(article: Dict) -> str:
+        return json.dumps(RSSManager._persisted(article), ensure_ascii=False, separators=(',', ':')) + "\n"
+
+    def _write_cache(self, articles: List[Dict]) -> None:
+        """Reescribe el caché completo de forma atómica (tmp + rename)."""
+        tmp_path = self.articles_cache.with_suffix(f".jsonl.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(self._dump_line(a) for a in articles)
+        os.replace(tmp_path, self.articles_cache)
+        self._cache_lines = len(articles)
+
     def save_cache(self):
-        """Persiste artículos en caché local."""
+        """Persiste (compacta) todos los artículos en caché local."""
         try:
-            with open(self.articles_cache, 'w', encoding='utf-8') as f:
-                json.dump(self.articles, f, ensure_ascii=False, indent=2)
+            self._write_cache(self.articles)
         except Exception as e:
             logger.error(f"Error guardando caché: {e}")
 
+    def append_cache(self, new_articles: List[Dict]):
+        """Añade artículos nuevos al final del caché sin reescribirlo."""
+        if not new_articles:
+            return
+        # Demasiadas líneas obsoletas: compactar en vez de seguir creciendo
+        if self._cache_lines + len(new_articles) > len(self.articles) * 2:
+            self.save_cache()
+            return
+        try:
+            with open(self.articles_cache, 'a', encoding='utf-8') as f:
+                f.writelines(self._dump_line(a) for a in new_articles)
+            self._cache_lines += len(new_articles)
+        except Exception as e:
+            logger.error(f"Error guardando caché: {e}")
+
+    def load_feed_state(self) -> Dict[str, Dict]:
+        """Carga los validadores HTTP (ETag/Last-Modified) de cada feed."""
+        if self.feed_state_file.exists():
+            try:
+                with open(self.feed_state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Error cargando estado de feeds: {e}")
+        return {}
+
+    def save_feed_state(self):
+        try:
+            with open(self.feed_state_file, 'w', encoding='utf-8') as f:
+                json.dump(self.feed_state, f, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Error guardando estado de feeds: {e}")
+
+    def _fetch_feed(self, feed_url: str) -> Tuple[Optional[object], Optional[Dict]]:
+        """
+        Descarga un feed con GET condicional.
+
+        Returns:
+            (feed parseado, validadores nuevos), o (None, None) si el
+            servidor responde 304 Not Modified.
+        """
+        headers = {}
+        state = self.feed_state.get(feed_url, {})
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        response = self.http.get(feed_url, headers=headers, timeout=FEED_TIMEOUT_SECONDS)
+        if response.status_code == 304:
+            return None, None
+        response.raise_for_status()
+
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        return feedparser.parse(response.content), validators
+
+    def _index_article(self, article: Dict) -> None:
+        key = article.get('url') or id(article)
+        self.search_index.add(key, article, article_search_text(article))
+
+    def _rebuild_category_articles(self) -> None:
+        """Precalcula los artículos de cada categoría y los publica de una vez."""
+        self.category_articles = {
+            category: self.search_articles(keywords, CATEGORY_TOP_N)
+            for category, keywords in CATEGORY_KEYWORDS.items()
+        }
+
     def sync_feeds(self) -> int:
         """
         Parsea todos los feeds y actualiza caché.
         Retorna número de artículos nuevos/actualizados.
         """
         new_count = 0
+        new_articles = []
         existing_urls = {a.get('url') for a in self.articles}
 
-        for feed_url in self.feed_urls:
+        def fetch(feed_url):
             try:
                 logger.info(f"Parseando feed: {feed_url}")
-                feed = feedparser.parse(feed_url)
+                return self._fetch_feed(feed_url), None
+            except Exception as e:
+                return (None, None), e
+
+        # Descargas en paralelo; el procesado sigue el orden de feed_urls
+        workers = max(1, min(FEED_FETCH_WORKERS, len(self.feed_urls)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rss-fetch") as pool:
+            results = list(pool.map(fetch, self.feed_urls))
+
+        state_changed = False
+        for feed_url, ((feed, validators), error) in zip(self.feed_urls, results):
+            if error is not None:
+                logger.error(f"Error parseando {feed_url}: {error}")
+                continue
+            if feed is None:
+                logger.info(f"Feed sin cambios (304): {feed_url}")
+                continue
 
+            try:
                 # Validar que el feed se parseó correctamente
                 if not feed.entries:
                     logger.warning(f"Feed vacío o no accesible: {feed_url}")
@@ -84,71 +250,64 @@ class RSSManager:
                     # Evitar duplicados
                     if article['url'] and article['url'] not in existing_urls:
                         self.articles.append(article)
+                        new_articles.append(article)
+                        self._index_article(article)
                         existing_urls.add(article['url'])
                         new_count += 1
                         entries_count += 1
 
                 logger.info(f"Feed '{feed.feed.get('title', 'Unknown')}': {entries_count} nuevas entradas parseadas.")
 
+                # Solo guardar validadores de feeds procesados correctamente
+                validators = {k: v for k, v in validators.items() if v}
+                if validators != self.feed_state.get(feed_url):
+                    self.feed_state[feed_url] = validators
+                    state_changed = True
+
             except Exception as e:
                 logger.error(f"Error parseando {feed_url}: {e}")
 
         # Limitar a últimos 1000 artículos para no crecer indefinidamente
-        if len(self.articles) > 1000:
-            self.articles = sorted(self.articles, key=lambda x: x.get('synced_at', ''), reverse=True)[:1000]
+        trimmed = len(self.articles) > MAX_CACHED_ARTICLES
+        if trimmed:
+            kept = sorted(self.articles, key=lambda x: x.get('synced_at', ''), reverse=True)[:MAX_CACHED_ARTICLES]
+            kept_ids = {id(a) for a in kept}
+            for article in self.articles:
+                if id(article) not in kept_ids:
+                    self.search_index.remove(article.get('url') or id(article))
+            self.articles = kept
+
+        if new_count:
+            self._rebuild_category_articles()
+            self.version += 1
 
-        self.save_cache()
+        if state_changed:
+            self.save_feed_state()
+        if trimmed:
+            # Al recortar hay que compactar: reescritura atómica completa
+            self.save_cache()
+        else:
+            self.append_cache(new_articles)
         logger.info(f"Sync completado: {new_count} artículos nuevos. Total: {len(self.articles)}")
         return new_count
 
     def search_articles(self, keywords: List[str], limit: int = 5) -> List[Dict]:
         """
         Busca artículos por palabras clave.
-        Retorna los más relevantes ordenados por matches.
-        OPTIMIZADO: Pre-procesa texto una vez, early exit cuando encuentra suficientes matches
+        Retorna los más relevantes según BM25 sobre el índice invertido
+        (título, descripción y categorías, sin acentos).
         """
         if not keywords or not self.articles:
             return []
-
-        keyword_set = {kw.lower() for kw in keywords if len(kw) > 2}
-        if not keyword_set:
-            return []
-
-        scored = []
-        # OPTIMIZACIÓN: Limitar búsqueda a últimos 500 artículos (más recientes)
-        recent_articles = self.articles[-500:] if len(self.articles) > 500 else self.articles
-
-        for article in recent_articles:
-            # OPTIMIZACIÓN: Caché de texto procesado (podría mejorarse más con un índice invertido)
-            if 'cached_search_text' not in article:
-                categories_text = ' '.join([t.get('term', '') if isinstance(t, dict) else str(t) for t in article.get('categories', [])])
-                article['cached_search_text'] = f"{article.get('title', '')} {article.get('description', '')} {categories_text}".lower()
-
-            text = article['cached_search_text']
-            score = sum(1 for kw in keyword_set if kw in text)
-            if score > 0:
-                scored.append((score, article))
-
-        # Ordenar por score descendente
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [article for _, article in scored[:limit]]
+        return self.search_index.search(keywords, limit)
 
     def get_articles_by_category(self, category: str, limit: int = 3) -> List[Dict]:
         """
-        Retorna artículos de una categoría específica (mapeo manual).
+        Retorna artículos de una categoría específica (precalculados en cada sync).
         """
-        category_keywords = {
-            "Legal and Financial": ["legal", "visa", "nie", "impuesto", "contrato", "bank", "immigration"],
-            "Healthcare": ["salud", "doctor", "hospital", "dentista", "health", "medical", "clinic"],
-            "Education": ["escuela", "colegio", "university", "idioma", "course", "school", "education"],
-            "Accommodation": ["alojamiento", "hotel", "apartamento", "vivienda", "housing", "apartment", "rent"],
-            "Restaurants": ["restaurante", "comida", "food", "restaurant", "dining", "cuisine"],
-            "Arts and Culture": ["arte", "cultura", "museo", "gallery", "culture", "exhibition"],
-            "Work and Networking": ["trabajo", "empleo", "job", "networking", "business", "work"],
-        }
-
-        keywords = category_keywords.get(category, [])
-        return self.search_articles(keywords, limit)
+        if limit > CATEGORY_TOP_N:
+            return self.search_articles(CATEGORY_KEYWORDS.get(category, []), limit)
+        return self.category_articles.get(category, [])[:limit]
 
 # Instancia global
 _rss_manager: Optional[RSSManager] = None
@@ -0,0 +1,164 @@
+# bots/search_index.py
+"""
+Índice invertido con ranking BM25 para los artículos RSS.
+
+Los tokens se normalizan igual que el resto del bot (minúsculas y sin
+acentos) y se indexan título, descripción y categorías. El índice se
+actualiza de forma incremental (add/remove) al sincronizar feeds, así que
+una búsqueda solo toca las listas de posting de sus términos en lugar de
+recorrer todos los artículos.
+"""
+
+import math
+import re
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from .utils import normalize
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minúsculas y sin acentos ("Educación" -> "educacion")."""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def article_search_text(article: Dict) -> str:
+    """Texto indexable de un artículo: título, descripción y categorías."""
+    categories = ' '.join(
+        t.get('term', '') if isinstance(t, dict) else str(t)
+        for t in article.get('categories', [])
+    )
+    return f"{article.get('title', '')} {article.get('description', '')} {categories}"
+
+
+class BM25Index:
+    """
+    Índice invertido término -> {doc_id: frecuencia} con puntuación BM25.
+
+    Cada palabra clave de la búsqueda se compara por prefijo contra el
+    vocabulario ("visa" encuentra "visa" y "visado"), resuelto con bisect
+    sobre el vocabulario ordenado. Los empates se resuelven por orden de
+    inserción en el índice.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._docs: Dict[int, Any] = {}
+        self._ids: Dict[Hashable, int] = {}
+        self._total_len = 0
+        self._next_id = 0
+        self._vocab: Optional[List[str]] = None
+        self._lock = threading.RLock()
+
+    def add(self, key: Hashable, doc: Any, text: str) -> None:
+        """Indexa (o re-indexa) un documento identificado por ``key``."""
+        terms: Dict[str, int] = {}
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + 1
+
+        with self._lock:
+            if key in self._ids:
+                self.remove(key)
+
+            doc_id = self._next_id
+            self._next_id += 1
+            self._ids[key] = doc_id
+            self._docs[doc_id] = doc
+            self._doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+
+            for term, tf in terms.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    self._postings[term] = {doc_id: tf}
+                    self._vocab = None
+                else:
+                    posting[doc_id] = tf
+
+    def remove(self, key: Hashable) -> None:
+        """Elimina un documento del índice (no hace nada si no existe)."""
+        with self._lock:
+            doc_id = self._ids.pop(key, None)
+            if doc_id is None:
+                return
+
+            del self._docs[doc_id]
+            self._total_len -= self._doc_len.pop(doc_id)
+            for term in self._doc_terms.pop(doc_id):
+                posting = self._postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self._postings[term]
+                    self._vocab = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._docs.clear()
+            self._ids.clear()
+            self._total_len = 0
+            self._vocab = None
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Términos del vocabulario que empiezan por ``prefix``."""
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        vocab = self._vocab
+        terms = []
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            terms.append(vocab[i])
+            i += 1
+        return terms
+
+    def search(self, keywords: Iterable[str], limit: int = 5) -> List[Any]:
+        """
+        Devuelve los documentos más relevantes para las palabras clave.
+
+        Las palabras de 2 caracteres o menos se ignoran.
+        """
+        query_terms = []
+        for kw in keywords:
+            if len(kw) > 2:
+                query_terms.extend(t for t in tokenize(kw) if t not in query_terms)
+        if not query_terms or limit <= 0:
+            return []
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+
+            scores: Dict[int, float] = {}
+            for prefix in query_terms:
+                # Frecuencia combinada de todos los términos con ese prefijo
+                tfs: Dict[int, int] = {}
+                for term in self._expand(prefix):
+                    for doc_id, tf in self._postings[term].items():
+                        tfs[doc_id] = tfs.get(doc_id, 0) + tf
+                if not tfs:
+                    continue
+
+                df = len(tfs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in tfs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            return [self._docs[doc_id] for doc_id, _ in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -1,7 +1,15 @@
+import re
 import unicodedata
-from typing import List, Dict
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import List, Dict, Iterable, Optional
 from config import settings
 
+# Campos del anunciante que se usan para el filtrado por palabras clave
+DEFAULT_SEARCH_FIELDS = ('nombre', 'descripcion', 'perfil', 'ubicacion')
+
+_TOKEN_RE = re.compile(r"\w+")
+
 
 def build_key_points(advertisers: List[Dict], max_items: int = None) -> List[Dict]:
     """
@@ -30,15 +38,117 @@ def build_key_points(advertisers: List[Dict], max_items: int = None) -> List[Dic
     return key_points
 
 
+class _AccentFoldTable(dict):
+    """
+    Tabla para str.translate: carácter -> NFKD sin marcas combinantes.
+
+    La descomposición NFKD es carácter a carácter (el reordenamiento canónico
+    solo afecta a marcas combinantes, que se eliminan), así que traducir
+    cada carácter por separado da el mismo resultado que normalizar la
+    cadena entera. Los caracteres no precalculados se resuelven en
+    __missing__ la primera vez que aparecen.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        decomposed = unicodedata.normalize('NFKD', chr(codepoint))
+        folded = ''.join(c for c in decomposed if not unicodedata.combining(c))
+        self[codepoint] = folded
+        return folded
+
+
+_ACCENT_FOLD_TABLE = _AccentFoldTable()
+# Precalcular Latin-1 Supplement, Latin Extended-A/B y marcas combinantes
+for _codepoint in range(0x80, 0x370):
+    _ACCENT_FOLD_TABLE[_codepoint]
+
+# Cadenas cortas (palabras clave, nombres, preguntas típicas) se memorizan
+_NORMALIZE_CACHE_MAX_LEN = 64
+
+
+@lru_cache(maxsize=16384)
+def _fold_word(word: str) -> str:
+    return word.translate(_ACCENT_FOLD_TABLE)
+
+
+def fold_accents(s: str) -> str:
+    """
+    Elimina acentos y diacríticos ("Gràcia" -> "Gracia"); equivale a NFKD
+    sin marcas combinantes. Las palabras ASCII se copian tal cual y las
+    demás se traducen una vez y se memorizan.
+    """
+    if s.isascii():
+        return s
+    return ' '.join([w if w.isascii() else _fold_word(w) for w in s.split(' ')])
+
+
+@lru_cache(maxsize=8192)
+def _normalize_short(s: str) -> str:
+    return fold_accents(s.strip()).lower()
+
+
 def normalize(s):
     if not s:
         return ""
-    s = str(s).strip()
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join(c for c in s if not unicodedata.combining(c))
-    return s.lower()
+    if not isinstance(s, str):
+        s = str(s)
+    if len(s) <= _NORMALIZE_CACHE_MAX_LEN:
+        return _normalize_short(s)
+    return fold_accents(s.strip()).lower()
+
+
+class AdvertiserSearchProfile:
+    """Texto normalizado y tokens de un anunciante, calculados una sola vez."""
+
+    __slots__ = ("text", "tokens")
+
+    def __init__(self, advertiser: Dict, search_fields: Iterable[str] = DEFAULT_SEARCH_FIELDS):
+        combined_text = ' '.join([str(advertiser.get(k, '')) for k in search_fields])
+        self.text = normalize(combined_text)
+        self.tokens = frozenset(_TOKEN_RE.findall(self.text))
+
+    def matches(self, keywords: Iterable[str], keyword_tokens: Optional[frozenset] = None) -> bool:
+        """
+        Equivale a ``any(kw in texto for kw in keywords)``: primero la
+        intersección de tokens (caso habitual) y, si no hay, búsqueda de
+        subcadena (plurales, palabras compuestas, frases).
+        """
+        if keyword_tokens is None:
+            keyword_tokens = frozenset(keywords)
+        if keyword_tokens & self.tokens:
+            return True
+        text = self.text
+        return any(kw in text for kw in keywords)
+
+
+# Perfiles precalculados: id(anunciante) -> (anunciante, perfil).
+# Se guarda el propio anunciante para comprobar identidad (los id se reutilizan).
+_search_profiles: Dict[int, tuple] = {}
+
 
-def filter_advertisers_by_keywords(pregunta, anunciantes, keywords, search_fields=['nombre', 'descripcion', 'perfil', 'ubicacion']):
+def register_search_profiles(advertisers_by_category: Dict[str, List[Dict]]) -> None:
+    """
+    Precalcula los perfiles de búsqueda de todos los anunciantes cargados.
+    Se llama al cargar/recargar anunciantes; el registro se sustituye de golpe.
+    """
+    global _search_profiles
+    profiles = {}
+    for advertisers in advertisers_by_category.values():
+        for advertiser in advertisers:
+            if isinstance(advertiser, Mapping):
+                profiles[id(advertiser)] = (advertiser, AdvertiserSearchProfile(advertiser))
+    _search_profiles = profiles
+
+
+def get_search_profile(advertiser: Dict, search_fields: Iterable[str] = DEFAULT_SEARCH_FIELDS) -> AdvertiserSearchProfile:
+    """Perfil precalculado del anunciante o, si no está registrado, uno nuevo."""
+    if tuple(search_fields) == DEFAULT_SEARCH_FIELDS:
+        entry = _search_profiles.get(id(advertiser))
+        if entry is not None and entry[0] is advertiser:
+            return entry[1]
+    return AdvertiserSearchProfile(advertiser, search_fields)
+
+
+def filter_advertisers_by_keywords(pregunta, anunciantes, keywords, search_fields=DEFAULT_SEARCH_FIELDS):
     """
     Función reutilizable para filtrar una lista de anunciantes.
 
@@ -50,15 +160,16 @@ def filter_advertisers_by_keywords(pregunta, anunciantes, keywords, search_field
 
     pregunta_norm = normalize(pregunta or "")
 
-    matching, others = [], []
-    for a in anunciantes:
-        # Combina el contenido de los campos relevantes del anunciante en un solo texto
-        combined_text = ' '.join([str(a.get(k, '')) for k in search_fields])
-        combined_norm = normalize(combined_text)
-
-        # Comprueba si alguna palabra clave está en la pregunta del usuario o en el texto del anunciante
-        found = any(kw in pregunta_norm or kw in combined_norm for kw in keywords)
-        (matching if found else others).append(a)
+    # Si alguna palabra clave está en la pregunta, todos los anunciantes coinciden
+    if any(kw in pregunta_norm for kw in keywords):
+        matching, others = list(anunciantes), []
+    else:
+        keyword_tokens = frozenset(keywords)
+        matching, others = [], []
+        for a in anunciantes:
+            # Comprueba si alguna palabra clave está en el texto precalculado del anunciante
+            found = get_search_profile(a, search_fields).matches(keywords, keyword_tokens)
+            (matching if found else others).append(a)
     # Ordenar priorizando anunciantes patrocinados/destacados
     def sponsor_key(item):
         flag = item.get('es_anunciante') or item.get('sponsored') or item.get('featured')
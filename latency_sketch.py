@@ -0,0 +1,252 @@
+# latency_sketch.py - Mergeable streaming latency quantiles
+"""
+DDSketch-style latency histogram.
+
+Values are counted in logarithmic buckets: bucket ``k`` holds the values in
+(gamma^(k-1), gamma^k] with gamma = (1 + a) / (1 - a), so every quantile is
+answered with a relative error of at most ``a`` (1% by default).
+
+- insert is O(1): one log and one dict increment
+- memory is bounded: ~700 buckets cover 1µs..15min at 1%, and ``max_bins``
+  caps it by folding the lowest buckets together
+- sketches with the same accuracy merge by adding bucket counts, so
+  per-worker or per-interval sketches combine into quantiles for any
+  period (MetricsDB stores them and merges them in its rollups)
+"""
+
+import json
+import math
+from typing import Dict, Iterable, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+# Values at or below this (ms) are counted in the zero bucket
+MIN_TRACKED_MS = 1e-3
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+
+class LatencySketch:
+    """Quantile sketch with bounded relative error (not thread-safe)."""
+
+    __slots__ = ("relative_accuracy", "max_bins", "gamma", "_multiplier",
+                 "bins", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._multiplier = 1 / math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Record one value (ms)."""
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > MIN_TRACKED_MS:
+            key = math.ceil(math.log(value) * self._multiplier)
+            bins = self.bins
+            bins[key] = bins.get(key, 0) + 1
+            if len(bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += 1
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets so at most ``max_bins`` remain."""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        if excess <= 0:
+            return
+        folded = sum(self.bins.pop(key) for key in keys[:excess])
+        self.bins[keys[excess]] += folded
+
+    # --- Combining ---
+
+    def _check_compatible(self, other: "LatencySketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot combine sketches with different accuracy")
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        """Add ``other``'s values to this sketch (in place)."""
+        self._check_compatible(other)
+        if not other.count:
+            return self
+        bins = self.bins
+        for key, count in other.bins.items():
+            bins[key] = bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def delta(self, previous: Optional["LatencySketch"]) -> "LatencySketch":
+        """
+        Values added since ``previous`` (an earlier state of this sketch).
+
+        Like a cumulative counter: if ``previous`` is not contained in this
+        sketch (the process restarted), the whole sketch is the delta. The
+        interval's min/max are estimated from its outermost buckets.
+        """
+        if previous is None or not previous.count:
+            return self.copy()
+        self._check_compatible(previous)
+        zero_count = self.zero_count - previous.zero_count
+        bins = dict(self.bins)
+        for key, count in previous.bins.items():
+            remaining = bins.get(key, 0) - count
+            if remaining < 0:
+                return self.copy()
+            if remaining:
+                bins[key] = remaining
+            else:
+                bins.pop(key, None)
+        if zero_count < 0 or previous.count > self.count:
+            return self.copy()
+
+        result = LatencySketch(self.relative_accuracy, self.max_bins)
+        result.bins = bins
+        result.zero_count = zero_count
+        result.count = self.count - previous.count
+        result.sum = max(self.sum - previous.sum, 0.0)
+        if result.count:
+            low = 0.0 if zero_count else self._bin_value(min(bins))
+            high = self._bin_value(max(bins)) if bins else MIN_TRACKED_MS
+            result.min = min(max(low, self.min), self.max)
+            result.max = max(min(high, self.max), self.min)
+        return result
+
+    def copy(self) -> "LatencySketch":
+        result = LatencySketch(self.relative_accuracy, self.max_bins)
+        result.bins = dict(self.bins)
+        result.zero_count = self.zero_count
+        result.count = self.count
+        result.sum = self.sum
+        result.min = self.min
+        result.max = self.max
+        return result
+
+    # --- Queries ---
+
+    def _bin_value(self, key: int) -> float:
+        """Representative value of a bucket (relative error <= accuracy)."""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    @property
+    def avg(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` (0..1), or None if empty."""
+        return self.quantiles((q,))[q]
+
+    def quantiles(self, qs: Iterable[float] = DEFAULT_QUANTILES
+                  ) -> Dict[float, Optional[float]]:
+        """Several quantiles in a single pass over the buckets."""
+        qs = sorted(qs)
+        if not self.count:
+            return {q: None for q in qs}
+
+        # The extremes are tracked exactly
+        result = {q: self.min for q in qs if q <= 0}
+        result.update((q, self.max) for q in qs if q >= 1)
+        qs = [q for q in qs if 0 < q < 1]
+        if not qs:
+            return result
+
+        ranks = iter((q, q * (self.count - 1)) for q in qs)
+        q, rank = next(ranks)
+        cumulative = self.zero_count
+        while rank < cumulative:
+            result[q] = max(self.min, 0.0)
+            q, rank = next(ranks, (None, None))
+            if q is None:
+                return result
+
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            while rank < cumulative:
+                value = self._bin_value(key)
+                result[q] = min(max(value, self.min), self.max)
+                q, rank = next(ranks, (None, None))
+                if q is None:
+                    return result
+
+        # Float rounding near the top: the highest value is the maximum
+        result[q] = self.max
+        for q, _ in ranks:
+            result[q] = self.max
+        return result
+
+    # --- Serialization ---
+
+    def to_dict(self) -> Dict:
+        """Compact representation (bins as a flat [key, count, ...] list)."""
+        flat = []
+        for key in sorted(self.bins):
+            flat.append(key)
+            flat.append(self.bins[key])
+        return {
+            "accuracy": self.relative_accuracy,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero": self.zero_count,
+            "bins": flat,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict,
+                  max_bins: int = DEFAULT_MAX_BINS) -> "LatencySketch":
+        sketch = cls(data.get("accuracy", DEFAULT_RELATIVE_ACCURACY), max_bins)
+        flat = data.get("bins", [])
+        sketch.bins = dict(zip(flat[::2], flat[1::2]))
+        sketch.zero_count = data.get("zero", 0)
+        sketch.count = data.get("count", 0)
+        sketch.sum = data.get("sum", 0.0)
+        if sketch.count:
+            sketch.min = data.get("min", 0.0)
+            sketch.max = data.get("max", 0.0)
+        return sketch
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "LatencySketch":
+        return cls.from_dict(json.loads(text))
+
+
+class SketchMergeAggregate:
+    """SQLite aggregate: sketch_merge(json) -> merged sketch JSON."""
+
+    def __init__(self):
+        self.sketch: Optional[LatencySketch] = None
+
+    def step(self, value: Optional[str]) -> None:
+        if not value:
+            return
+        sketch = LatencySketch.from_json(value)
+        if self.sketch is None:
+            self.sketch = sketch
+        else:
+            self.sketch.merge(sketch)
+
+    def finalize(self) -> Optional[str]:
+        return self.sketch.to_json() if self.sketch is not None else None
@@ -1,10 +1,10 @@
 # main.py - Servidor Backend con FastAPI
+import asyncio
 import json
 import os
 import threading
 import time
-from collections import defaultdict
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
@@ -22,8 +22,16 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 from bots.orchestrator import Orchestrator
 from bots.rss_manager import get_rss_manager
+from bots.recommendation_tracker import (
+    get_recommendation_tracker_stats,
+    shutdown_recommendation_tracker,
+)
 from bots.logger import logger
-from metrics_storage import MetricsDB
+from bots.json_fragments import encode_payload
+from bots.maps_integration import prefetch_healthcare_searches
+from latency_sketch import DEFAULT_RELATIVE_ACCURACY, LatencySketch
+from metrics_registry import get_metrics_registry
+from metrics_storage import ROLLUP_TABLES, MetricsDB, resolution_for_hours
 
 
 # --- Configurar scheduler en background ---
@@ -35,16 +43,49 @@ metrics_db_lock = threading.Lock()
 
 MAX_ANALYTICS_DATA_CHARS = 8000
 MAX_SESSION_ID_LEN = 128
-STRICT_JSON_POST_PATHS = {"/api/query", "/api/analytics"}
-METRICS_WINDOW_SIZE = 200
+STRICT_JSON_POST_PATHS = {"/api/query", "/api/query/batch", "/api/analytics"}
+MAX_QUESTION_CHARS = 1000
+MAX_BATCH_QUESTIONS = 100
 ALERT_ERROR_RATE_PCT = 20.0
 ALERT_P95_LATENCY_MS = 1500.0
+# Percentiles de latencia publicados: (clave, cuantil)
+LATENCY_PERCENTILES = (
+    ("latency_p50_ms", 0.5),
+    ("latency_p90_ms", 0.9),
+    ("latency_p95_ms", 0.95),
+    ("latency_p99_ms", 0.99),
+    ("latency_p999_ms", 0.999),
+)
+
+# Procesamiento de consultas fuera del event loop: pool acotado de threads,
+# límite de consultas en cola y plazo máximo por petición (→ 504).
+QUERY_MAX_CONCURRENCY = int(os.getenv("QUERY_MAX_CONCURRENCY", "4"))
+QUERY_MAX_PENDING = int(
+    os.getenv("QUERY_MAX_PENDING", str(QUERY_MAX_CONCURRENCY * 8))
+)
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "15"))
+query_executor = ThreadPoolExecutor(
+    max_workers=QUERY_MAX_CONCURRENCY,
+    thread_name_prefix="query-worker",
+)
+query_slots = threading.BoundedSemaphore(QUERY_MAX_PENDING)
 
-metrics_lock = threading.Lock()
-request_counts = defaultdict(int)
-error_counts = defaultdict(int)
-latency_samples = defaultdict(lambda: deque(maxlen=METRICS_WINDOW_SIZE))
-query_agent_counts = defaultdict(int)
+# Precarga periódica de las búsquedas de Maps del bot de salud. El job se
+# programa en cada worker, pero solo descarga el que toma el bloqueo de
+# precarga; los demás leen el caché compartido en disco (ver maps_integration)
+MAPS_PREFETCH_HOURS = float(os.getenv("MAPS_PREFETCH_HOURS", "6"))
+
+# Días que se conservan las filas crudas de métricas (los agregados 5m/1h/1d
+# tienen su propia retención en metrics_storage.ROLLUP_RETENTION_DAYS)
+METRICS_RETENTION_DAYS = int(os.getenv("METRICS_RETENTION_DAYS", "30"))
+
+# Métricas en memoria: contadores y sketches de latencia por thread, sin
+# lock al escribir; se agregan al leer (ver metrics_registry.py)
+metrics_registry = get_metrics_registry()
+api_request_counter = metrics_registry.counter("api_requests")
+api_error_counter = metrics_registry.counter("api_errors")
+api_latency_histogram = metrics_registry.histogram("api_latency_ms")
+query_agent_counter = metrics_registry.counter("query_agents")
 
 
 def sync_rss_feeds():
@@ -57,24 +98,100 @@ def sync_rss_feeds():
         logger.error(f"Error sincronizando RSS: {e}")
 
 
+def prefetch_maps_cache():
+    """Tarea para mantener en caché las búsquedas de Maps del bot de salud"""
+    try:
+        refreshed = prefetch_healthcare_searches()
+        logger.info(f"Caché de Maps precargado: {refreshed} términos actualizados")
+    except Exception as e:
+        logger.error(f"Error precargando caché de Maps: {e}")
+
+
 def save_metrics_to_db():
     """Tarea para guardar snapshot de métricas cada 60 segundos"""
     global metrics_db
     try:
         if metrics_db is None:
             return
-        snapshot = get_metrics_snapshot()
-        metrics_db.save_snapshot(snapshot)
+        metrics_db.save_snapshot(get_interval_snapshot())
+        # Agregados 5m/1h/1d (incremental, solo los buckets recientes)
+        metrics_db.rollup()
     except Exception as e:
         logger.error(f"Error guardando snapshot de métricas: {e}")
 
 
+def cleanup_metrics_db():
+    """Tarea diaria para borrar métricas y agregados fuera de retención"""
+    global metrics_db
+    try:
+        if metrics_db is None:
+            return
+        deleted = metrics_db.cleanup_old_data(days=METRICS_RETENTION_DAYS)
+        logger.info(f"Limpieza de métricas: {deleted} filas borradas")
+    except Exception as e:
+        logger.error(f"Error limpiando métricas antiguas: {e}")
+
+
 def has_json_content_type(request: Request) -> bool:
     """Valida Content-Type JSON (acepta parámetros como charset)."""
     content_type = request.headers.get("content-type", "")
     return content_type.split(";")[0].strip().lower() == "application/json"
 
 
+class QueryJSONResponse(Response):
+    """
+    Respuesta JSON de /api/query: codifica con orjson (si está instalado) e
+    inserta tal cual los fragmentos pre-codificados (anunciantes, guías, tips)
+    en lugar de pasar por jsonable_encoder + json.dumps.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return encode_payload(content)
+
+
+def clamp_pagination(limit: int | None, offset: int) -> tuple[int, int]:
+    """Normaliza limit/offset a los rangos admitidos por /api/query."""
+    if limit is None or limit <= 0:
+        limit = 5
+    if limit > 20:
+        limit = 20
+    if offset < 0:
+        offset = 0
+    if offset > 1000:
+        offset = 1000
+    return limit, offset
+
+
+async def run_query_task(func, *args, **kwargs):
+    """
+    Ejecuta trabajo bloqueante del orquestador en el pool de consultas.
+
+    Raises:
+        RuntimeError: si ya hay QUERY_MAX_PENDING consultas en curso (→ 503)
+        asyncio.TimeoutError: si no termina en QUERY_TIMEOUT_SECONDS (→ 504)
+    """
+    if not query_slots.acquire(blocking=False):
+        raise RuntimeError("Cola de consultas llena")
+
+    def task():
+        # El hueco se libera cuando el thread termina de verdad, aunque la
+        # petición ya haya respondido 504.
+        try:
+            return func(*args, **kwargs)
+        finally:
+            query_slots.release()
+
+    try:
+        future = asyncio.get_running_loop().run_in_executor(
+            query_executor, task
+        )
+    except Exception:
+        query_slots.release()
+        raise
+    return await asyncio.wait_for(future, timeout=QUERY_TIMEOUT_SECONDS)
+
+
 def get_orchestrator() -> Orchestrator:
     """Inicializa el orquestador una sola vez de forma thread-safe."""
     global orchestrator
@@ -88,74 +205,147 @@ def get_orchestrator() -> Orchestrator:
     return orchestrator
 
 
-def get_metrics_snapshot() -> dict:
-    """Genera una fotografía consistente de las métricas en memoria."""
-    with metrics_lock:
-        endpoints = set(request_counts.keys())
-        endpoints.update(error_counts.keys())
-        endpoints.update(latency_samples.keys())
-
-        by_endpoint = {}
-        for endpoint in sorted(endpoints):
-            samples = list(latency_samples.get(endpoint, []))
-            avg_latency = (
-                round(sum(samples) / len(samples), 2) if samples else 0.0
-            )
-            p95_latency = 0.0
-            if samples:
-                ordered = sorted(samples)
-                idx = int(0.95 * (len(ordered) - 1))
-                p95_latency = round(ordered[idx], 2)
-
-            total_requests = request_counts.get(endpoint, 0)
-            total_errors = error_counts.get(endpoint, 0)
-            error_rate = (
-                round((total_errors / total_requests) * 100, 2)
-                if total_requests else 0.0
-            )
+def build_metrics_payload(counts: dict, errors: dict, sketches: dict,
+                          agent_counts: dict,
+                          include_sketches: bool = False,
+                          recent: tuple | None = None) -> dict:
+    """
+    Métricas por endpoint a partir de contadores y sketches agregados.
 
-            by_endpoint[endpoint] = {
-                "requests": total_requests,
-                "errors": total_errors,
-                "error_rate_pct": error_rate,
-                "latency_avg_ms": avg_latency,
-                "latency_p95_ms": p95_latency,
-                "samples": len(samples),
-            }
+    Con ``include_sketches`` cada endpoint incluye su sketch serializado
+    (para persistirlo y combinarlo con el de otros workers). ``recent``
+    (peticiones, errores) de la ventana reciente añade recent_requests,
+    recent_errors y recent_error_rate_pct a cada endpoint.
+    """
+    endpoints = set(counts)
+    endpoints.update(errors)
+    endpoints.update(sketches)
+
+    by_endpoint = {}
+    for endpoint in sorted(endpoints):
+        sketch = sketches.get(endpoint) or LatencySketch()
+        avg_latency = round(sketch.avg, 2) if sketch.count else 0.0
+
+        total_requests = counts.get(endpoint, 0)
+        total_errors = errors.get(endpoint, 0)
+        error_rate = (
+            round((total_errors / total_requests) * 100, 2)
+            if total_requests else 0.0
+        )
 
-        top_query_agents = dict(
-            sorted(
-                query_agent_counts.items(),
-                key=lambda item: item[1],
-                reverse=True,
+        values = {
+            "requests": total_requests,
+            "errors": total_errors,
+            "error_rate_pct": error_rate,
+            "latency_avg_ms": avg_latency,
+        }
+        quantiles = sketch.quantiles(q for _, q in LATENCY_PERCENTILES)
+        for key, q in LATENCY_PERCENTILES:
+            value = quantiles[q]
+            values[key] = round(value, 2) if value is not None else 0.0
+        values["samples"] = sketch.count
+        if recent is not None:
+            recent_requests = recent[0].get(endpoint, 0)
+            recent_errors = recent[1].get(endpoint, 0)
+            values["recent_requests"] = recent_requests
+            values["recent_errors"] = recent_errors
+            values["recent_error_rate_pct"] = (
+                round((recent_errors / recent_requests) * 100, 2)
+                if recent_requests else 0.0
             )
+        if include_sketches:
+            values["latency_sketch"] = sketch.to_dict()
+        by_endpoint[endpoint] = values
+
+    top_query_agents = dict(
+        sorted(
+            agent_counts.items(),
+            key=lambda item: item[1],
+            reverse=True,
         )
+    )
+
+    return {
+        "latency_relative_accuracy": DEFAULT_RELATIVE_ACCURACY,
+        "endpoints": by_endpoint,
+        "tracked_endpoints": len(by_endpoint),
+        "query_agents": top_query_agents,
+    }
 
-        return {
-            "window_size": METRICS_WINDOW_SIZE,
-            "endpoints": by_endpoint,
-            "tracked_endpoints": len(by_endpoint),
-            "query_agents": top_query_agents,
-        }
+
+def get_metrics_snapshot() -> dict:
+    """
+    Genera una fotografía consistente de las métricas en memoria.
+
+    Agrega los shards de cada thread del registro de métricas. Los
+    contadores (requests, errors, error_rate_pct) son acumulados desde el
+    arranque; la latencia (media, p50..p999, samples) y los recent_* salen
+    de la ventana reciente (último intervalo guardado más el actual), para
+    que una regresión no quede diluida en el histórico del proceso.
+    """
+    counters, histograms = metrics_registry.recent()
+    return build_metrics_payload(
+        api_request_counter.collect(),
+        api_error_counter.collect(),
+        histograms.get(api_latency_histogram.name, {}),
+        query_agent_counter.collect(),
+        recent=(
+            counters.get(api_request_counter.name, {}),
+            counters.get(api_error_counter.name, {}),
+        ),
+    )
+
+
+def get_interval_snapshot() -> dict:
+    """
+    Métricas registradas desde la llamada anterior (tarea de persistencia).
+
+    Usa el intercambio atómico del registro (swap_interval), así que solo
+    debe llamarla un consumidor: save_metrics_to_db.
+    """
+    counters, histograms = metrics_registry.swap_interval()
+    return build_metrics_payload(
+        counters.get(api_request_counter.name, {}),
+        counters.get(api_error_counter.name, {}),
+        histograms.get(api_latency_histogram.name, {}),
+        counters.get(query_agent_counter.name, {}),
+        include_sketches=True,
+    )
+
+
+def get_cache_stats() -> dict:
+    """Estadísticas de cachés del orquestador (si ya está inicializado)."""
+    if orchestrator is None or not hasattr(orchestrator, "get_cache_stats"):
+        return {}
+    return orchestrator.get_cache_stats()
 
 
 def build_metric_alerts(metrics: dict) -> list[dict]:
-    """Genera alertas simples basadas en umbrales de error y latencia."""
+    """
+    Genera alertas simples basadas en umbrales de error y latencia.
+
+    Usa la ventana reciente (recent_*, latencia) cuando está disponible, no
+    los acumulados desde el arranque.
+    """
     alerts = []
     for endpoint, values in metrics.get("endpoints", {}).items():
-        if values.get("requests", 0) < 5:
+        requests = values.get("recent_requests", values.get("requests", 0))
+        error_rate = values.get(
+            "recent_error_rate_pct", values.get("error_rate_pct", 0.0)
+        )
+        if requests < 5:
             continue
 
-        if values.get("error_rate_pct", 0.0) >= ALERT_ERROR_RATE_PCT:
+        if error_rate >= ALERT_ERROR_RATE_PCT:
             alerts.append({
                 "type": "error_rate",
                 "severity": "high",
                 "endpoint": endpoint,
-                "value": values.get("error_rate_pct", 0.0),
+                "value": error_rate,
                 "threshold": ALERT_ERROR_RATE_PCT,
                 "message": (
                     f"Error rate alto en {endpoint}: "
-                    f"{values.get('error_rate_pct', 0.0)}%"
+                    f"{error_rate}%"
                 ),
             })
 
@@ -211,6 +401,23 @@ def build_prometheus_metrics(metrics: dict) -> str:
             f'{values.get("latency_avg_ms", 0.0)}'
         )
 
+    lines.extend([
+        "# HELP revista_api_latency_ms API latency quantiles in ms",
+        "# TYPE revista_api_latency_ms summary",
+    ])
+    for endpoint, values in metrics.get("endpoints", {}).items():
+        safe_endpoint = endpoint.replace('"', "\\\"")
+        for key, q in LATENCY_PERCENTILES:
+            if key in values:
+                lines.append(
+                    f'revista_api_latency_ms{{endpoint="{safe_endpoint}",'
+                    f'quantile="{q}"}} {values[key]}'
+                )
+        lines.append(
+            f'revista_api_latency_ms_count{{endpoint="{safe_endpoint}"}} '
+            f'{values.get("requests", 0)}'
+        )
+
     lines.extend([
         "# HELP revista_query_agent_total Query count by resolved agent",
         "# TYPE revista_query_agent_total counter",
@@ -250,16 +457,28 @@ async def lifespan(app: FastAPI):
 
     scheduler.add_job(sync_rss_feeds, 'interval', hours=6)
     scheduler.add_job(save_metrics_to_db, 'interval', seconds=60)
+    scheduler.add_job(cleanup_metrics_db, 'interval', days=1)
+    if os.getenv("MAPS_PREFETCH_ENABLED", "true").lower() == "true":
+        # Primera ejecución inmediata para tener el caché caliente
+        scheduler.add_job(
+            prefetch_maps_cache, 'interval', hours=MAPS_PREFETCH_HOURS,
+            next_run_time=datetime.now()
+        )
     scheduler.start()
     logger.info(
-        "Scheduler iniciado: feeds cada 6h, métricas cada 60s"
+        f"Scheduler iniciado: feeds cada 6h, métricas cada 60s, limpieza de métricas diaria, "
+        f"Maps cada {MAPS_PREFETCH_HOURS}h"
     )
 
     yield
 
     # Shutdown
     scheduler.shutdown()
+    query_executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_recommendation_tracker()
     flush_analytics_buffer()
+    if metrics_db is not None:
+        metrics_db.close()
     logger.info("Servidor detenido correctamente")
 
 
@@ -280,6 +499,14 @@ class QueryRequest(BaseModel):
         return self.pregunta or self.question or ""
 
 
+class BatchQueryRequest(BaseModel):
+    """Modelo para consultas por lotes (re-clasificación, replays)"""
+    questions: list[str]
+    language: str = "es"
+    limit: int | None = 5
+    offset: int = 0
+
+
 class AnalyticsEvent(BaseModel):
     """Modelo para eventos de analytics"""
     event: str
@@ -334,11 +561,10 @@ async def collect_api_metrics(request: Request, call_next):
     finally:
         if path.startswith("/api/") and not path.startswith("/api/metrics"):
             elapsed_ms = (time.perf_counter() - start) * 1000
-            with metrics_lock:
-                request_counts[path] += 1
-                if status_code >= 400:
-                    error_counts[path] += 1
-                latency_samples[path].append(elapsed_ms)
+            api_request_counter.inc(path)
+            if status_code >= 400:
+                api_error_counter.inc(path)
+            api_latency_histogram.observe(path, elapsed_ms)
 
 # Middleware: Rate Limiting
 limiter = Limiter(key_func=get_remote_address,
@@ -388,6 +614,8 @@ def get_metrics():
         "status": "ok",
         "generated_at": datetime.utcnow().isoformat(),
         "metrics": metrics,
+        "caches": get_cache_stats(),
+        "tracking": get_recommendation_tracker_stats(),
         "alerts": build_metric_alerts(metrics),
     }
 
@@ -403,13 +631,15 @@ def get_prometheus_metrics():
 
 
 @app.get("/api/metrics/history")
-def get_metrics_history(hours: int = 24, endpoint: str | None = None):
+def get_metrics_history(hours: int = 24, endpoint: str | None = None,
+                        resolution: str = "auto"):
     """
     Retorna histórico de métricas.
 
     Args:
         hours: Horas a consultar (default 24)
         endpoint: Endpoint específico (opcional)
+        resolution: raw, 5m, 1h, 1d o auto (según el periodo)
 
     Returns:
         Dict con histórico organizadopor endpoint
@@ -418,23 +648,35 @@ def get_metrics_history(hours: int = 24, endpoint: str | None = None):
     if metrics_db is None:
         return {"error": "Database not initialized", "data": {}}
 
-    history = metrics_db.get_history(hours=hours, endpoint=endpoint)
+    if resolution == "auto":
+        resolution = resolution_for_hours(hours)
+    if resolution != "raw" and resolution not in ROLLUP_TABLES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid resolution. Use: raw, 5m, 1h, 1d or auto"}
+        )
+
+    history = metrics_db.get_history(hours=hours, endpoint=endpoint,
+                                     resolution=resolution)
     return {
         "period_hours": hours,
         "endpoint_filter": endpoint,
+        "resolution": resolution,
         "total_snapshots": sum(len(v) for v in history.values()),
         "data": history
     }
 
 
 @app.get("/api/metrics/trends/{endpoint}")
-def get_endpoint_trends(endpoint: str, hours: int = 24):
+def get_endpoint_trends(endpoint: str, hours: int = 24,
+                        resolution: str = "auto"):
     """
     Retorna análisis de tendencias para un endpoint.
 
     Args:
         endpoint: Nombre del endpoint (ej: /api/query)
         hours: Horas a analizar (default 24)
+        resolution: raw, 5m, 1h, 1d o auto (según el periodo)
 
     Returns:
         Dict con estadísticas y tendencias
@@ -443,7 +685,14 @@ def get_endpoint_trends(endpoint: str, hours: int = 24):
     if metrics_db is None:
         return {"error": "Database not initialized", "data": {}}
 
-    trends = metrics_db.get_trends(endpoint=endpoint, hours=hours)
+    if resolution not in ("auto", "raw") and resolution not in ROLLUP_TABLES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid resolution. Use: raw, 5m, 1h, 1d or auto"}
+        )
+
+    trends = metrics_db.get_trends(endpoint=endpoint, hours=hours,
+                                   resolution=resolution)
     return trends
 
 
@@ -579,7 +828,7 @@ def manual_sync_rss():
         )
 
 
-@app.post("/api/query")
+@app.post("/api/query", response_class=QueryJSONResponse)
 @limiter.limit("20/minute")
 async def handle_query(request: Request,
                        query: QueryRequest):
@@ -594,7 +843,7 @@ async def handle_query(request: Request,
             )
 
         # Validar que no sea demasiado largo
-        if len(question) > 1000:
+        if len(question) > MAX_QUESTION_CHARS:
             return JSONResponse(
                 status_code=400,
                 content={"error": "Pregunta demasiado larga (máx 1000)"}
@@ -605,25 +854,20 @@ async def handle_query(request: Request,
             query.language = "es"
 
         # Validar paginación
-        if query.limit is None or query.limit <= 0:
-            query.limit = 5
-        if query.limit > 20:
-            query.limit = 20
-        if query.offset < 0:
-            query.offset = 0
-        if query.offset > 1000:
-            query.offset = 1000
+        query.limit, query.offset = clamp_pagination(query.limit, query.offset)
 
         logger.info(
             f"Query: '{question}' lang={query.language} "
             f"limit={query.limit} offset={query.offset}"
         )
 
-        response_data = get_orchestrator().process_query(
-            question,
-            query.language,
-            limit=query.limit,
-            offset=query.offset,
+        response_data = await run_query_task(
+            lambda: get_orchestrator().process_query(
+                question,
+                query.language,
+                limit=query.limit,
+                offset=query.offset,
+            )
         )
 
         logger.info(
@@ -631,11 +875,10 @@ async def handle_query(request: Request,
             f"total={response_data.get('total_results')}"
         )
 
-        with metrics_lock:
-            agent_name = response_data.get("agente") or "unknown"
-            query_agent_counts[str(agent_name)] += 1
+        agent_name = response_data.get("agente") or "unknown"
+        query_agent_counter.inc(str(agent_name))
 
-        return response_data
+        return QueryJSONResponse(response_data)
 
     except ValueError as e:
         logger.warning(f"Validación fallida en /api/query: {e}")
@@ -643,7 +886,7 @@ async def handle_query(request: Request,
             status_code=400,
             content={"error": "Solicitud inválida"}
         )
-    except TimeoutError as e:
+    except asyncio.TimeoutError as e:
         logger.error(f"Timeout en /api/query: {e}", exc_info=True)
         return JSONResponse(
             status_code=504,
@@ -665,6 +908,96 @@ async def handle_query(request: Request,
         )
 
 
+@app.post("/api/query/batch", response_class=QueryJSONResponse)
+@limiter.limit("10/minute")
+async def handle_query_batch(request: Request,
+                             batch: BatchQueryRequest):
+    """Clasifica y responde varias preguntas en una sola llamada."""
+    try:
+        questions = [question.strip() for question in batch.questions]
+        if not questions:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "Lista de preguntas vacía"}
+            )
+
+        if len(questions) > MAX_BATCH_QUESTIONS:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": (
+                        "Demasiadas preguntas en el lote "
+                        f"(máx {MAX_BATCH_QUESTIONS})"
+                    )
+                }
+            )
+
+        for index, question in enumerate(questions):
+            if not question or len(question) > MAX_QUESTION_CHARS:
+                return JSONResponse(
+                    status_code=400,
+                    content={
+                        "error": (
+                            f"Pregunta {index} vacía o demasiado larga "
+                            f"(máx {MAX_QUESTION_CHARS})"
+                        )
+                    }
+                )
+
+        if batch.language not in ["es", "en"]:
+            batch.language = "es"
+        limit, offset = clamp_pagination(batch.limit, batch.offset)
+
+        logger.info(
+            f"Batch query: {len(questions)} preguntas "
+            f"lang={batch.language} limit={limit} offset={offset}"
+        )
+
+        results = await run_query_task(
+            lambda: get_orchestrator().process_queries(
+                questions,
+                batch.language,
+                limit=limit,
+                offset=offset,
+            )
+        )
+
+        for response_data in results:
+            agent_name = response_data.get("agente") or "unknown"
+            query_agent_counter.inc(str(agent_name))
+
+        return QueryJSONResponse({"total": len(results), "results": results})
+
+    except ValueError as e:
+        logger.warning(f"Validación fallida en /api/query/batch: {e}")
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Solicitud inválida"}
+        )
+    except asyncio.TimeoutError as e:
+        logger.error(f"Timeout en /api/query/batch: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=504,
+            content={"error": "Tiempo de espera agotado"}
+        )
+    except RuntimeError as e:
+        logger.error(
+            f"Error operativo en /api/query/batch: {e}", exc_info=True
+        )
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Servicio temporalmente no disponible"}
+        )
+    except Exception as e:
+        logger.error(f"ERROR en /api/query/batch: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": "Ocurrió un error interno en el servidor."
+            }
+        )
+
+
 # --- Analytics con buffer ---
 analytics_buffer = []
 analytics_lock = threading.Lock()
@@ -0,0 +1,221 @@
+# metrics_registry.py - Lock-free in-process metrics (counters, histograms)
+"""
+Per-thread sharded metrics, aggregated only when read.
+
+Every thread that records a metric gets its own shard (a plain dict stored
+in a ``threading.local``). Only the owning thread writes to a shard, so the
+hot path takes no lock: a thread-local lookup and a dict update. Readers
+copy each shard with ``dict(shard)`` (a single C-level operation under the
+GIL) and add the copies together.
+
+Shards are cumulative and never reset, so no update can be lost between a
+write and a read. Per-interval values come from ``swap_interval()``: it
+collects the cumulative totals and atomically swaps them in as the new
+baseline, returning the difference with the previous one. main.py's
+snapshot job is its single consumer; MetricsDB stores those intervals as
+they come. ``recent()`` reads the last completed interval plus the one in
+progress without swapping (live percentiles and alerts).
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from latency_sketch import LatencySketch
+
+
+class _Family:
+    """Base for a named metric with one shard per thread."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        """This thread's shard (registered on first use)."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _copies(self) -> List[Dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Family):
+    """Monotonic counters by key (endpoint, agent...)."""
+
+    def inc(self, key: str, amount: int = 1) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> Dict[str, int]:
+        """Totals across all threads."""
+        totals: Dict[str, int] = {}
+        for shard in self._copies():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+class Histogram(_Family):
+    """Latency sketches by key (see latency_sketch.LatencySketch)."""
+
+    def observe(self, key: str, value: float) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        sketch = shard.get(key)
+        if sketch is None:
+            sketch = shard[key] = LatencySketch()
+        sketch.add(value)
+
+    def collect(self) -> Dict[str, LatencySketch]:
+        """Merged sketches across all threads (independent copies)."""
+        merged: Dict[str, LatencySketch] = {}
+        for shard in self._copies():
+            for key, sketch in shard.items():
+                # copy() snapshots the bins before they are iterated
+                sketch = sketch.copy()
+                if key in merged:
+                    merged[key].merge(sketch)
+                else:
+                    merged[key] = sketch
+        return merged
+
+
+class MetricsRegistry:
+    """Named counters and histograms with aggregation on read."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._interval_lock = threading.Lock()
+        self._baseline: Optional[Tuple[Dict, Dict]] = None
+        self._last_interval: Optional[Tuple[Dict, Dict]] = None
+
+    def counter(self, name: str) -> Counter:
+        """Counter family ``name`` (created on first use)."""
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = Counter(name)
+            return self._counters[name]
+
+    def histogram(self, name: str) -> Histogram:
+        """Histogram family ``name`` (created on first use)."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name)
+            return self._histograms[name]
+
+    def collect(self) -> Tuple[Dict[str, Dict[str, int]],
+                               Dict[str, Dict[str, LatencySketch]]]:
+        """
+        Cumulative values of every family.
+
+        Returns:
+            (counters, histograms): name -> key -> total / merged sketch
+        """
+        with self._lock:
+            counters = list(self._counters.values())
+            histograms = list(self._histograms.values())
+        return (
+            {family.name: family.collect() for family in counters},
+            {family.name: family.collect() for family in histograms},
+        )
+
+    def swap_interval(self) -> Tuple[Dict[str, Dict[str, int]],
+                                     Dict[str, Dict[str, LatencySketch]]]:
+        """
+        Values recorded since the previous call (the first call returns
+        everything since start). Same shape as collect(); keys without
+        activity in the interval are left out.
+        """
+        with self._interval_lock:
+            current = self.collect()
+            previous, self._baseline = self._baseline, current
+            interval = _difference(current, previous)
+            self._last_interval = interval
+        return interval
+
+    def recent(self) -> Tuple[Dict[str, Dict[str, int]],
+                              Dict[str, Dict[str, LatencySketch]]]:
+        """
+        Values of the last completed interval plus the one in progress
+        (everything since start until the first swap_interval()). Does not
+        move the baseline.
+        """
+        with self._interval_lock:
+            baseline = self._baseline
+            last_interval = self._last_interval
+            current = self.collect()
+        counters, histograms = _difference(current, baseline)
+        if last_interval is None:
+            return counters, histograms
+
+        last_counters, last_histograms = last_interval
+        for name, values in last_counters.items():
+            merged = counters.setdefault(name, {})
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0) + value
+        for name, sketches in last_histograms.items():
+            merged = histograms.setdefault(name, {})
+            for key, sketch in sketches.items():
+                if key in merged:
+                    merged[key].merge(sketch)
+                else:
+                    merged[key] = sketch.copy()
+        return counters, histograms
+
+
+def _difference(current: Tuple[Dict, Dict],
+                previous: Optional[Tuple[Dict, Dict]]) -> Tuple[Dict, Dict]:
+    """Per-key increase between two collect() results (inactive keys left out)."""
+    counters, histograms = current
+    last_counters, last_histograms = previous or ({}, {})
+    counter_deltas = {}
+    for name, values in counters.items():
+        last = last_counters.get(name, {})
+        counter_deltas[name] = {
+            key: value - last.get(key, 0)
+            for key, value in values.items()
+            if value != last.get(key, 0)
+        }
+    histogram_deltas = {}
+    for name, sketches in histograms.items():
+        last = last_histograms.get(name, {})
+        deltas = {
+            key: sketch.delta(last.get(key))
+            for key, sketch in sketches.items()
+        }
+        histogram_deltas[name] = {
+            key: sketch for key, sketch in deltas.items() if sketch.count
+        }
+    return counter_deltas, histogram_deltas
+
+
+# Global instance
+_metrics_registry: Optional[MetricsRegistry] = None
+_metrics_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Process-wide metrics registry (singleton)."""
+    global _metrics_registry
+    if _metrics_registry is None:
+        with _metrics_registry_lock:
+            if _metrics_registry is None:
+                _metrics_registry = MetricsRegistry()
+    return _metrics_registry
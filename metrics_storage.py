@@ -1,31 +1,253 @@
 # metrics_storage.py - Persistent metrics database layer
 import sqlite3
 import json
+import queue
 import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
+
+from latency_sketch import LatencySketch, SketchMergeAggregate
+
+# Connection tuning (see ConnectionManager)
+READER_POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+CACHE_SIZE_KIB = 8 * 1024
+
+
+def _sql_time(moment: datetime) -> str:
+    """Timestamp in SQLite's CURRENT_TIMESTAMP format (sortable as text)."""
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Rollups: (name, bucket seconds, table), finest first. Each level is built
+# from the previous one (5m from the raw snapshots).
+ROLLUP_LEVELS = (
+    ("5m", 5 * 60, "metrics_rollup_5m"),
+    ("1h", 60 * 60, "metrics_rollup_1h"),
+    ("1d", 24 * 60 * 60, "metrics_rollup_1d"),
+)
+ROLLUP_TABLES = {name: table for name, _, table in ROLLUP_LEVELS}
+ROLLUP_SECONDS = {name: seconds for name, seconds, _ in ROLLUP_LEVELS}
+
+# Completed buckets re-aggregated on every rollup, so rows committed late
+# (e.g. by another worker sharing the database) are still counted
+ROLLUP_REAGGREGATE_BUCKETS = 2
+
+# Rollups are kept longer than the raw snapshots
+ROLLUP_RETENTION_DAYS = {"5m": 14, "1h": 120, "1d": 3650}
+
+# Coarsest resolution that still gives a useful curve for a window
+# (bounded number of points: ≤360 raw, ≤576 5m, ≤336 1h)
+RESOLUTION_MAX_HOURS = (("raw", 6), ("5m", 48), ("1h", 336))
+
+# Mergeable aggregates stored per bucket, and how to compute them from
+# raw snapshot rows or from finer rollup rows. Latency sketches are merged
+# by the sketch_merge() SQL aggregate (see latency_sketch.py).
+ROLLUP_COLUMNS = (
+    "measurements", "request_count", "error_count",
+    "latency_sum_ms", "latency_weight",
+    "latency_p95_sum_ms", "latency_p95_count", "latency_p95_max_ms",
+    "error_rate_sum_pct", "error_rate_max_pct", "latency_sketch",
+)
+_RAW_AGGREGATES = (
+    "COUNT(*)", "SUM(request_count)", "SUM(error_count)",
+    "SUM(latency_avg_ms * request_count)",
+    "SUM(CASE WHEN latency_avg_ms IS NOT NULL THEN request_count ELSE 0 END)",
+    "SUM(latency_p95_ms)", "COUNT(latency_p95_ms)", "MAX(latency_p95_ms)",
+    "SUM(error_rate_pct)", "MAX(error_rate_pct)",
+    "sketch_merge(latency_sketch)",
+)
+_MERGE_FUNCTIONS = {
+    "latency_p95_max_ms": "MAX",
+    "error_rate_max_pct": "MAX",
+    "latency_sketch": "sketch_merge",
+}
+_MERGE_AGGREGATES = tuple(
+    f"{_MERGE_FUNCTIONS.get(column, 'SUM')}({column})"
+    for column in ROLLUP_COLUMNS
+)
+
+# Percentiles derived from merged sketches: (key, quantile)
+SKETCH_PERCENTILES = (
+    ("latency_p50_ms", 0.5),
+    ("latency_p95_ms", 0.95),
+    ("latency_p99_ms", 0.99),
+    ("latency_p999_ms", 0.999),
+)
+
+
+def _select_aggregates(expressions) -> str:
+    return ", ".join(
+        f"{expr} AS {column}" for expr, column in zip(expressions, ROLLUP_COLUMNS)
+    )
+
+
+def _bucket_expr(column: str, seconds: int) -> str:
+    """SQL expression: start of the bucket containing ``column``."""
+    return (f"datetime((CAST(strftime('%s', {column}) AS INTEGER) / {seconds})"
+            f" * {seconds}, 'unixepoch')")
+
+
+def _bucket_floor(moment: datetime, seconds: int) -> datetime:
+    epoch = int((moment - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+
+def resolution_for_hours(hours: int) -> str:
+    """Coarsest stored resolution suitable for a window of ``hours``."""
+    for resolution, max_hours in RESOLUTION_MAX_HOURS:
+        if hours <= max_hours:
+            return resolution
+    return "1d"
+
+
+def _sketch_percentiles(sketch_json: Optional[str]) -> Dict:
+    """Percentiles of a stored sketch (None when there is no sketch)."""
+    if not sketch_json:
+        return {key: None for key, _ in SKETCH_PERCENTILES}
+    sketch = LatencySketch.from_json(sketch_json)
+    quantiles = sketch.quantiles(q for _, q in SKETCH_PERCENTILES)
+    return {key: quantiles[q] for key, q in SKETCH_PERCENTILES}
+
+
+def _summarize(row: Dict) -> Dict:
+    """Derived statistics from a row of mergeable aggregates."""
+    requests = row["request_count"] or 0
+    errors = row["error_count"] or 0
+    return {
+        **_sketch_percentiles(row["latency_sketch"]),
+        "measurements": row["measurements"] or 0,
+        "requests": requests,
+        "errors": errors,
+        "error_rate_pct": (errors / requests) * 100 if requests else 0.0,
+        "latency_avg_ms": (row["latency_sum_ms"] / row["latency_weight"]
+                           if row["latency_weight"] else None),
+        "latency_p95_avg_ms": (row["latency_p95_sum_ms"] /
+                               row["latency_p95_count"]
+                               if row["latency_p95_count"] else None),
+        "latency_p95_peak_ms": row["latency_p95_max_ms"],
+        "error_rate_avg_pct": (row["error_rate_sum_pct"] /
+                               row["measurements"]
+                               if row["measurements"] else None),
+        "error_rate_peak_pct": row["error_rate_max_pct"],
+    }
+
+
+class ConnectionManager:
+    """
+    Long-lived SQLite connections for one database file.
+
+    The database runs in WAL mode, so readers never block the writer and
+    the writer never blocks readers:
+
+    - one writer connection, serialized by ``write_lock``
+    - a small pool of read-only connections, created on demand and reused
+    """
+
+    def __init__(self, db_path: Path, pool_size: int = READER_POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.pool_size = pool_size
+        self.write_lock = threading.Lock()
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+        self._writer = self._connect(str(self.db_path))
+        self._writer.execute("PRAGMA journal_mode=WAL")
+
+    @staticmethod
+    def _connect(target: str, uri: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            target, uri=uri, check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.create_aggregate("sketch_merge", 1, SketchMergeAggregate)
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = self._connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Writer connection inside a transaction (commit or rollback)."""
+        with self.write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._readers_lock:
+                if len(self._all_readers) < self.pool_size:
+                    conn = self._open_reader()
+                    self._all_readers.append(conn)
+            if conn is None:
+                # Pool exhausted: wait for a connection to be returned
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def close(self) -> None:
+        """Close every connection (the manager cannot be used afterwards)."""
+        self._closed = True
+        with self._readers_lock:
+            for conn in self._all_readers:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all_readers = []
+        with self.write_lock:
+            self._writer.close()
 
 
 class MetricsDB:
     """SQLite-based persistent metrics storage with history and trends."""
 
     def __init__(self, db_path: str = "metrics.db"):
-        """Initialize database connection and create schema if needed."""
+        """Initialize database connections and create schema if needed."""
         self.db_path = Path(db_path)
-        self.lock = threading.Lock()
+        self.connections = ConnectionManager(self.db_path)
+        self.lock = self.connections.write_lock
         self.create_tables()
 
     def get_connection(self) -> sqlite3.Connection:
-        """Get a database connection."""
-        conn = sqlite3.connect(str(self.db_path))
+        """Get a new, independent database connection (caller closes it)."""
+        conn = sqlite3.connect(str(self.db_path), timeout=BUSY_TIMEOUT_MS / 1000)
         conn.row_factory = sqlite3.Row
         return conn
 
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.connections.close()
+
     def create_tables(self) -> None:
         """Create database schema if not exists."""
-        with self.lock:
-            conn = self.get_connection()
+        with self.connections.writer() as conn:
             cursor = conn.cursor()
 
             # Main metrics snapshot table
@@ -38,7 +260,8 @@ class MetricsDB:
                 error_count INTEGER DEFAULT 0,
                 latency_avg_ms REAL,
                 latency_p95_ms REAL,
-                error_rate_pct REAL
+                error_rate_pct REAL,
+                latency_sketch TEXT
             )
             """)
 
@@ -82,92 +305,148 @@ class MetricsDB:
                 "ON alerts_history(timestamp)"
             )
 
-            conn.commit()
-            conn.close()
+            # Rollup tables (one row per bucket and endpoint)
+            for _, _, table in ROLLUP_LEVELS:
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket_start DATETIME NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    measurements INTEGER NOT NULL,
+                    request_count INTEGER NOT NULL,
+                    error_count INTEGER NOT NULL,
+                    latency_sum_ms REAL,
+                    latency_weight INTEGER NOT NULL,
+                    latency_p95_sum_ms REAL,
+                    latency_p95_count INTEGER NOT NULL,
+                    latency_p95_max_ms REAL,
+                    error_rate_sum_pct REAL,
+                    error_rate_max_pct REAL,
+                    latency_sketch TEXT,
+                    PRIMARY KEY (bucket_start, endpoint)
+                ) WITHOUT ROWID
+                """)
+
+            # Columns added after the first release
+            for table in ("metrics_snapshot", *ROLLUP_TABLES.values()):
+                self._add_column(cursor, table, "latency_sketch", "TEXT")
+
+    @staticmethod
+    def _add_column(cursor: sqlite3.Cursor, table: str, column: str,
+                    declaration: str) -> None:
+        """Add a column to an existing table if it is missing."""
+        columns = {row[1] for row in cursor.execute(
+            f"PRAGMA table_info({table})")}
+        if column not in columns:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
 
     def save_snapshot(self, metrics: Dict) -> None:
         """
-        Save a complete metrics snapshot to database.
+        Save one interval of metrics to the database.
 
         Args:
-            metrics: Dict with endpoints, query_agent_counts, alerts from
-                     main.py get_metrics_snapshot()
+            metrics: main.py get_interval_snapshot() output: endpoints with
+                     the interval's requests/errors, latencies and
+                     optionally its latency_sketch dict, query_agents
+                     counts in the interval, plus optional alerts
+
+        Rows store the interval values as given, so history can be
+        aggregated with SUM (the in-memory registry takes care of turning
+        its cumulative counters into intervals). When a sketch is present,
+        the row's average and p95 come from it. Endpoints and agents
+        without activity in the interval are not written. Everything goes
+        in a single transaction.
         """
-        with self.lock:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            # Save endpoint metrics
-            endpoints = metrics.get("endpoints", {})
-            for endpoint, data in endpoints.items():
-                error_rate = 0.0
-                if data.get("request_count", 0) > 0:
-                    error_rate = (data.get("error_count", 0) /
-                                  data.get("request_count")) * 100
-
-                latency_avg = None
-                latency_p95 = None
-                if data.get("latency_samples"):
-                    samples = data["latency_samples"]
-                    latency_avg = sum(samples) / len(samples)
-                    sorted_samples = sorted(samples)
-                    idx = int(len(sorted_samples) * 0.95)
-                    latency_p95 = sorted_samples[min(idx,
-                                                      len(sorted_samples)-1)]
+        timestamp = _sql_time(datetime.utcnow())
+
+        endpoint_rows = []
+        for endpoint, data in metrics.get("endpoints", {}).items():
+            requests = data.get("requests", 0)
+            errors = data.get("errors", 0)
+            if not requests and not errors:
+                continue
+
+            sketch = None
+            if data.get("latency_sketch"):
+                sketch = LatencySketch.from_dict(data["latency_sketch"])
+            if sketch is not None:
+                has_latency = sketch.count > 0
+                latency_avg = sketch.avg
+                latency_p95 = sketch.quantile(0.95)
+                sketch_json = sketch.to_json() if has_latency else None
+            else:
+                has_latency = data.get("samples", 0) > 0
+                latency_avg = data.get("latency_avg_ms")
+                latency_p95 = data.get("latency_p95_ms")
+                sketch_json = None
+
+            endpoint_rows.append((
+                timestamp,
+                endpoint,
+                requests,
+                errors,
+                latency_avg if has_latency else None,
+                latency_p95 if has_latency else None,
+                (errors / requests) * 100 if requests else 0.0,
+                sketch_json
+            ))
+
+        agent_rows = [
+            (timestamp, str(agent_name), count)
+            for agent_name, count in metrics.get("query_agents", {}).items()
+            if count
+        ]
 
-                cursor.execute("""
-                INSERT INTO metrics_snapshot
-                (endpoint, request_count, error_count, latency_avg_ms,
-                 latency_p95_ms, error_rate_pct)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    endpoint,
-                    data.get("request_count", 0),
-                    data.get("error_count", 0),
-                    latency_avg,
-                    latency_p95,
-                    error_rate
-                ))
-
-            # Save agent counts
-            agents = metrics.get("query_agent_counts", {})
-            for agent_name, count in agents.items():
-                cursor.execute("""
-                INSERT INTO agent_metrics (agent_name, count)
-                VALUES (?, ?)
-                """, (str(agent_name), count))
+        alert_rows = [
+            (
+                timestamp,
+                alert.get("endpoint"),
+                alert.get("type"),
+                alert.get("message"),
+                alert.get("value")
+            )
+            for alert in metrics.get("alerts", [])
+        ]
 
-            # Save alerts
-            alerts = metrics.get("alerts", [])
-            for alert in alerts:
-                cursor.execute("""
-                INSERT INTO alerts_history
-                (endpoint, alert_type, message, value)
-                VALUES (?, ?, ?, ?)
-                """, (
-                    alert.get("endpoint"),
-                    alert.get("type"),
-                    alert.get("message"),
-                    alert.get("value")
-                ))
-
-            conn.commit()
-            conn.close()
+        with self.connections.writer() as conn:
+            conn.executemany("""
+            INSERT INTO metrics_snapshot
+            (timestamp, endpoint, request_count, error_count,
+             latency_avg_ms, latency_p95_ms, error_rate_pct,
+             latency_sketch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, endpoint_rows)
+            conn.executemany("""
+            INSERT INTO agent_metrics (timestamp, agent_name, count)
+            VALUES (?, ?, ?)
+            """, agent_rows)
+            conn.executemany("""
+            INSERT INTO alerts_history
+            (timestamp, endpoint, alert_type, message, value)
+            VALUES (?, ?, ?, ?, ?)
+            """, alert_rows)
 
     def get_history(self, hours: int = 24,
-                    endpoint: Optional[str] = None) -> Dict:
+                    endpoint: Optional[str] = None,
+                    resolution: str = "raw") -> Dict:
         """
         Retrieve metrics history for a time period.
 
         Args:
             hours: Number of hours to look back (default 24)
             endpoint: Optional endpoint filter
+            resolution: "raw" (one row per snapshot), "5m", "1h", "1d"
+                        (rollup buckets) or "auto" (resolution_for_hours)
 
         Returns:
             Dict with endpoints containing list of records
         """
-        with self.lock:
-            conn = self.get_connection()
+        if resolution == "auto":
+            resolution = resolution_for_hours(hours)
+        if resolution != "raw":
+            return self._get_rollup_history(hours, endpoint, resolution)
+
+        with self.connections.reader() as conn:
             cursor = conn.cursor()
 
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
@@ -177,16 +456,15 @@ class MetricsDB:
                 SELECT * FROM metrics_snapshot
                 WHERE timestamp >= ? AND endpoint = ?
                 ORDER BY timestamp ASC
-                """, (cutoff_time.isoformat(), endpoint))
+                """, (_sql_time(cutoff_time), endpoint))
             else:
                 cursor.execute("""
                 SELECT * FROM metrics_snapshot
                 WHERE timestamp >= ?
                 ORDER BY timestamp ASC
-                """, (cutoff_time.isoformat(),))
+                """, (_sql_time(cutoff_time),))
 
             rows = cursor.fetchall()
-            conn.close()
 
             # Organize by endpoint
             history = {}
@@ -206,19 +484,58 @@ class MetricsDB:
 
             return history
 
+    def _get_rollup_history(self, hours: int, endpoint: Optional[str],
+                            resolution: str) -> Dict:
+        """History records built from one rollup table."""
+        table = ROLLUP_TABLES[resolution]
+        cutoff_time = _bucket_floor(
+            datetime.utcnow() - timedelta(hours=hours),
+            ROLLUP_SECONDS[resolution]
+        )
+        query = f"SELECT * FROM {table} WHERE bucket_start >= ?"
+        params = [_sql_time(cutoff_time)]
+        if endpoint:
+            query += " AND endpoint = ?"
+            params.append(endpoint)
+        query += " ORDER BY bucket_start ASC"
+
+        with self.connections.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        history = {}
+        for row in rows:
+            stats = _summarize(row)
+            history.setdefault(row["endpoint"], []).append({
+                "timestamp": row["bucket_start"],
+                "request_count": stats["requests"],
+                "error_count": stats["errors"],
+                "latency_avg_ms": stats["latency_avg_ms"],
+                # p95 of the merged sketches; without sketches (older
+                # rows), the worst interval p95 inside the bucket
+                "latency_p95_ms": (stats["latency_p95_ms"]
+                                   if stats["latency_p95_ms"] is not None
+                                   else stats["latency_p95_peak_ms"]),
+                "error_rate_pct": stats["error_rate_pct"]
+            })
+        return history
+
     def get_trends(self, endpoint: str,
-                   hours: int = 24) -> Dict:
+                   hours: int = 24, resolution: str = "raw") -> Dict:
         """
         Calculate trends for an endpoint.
 
         Args:
             endpoint: Endpoint name
             hours: Number of hours to analyze
+            resolution: Data source, as in get_history
 
         Returns:
             Dict with peak values, averages, and trends
         """
-        history = self.get_history(hours=hours, endpoint=endpoint)
+        if resolution == "auto":
+            resolution = resolution_for_hours(hours)
+        history = self.get_history(hours=hours, endpoint=endpoint,
+                                   resolution=resolution)
 
         if endpoint not in history or not history[endpoint]:
             return {
@@ -228,17 +545,8 @@ class MetricsDB:
             }
 
         records = history[endpoint]
-
-        # Calculate statistics
-        latencies = [r["latency_p95_ms"] for r in records
-                     if r["latency_p95_ms"] is not None]
-        error_rates = [r["error_rate_pct"] for r in records]
-
-        peak_latency = max(latencies) if latencies else None
-        avg_latency = sum(latencies) / len(latencies) if latencies else None
-        peak_error_rate = max(error_rates) if error_rates else None
-        avg_error_rate = sum(error_rates) / len(error_rates) if error_rates \
-            else None
+        summary = self.get_summary(hours=hours, endpoint=endpoint,
+                                   resolution=resolution)[endpoint]
 
         # Find peak error moment
         peak_error_record = max(records, key=lambda x: x["error_rate_pct"],
@@ -247,21 +555,119 @@ class MetricsDB:
         return {
             "endpoint": endpoint,
             "period_hours": hours,
+            "resolution": resolution,
             "statistics": {
                 "latency": {
-                    "peak_ms": peak_latency,
-                    "average_ms": avg_latency
+                    "peak_ms": summary["latency_p95_peak_ms"],
+                    "average_ms": summary["latency_p95_avg_ms"],
+                    "p50_ms": summary["latency_p50_ms"],
+                    "p95_ms": summary["latency_p95_ms"],
+                    "p99_ms": summary["latency_p99_ms"],
+                    "p999_ms": summary["latency_p999_ms"]
                 },
                 "error_rate": {
-                    "peak_pct": peak_error_rate,
-                    "average_pct": avg_error_rate
+                    "peak_pct": summary["error_rate_peak_pct"],
+                    "average_pct": summary["error_rate_avg_pct"]
                 },
-                "total_measurements": len(records)
+                "requests": summary["requests"],
+                "errors": summary["errors"],
+                "total_measurements": summary["measurements"]
             },
             "peak_error_moment": peak_error_record,
             "data": records
         }
 
+    def get_summary(self, hours: int = 24,
+                    endpoint: Optional[str] = None,
+                    resolution: str = "raw") -> Dict[str, Dict]:
+        """
+        Per-endpoint aggregates for a time period, computed in SQL.
+
+        Args:
+            hours: Number of hours to look back (default 24)
+            endpoint: Optional endpoint filter
+            resolution: Data source, as in get_history
+
+        Returns:
+            Dict endpoint -> requests, errors, error_rate_pct, request-weighted
+            latency_avg_ms, average/peak p95 latency, average/peak error rate
+            and number of measurements, plus period percentiles
+            (latency_p50_ms .. latency_p999_ms) from the merged latency
+            sketches (None for data stored without sketches)
+        """
+        if resolution == "auto":
+            resolution = resolution_for_hours(hours)
+
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        if resolution == "raw":
+            source, time_column = "metrics_snapshot", "timestamp"
+            aggregates = _select_aggregates(_RAW_AGGREGATES)
+        else:
+            source, time_column = ROLLUP_TABLES[resolution], "bucket_start"
+            aggregates = _select_aggregates(_MERGE_AGGREGATES)
+            cutoff_time = _bucket_floor(cutoff_time,
+                                        ROLLUP_SECONDS[resolution])
+
+        query = (f"SELECT endpoint, {aggregates} FROM {source} "
+                 f"WHERE {time_column} >= ?")
+        params = [_sql_time(cutoff_time)]
+        if endpoint:
+            query += " AND endpoint = ?"
+            params.append(endpoint)
+        query += " GROUP BY endpoint ORDER BY endpoint"
+
+        with self.connections.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return {row["endpoint"]: _summarize(row) for row in rows}
+
+    def rollup(self) -> Dict[str, int]:
+        """
+        Refresh the 5m/1h/1d rollup tables (scheduler maintenance task).
+
+        Incremental: each level recomputes, from the level below it, the
+        last stored bucket (which may have been partial) and the
+        ROLLUP_REAGGREGATE_BUCKETS before it, then any newer ones. Buckets
+        are upserted, so a raw row committed after a later bucket was
+        rolled up (another worker writing to the same database) is picked
+        up on the next run. Safe to run as often as snapshots are saved.
+
+        Returns:
+            Dict resolution -> number of buckets written
+        """
+        written = {}
+        source = "metrics_snapshot"
+        source_time = "timestamp"
+        source_aggregates = _RAW_AGGREGATES
+
+        with self.connections.writer() as conn:
+            for name, seconds, table in ROLLUP_LEVELS:
+                lookback = seconds * ROLLUP_REAGGREGATE_BUCKETS
+                last = conn.execute(
+                    f"SELECT datetime(MAX(bucket_start), "
+                    f"'-{lookback} seconds') FROM {table}"
+                ).fetchone()[0]
+                since = last or "0000-00-00 00:00:00"
+                bucket = _bucket_expr(source_time, seconds)
+
+                # The second condition drops rows of earlier buckets whose
+                # timestamp text sorts after ``since`` (legacy ISO format)
+                cursor = conn.execute(f"""
+                INSERT OR REPLACE INTO {table}
+                (bucket_start, endpoint, {", ".join(ROLLUP_COLUMNS)})
+                SELECT {bucket} AS bucket, endpoint,
+                       {", ".join(source_aggregates)}
+                FROM {source}
+                WHERE {source_time} >= ? AND {bucket} >= ?
+                GROUP BY bucket, endpoint
+                """, (since, since))
+                written[name] = cursor.rowcount
+
+                source, source_time = table, "bucket_start"
+                source_aggregates = _MERGE_AGGREGATES
+
+        return written
+
     def get_agent_history(self, hours: int = 24) -> Dict:
         """
         Get agent activity history.
@@ -272,8 +678,7 @@ class MetricsDB:
         Returns:
             Dict with agent counts over time
         """
-        with self.lock:
-            conn = self.get_connection()
+        with self.connections.reader() as conn:
             cursor = conn.cursor()
 
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
@@ -282,10 +687,9 @@ class MetricsDB:
             SELECT * FROM agent_metrics
             WHERE timestamp >= ?
             ORDER BY timestamp ASC
-            """, (cutoff_time.isoformat(),))
+            """, (_sql_time(cutoff_time),))
 
             rows = cursor.fetchall()
-            conn.close()
 
             # Organize by agent
             history = {}
@@ -313,8 +717,7 @@ class MetricsDB:
         Returns:
             List of alert records
         """
-        with self.lock:
-            conn = self.get_connection()
+        with self.connections.reader() as conn:
             cursor = conn.cursor()
 
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
@@ -324,16 +727,15 @@ class MetricsDB:
                 SELECT * FROM alerts_history
                 WHERE timestamp >= ? AND alert_type = ?
                 ORDER BY timestamp DESC
-                """, (cutoff_time.isoformat(), alert_type))
+                """, (_sql_time(cutoff_time), alert_type))
             else:
                 cursor.execute("""
                 SELECT * FROM alerts_history
                 WHERE timestamp >= ?
                 ORDER BY timestamp DESC
-                """, (cutoff_time.isoformat(),))
+                """, (_sql_time(cutoff_time),))
 
             rows = cursor.fetchall()
-            conn.close()
 
             return [dict(row) for row in rows]
 
@@ -347,8 +749,7 @@ class MetricsDB:
         Returns:
             Number of rows deleted
         """
-        with self.lock:
-            conn = self.get_connection()
+        with self.connections.writer() as conn:
             cursor = conn.cursor()
 
             cutoff_time = datetime.utcnow() - timedelta(days=days)
@@ -358,13 +759,17 @@ class MetricsDB:
                          "alerts_history"]:
                 cursor.execute(f"""
                 DELETE FROM {table} WHERE timestamp < ?
-                """, (cutoff_time.isoformat(),))
+                """, (_sql_time(cutoff_time),))
                 deleted += cursor.rowcount
 
-            conn.commit()
-            conn.close()
+            for name, _, table in ROLLUP_LEVELS:
+                rollup_days = max(days, ROLLUP_RETENTION_DAYS[name])
+                cursor.execute(f"""
+                DELETE FROM {table} WHERE bucket_start < ?
+                """, (_sql_time(datetime.utcnow() - timedelta(days=rollup_days)),))
+                deleted += cursor.rowcount
 
-            return deleted
+        return deleted
 
     def export_to_csv(self, endpoint: Optional[str] = None,
                       hours: int = 24) -> str:
@@ -434,37 +839,27 @@ class MetricsDB:
         Returns:
             HTML string with summary table and key metrics
         """
-        history = self.get_history(hours=hours)
+        summary = self.get_summary(hours=hours)
 
-        if not history:
+        if not summary:
             return ("<html><body><p>No metrics data available</p>"
                     "</body></html>")
 
-        # Calculate summary statistics
-        total_requests = 0
-        total_errors = 0
-        avg_latency_values = []
-        p95_latency_values = []
-        error_rates = []
-
-        for endpoint_records in history.values():
-            for record in endpoint_records:
-                total_requests += record.get("request_count", 0)
-                total_errors += record.get("error_count", 0)
-                if record.get("latency_avg_ms") is not None:
-                    avg_latency_values.append(record["latency_avg_ms"])
-                if record.get("latency_p95_ms") is not None:
-                    p95_latency_values.append(record["latency_p95_ms"])
-                if record.get("error_rate_pct") is not None:
-                    error_rates.append(record["error_rate_pct"])
-
-        avg_latency = (sum(avg_latency_values) / len(avg_latency_values)
-                       if avg_latency_values else 0)
-        avg_p95_latency = (sum(p95_latency_values) /
-                           len(p95_latency_values)
-                           if p95_latency_values else 0)
-        avg_error_rate = (sum(error_rates) / len(error_rates)
-                          if error_rates else 0)
+        # Summary statistics over the period (rows are interval deltas)
+        total_requests = sum(totals["requests"] for totals in summary.values())
+        total_errors = sum(totals["errors"] for totals in summary.values())
+        weighted = [(totals["latency_avg_ms"], totals["requests"])
+                    for totals in summary.values()
+                    if totals["latency_avg_ms"] is not None]
+        weighted_requests = sum(count for _, count in weighted)
+        avg_latency = (sum(avg * count for avg, count in weighted) /
+                       weighted_requests if weighted_requests else 0)
+        p95_values = [totals["latency_p95_avg_ms"] for totals in summary.values()
+                      if totals["latency_p95_avg_ms"] is not None]
+        avg_p95_latency = (sum(p95_values) / len(p95_values)
+                           if p95_values else 0)
+        avg_error_rate = ((total_errors / total_requests) * 100
+                          if total_requests else 0)
 
         # Build HTML report
         html = f"""<html>
@@ -530,17 +925,14 @@ class MetricsDB:
         <tbody>
 """
 
-        for endpoint in sorted(history.keys()):
-            records = history[endpoint]
-            if records:
-                latest = records[-1]  # Most recent record
-                html += f"""            <tr>
+        for endpoint, totals in summary.items():
+            html += f"""            <tr>
                 <td>{endpoint}</td>
-                <td>{latest.get('request_count', 0)}</td>
-                <td>{latest.get('error_count', 0)}</td>
-                <td>{latest.get('error_rate_pct', 0):.2f}%</td>
-                <td>{latest.get('latency_avg_ms', 0):.2f}</td>
-                <td>{latest.get('latency_p95_ms', 0):.2f}</td>
+                <td>{totals['requests']}</td>
+                <td>{totals['errors']}</td>
+                <td>{totals['error_rate_pct']:.2f}%</td>
+                <td>{totals['latency_avg_ms'] or 0:.2f}</td>
+                <td>{totals['latency_p95_avg_ms'] or 0:.2f}</td>
             </tr>
 """
 
@@ -4,7 +4,7 @@ Proporciona endpoints REST para consultas sobre visados, NIE y documentación
 """
 
 from flask import Blueprint, request, jsonify
-from bots.bot_immigration import ImmigrationBot
+from bots.bot_immigration import get_immigration_bot
 
 immigration_api = Blueprint('immigration_api', __name__)
 
@@ -56,8 +56,8 @@ def handle_immigration_query():
         if language not in ['es', 'en']:
             language = 'es'
 
-        # Crear instancia del bot de inmigración
-        bot = ImmigrationBot(language=language)
+        # Instancia compartida del bot de inmigración (una por idioma)
+        bot = get_immigration_bot(language)
 
         # Obtener respuesta
         response_text = bot.get_response(message)
@@ -83,12 +83,12 @@ def handle_immigration_query():
 def health_check():
     """Health check para verificar que el endpoint está funcionando"""
     try:
-        bot = ImmigrationBot('es')
+        bot = get_immigration_bot('es')
         return jsonify({
             "status": "ok",
             "bot": "ImmigrationBot",
             "legal_ads_loaded": len(bot.legal_ads),
-            "countries_supported": len(bot.get_visa_info.__code__.co_consts)  # aproximado
+            "countries_supported": len(bot.countries)
         }), 200
     except Exception as e:
         return jsonify({
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from bots.advertiser import Advertiser, to_plain, with_flags
+from bots.response_format import make_standard_response
+from bots.utils import build_key_points, filter_advertisers_by_keywords
+
+
+def test_from_raw_normalizes_spanish_and_english_keys():
+    advertiser = Advertiser.from_raw({
+        "title": "Dental Sonrisa",
+        "description": "Clínica dental",
+        "descripcion": "",
+        "contact": "info@example.com",
+        "languages": "ES, EN",
+        "url": "https://example.com",
+    })
+
+    assert advertiser.nombre == "Dental Sonrisa"
+    assert advertiser.descripcion == "Clínica dental"
+    assert advertiser["contacto"] == "info@example.com"
+    # Las claves originales siguen funcionando como alias
+    assert advertiser.get("title") == "Dental Sonrisa"
+    assert advertiser.get("url") == "https://example.com"
+    assert advertiser.get("precio", "n/a") == "n/a"
+    assert advertiser.to_dict() == {
+        "nombre": "Dental Sonrisa",
+        "descripcion": "Clínica dental",
+        "contacto": "info@example.com",
+        "idiomas": "ES, EN",
+        "url": "https://example.com",
+    }
+
+
+def test_advertiser_is_immutable_and_flags_return_copies():
+    advertiser = Advertiser.from_raw({"nombre": "Academia", "id": "a1"})
+
+    with pytest.raises(AttributeError):
+        advertiser.nombre = "Otro"
+    assert not hasattr(advertiser, "__dict__")
+
+    flagged = with_flags(advertiser, es_anunciante=True)
+    assert flagged["es_anunciante"] is True
+    assert "es_anunciante" not in advertiser
+    assert with_flags({"nombre": "x"}, es_anunciante=True) == {"nombre": "x", "es_anunciante": True}
+
+
+def test_serialization_is_cached_and_matches_dict():
+    advertiser = Advertiser.from_raw({"nombre": "Gestoría López", "beneficios": ["NIE"]})
+
+    assert advertiser.to_dict() is advertiser.to_dict()
+    assert advertiser.to_dict().encoded is advertiser.to_dict().encoded
+    assert json.loads(advertiser.to_json()) == advertiser.to_dict()
+    assert to_plain(advertiser) == {"nombre": "Gestoría López", "beneficios": ["NIE"]}
+    assert advertiser == {"nombre": "Gestoría López", "beneficios": ["NIE"]}
+
+
+def test_pipeline_helpers_accept_advertiser_records():
+    raw = [
+        {"nombre": "Hotel Arts", "descripcion": "Alojamiento de lujo", "beneficios": "Spa"},
+        {"title": "Bar Central", "description": "Copas"},
+    ]
+    records = [Advertiser.from_raw(a) for a in raw]
+
+    assert filter_advertisers_by_keywords("algo", records, ["hotel"]) == [records[0]]
+    assert build_key_points(records, max_items=1) == [
+        {"nombre": "Hotel Arts", "descripcion": "Alojamiento de lujo", "beneficios": "Spa"}
+    ]
+    assert make_standard_response("Accommodation", records)["json"] == \
+        make_standard_response("Accommodation", raw)["json"]
+
+
+def test_equal_advertisers_hash_equal():
+    raw = {"nombre": "Gestoría López", "beneficios": ["NIE"], "faq": [{"q": "¿NIE?"}], "id": "g1"}
+    first = Advertiser.from_raw(raw)
+    # Mismo contenido con claves en otro orden y alias en inglés
+    second = Advertiser.from_raw({"id": "g1", "faqs": [{"q": "¿NIE?"}], "benefits": ["NIE"],
+                                  "title": "Gestoría López"})
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert len({first, second}) == 1
+    assert list(dict.fromkeys([first, second, first.with_flags(es_anunciante=True)])) == [
+        first, first.with_flags(es_anunciante=True)
+    ]
@@ -0,0 +1,54 @@
+from bots.bot_immigration import ImmigrationBot, get_immigration_bot
+
+
+def test_get_immigration_bot_is_shared_per_language():
+    assert get_immigration_bot("es") is get_immigration_bot("ES")
+    assert get_immigration_bot("en") is not get_immigration_bot("es")
+    # Idiomas no soportados usan la instancia en español
+    assert get_immigration_bot("fr") is get_immigration_bot("es")
+
+
+def test_static_answers_are_prerendered():
+    bot = get_immigration_bot("es")
+
+    assert bot.get_response("primeros pasos") is bot.get_first_steps()
+    assert bot.get_response("Necesito el NIE") is bot.get_nie_info()
+    assert bot.get_response("empadronamiento") is bot.get_empadronamiento_info()
+    assert bot.get_first_steps().startswith("📋 **Checklist: 10 Primeros Pasos**")
+    assert bot.get_nie_info().endswith(bot._legal_note())
+
+
+def test_intent_priority_matches_original_order():
+    bot = ImmigrationBot("en")
+
+    # first steps > nie > empadronamiento > visa
+    assert bot.detect_intent("first steps and visa")[0] == "first_steps"
+    assert bot.detect_intent("need NIE and visa")[0] == "nie"
+    assert bot.detect_intent("empadron y visado")[0] == "empadronamiento"
+    assert bot.detect_intent("hello") == (None, None)
+
+
+def test_visa_question_uses_first_listed_country():
+    bot = ImmigrationBot("en")
+
+    # Canada aparece antes que USA en el texto, pero USA va antes en la lista
+    response = bot.get_response("visa for Canada or USA")
+    assert response.startswith("📋 **Visa Information for USA**")
+    assert bot.get_response("I need a visa") == bot._ask_country
+
+    info = bot.get_visa_info("usa")
+    assert info["country"] == "USA"
+    assert info["data"] is bot.knowledge_base.get_country("US")["ficha"]["en"]
+    assert bot.get_visa_info("Narnia")["data"] is None
+
+
+def test_generic_card_is_reachable_by_alias():
+    bot_es = get_immigration_bot("es")
+    bot_en = get_immigration_bot("en")
+
+    assert bot_es.get_response("visa Otro").startswith("📋 **Información de Visado para Otro**")
+    assert bot_en.get_response("visa for another country, other").startswith("📋 **Visa Information for Other**")
+    # Un país concreto gana a la ficha genérica
+    assert bot_es.get_response("visado para otro país: Francia").startswith(
+        "📋 **Información de Visado para Francia**"
+    )
@@ -0,0 +1,41 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bots.embedding_store import (
+    descriptions_hash,
+    load_category_embeddings,
+    save_category_embeddings,
+)
+
+
+def test_embeddings_roundtrip_is_memory_mapped(tmp_path):
+    categories = [
+        {"name": "Healthcare", "description": "Servicios sobre healthcare"},
+        {"name": "Legal", "description": "Servicios sobre legal"},
+    ]
+    digest = descriptions_hash({c["name"]: c["description"] for c in categories})
+    matrix = np.arange(8, dtype=np.float32).reshape(2, 4)
+
+    save_category_embeddings(tmp_path, "model/x", digest, categories, matrix)
+    loaded = load_category_embeddings(tmp_path, "model/x", digest)
+
+    assert loaded is not None
+    loaded_categories, loaded_matrix = loaded
+    assert loaded_categories == categories
+    assert isinstance(loaded_matrix, np.memmap)
+    assert np.array_equal(loaded_matrix, matrix)
+
+
+def test_embeddings_cache_is_keyed_by_model_and_hash(tmp_path):
+    categories = [{"name": "Retail", "description": "tienda"}]
+    digest = descriptions_hash({"Retail": "tienda"})
+    save_category_embeddings(
+        tmp_path, "model-a", digest, categories, np.ones((1, 3))
+    )
+
+    assert load_category_embeddings(tmp_path, "model-b", digest) is None
+    assert load_category_embeddings(
+        tmp_path, "model-a", descriptions_hash({"Retail": "tienda, moda"})
+    ) is None
+    assert load_category_embeddings(tmp_path, "model-a", digest) is not None
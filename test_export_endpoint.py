@@ -15,12 +15,14 @@ class TestExportEndpoint:
         self.db.save_snapshot({
             "endpoints": {
                 "/api/query": {
-                    "request_count": 10,
-                    "error_count": 1,
-                    "latency_samples": [10, 20, 30]
+                    "requests": 10,
+                    "errors": 1,
+                    "latency_avg_ms": 20.0,
+                    "latency_p95_ms": 20.0,
+                    "samples": 3
                 }
             },
-            "query_agent_counts": {"bot": 3},
+            "query_agents": {"bot": 3},
             "alerts": []
         })
         main.metrics_db = self.db
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bots.http_client import PooledHTTPClient
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def do_GET(self):
+        RecordingHandler.client_ports.append(self.client_address[1])
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    RecordingHandler.client_ports = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_requests_reuse_keep_alive_connection(local_server):
+    client = PooledHTTPClient(max_connections_per_host=2)
+    try:
+        first = client.get(f"{local_server}/advertisers")
+        second = client.get(f"{local_server}/advertisers/1")
+    finally:
+        client.close()
+
+    assert first.json() == {"path": "/advertisers"}
+    assert second.status_code == 200
+    # Misma conexión TCP (mismo puerto cliente) para ambas peticiones
+    assert len(set(RecordingHandler.client_ports)) == 1
+
+
+def test_async_interface_returns_response(local_server):
+    client = PooledHTTPClient()
+
+    async def run():
+        try:
+            return await client.aget(f"{local_server}/health")
+        finally:
+            await client.aclose()
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.json() == {"path": "/health"}
+
+
+def test_async_client_of_a_closed_loop_is_closed(local_server):
+    client = PooledHTTPClient()
+
+    async def get():
+        await client.aget(f"{local_server}/health")
+        return client._async_clients[asyncio.get_running_loop()]
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    try:
+        # El cliente del primer loop se cierra al detectar el loop nuevo
+        assert first is not second
+        assert first.is_closed
+        assert list(client._async_clients.values()) == [second]
+    finally:
+        asyncio.run(client.aclose())
+    assert second.is_closed
+    assert client._async_clients == {}
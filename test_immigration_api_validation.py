@@ -34,3 +34,15 @@ def test_immigration_rejects_too_long_message():
     assert resp.status_code == 400
     data = resp.get_json()
     assert "1000" in data["error"]
+
+
+def test_immigration_health_reports_supported_countries():
+    app = build_test_app()
+    client = app.test_client()
+
+    resp = client.get("/api/immigration/health")
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["status"] == "ok"
+    assert data["countries_supported"] == 20
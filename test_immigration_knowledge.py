@@ -0,0 +1,89 @@
+import json
+import os
+
+from bots.bot_immigration import ImmigrationBot, get_immigration_bot
+from bots.immigration_knowledge import ImmigrationKnowledgeBase, get_immigration_knowledge_base
+
+
+def test_aliases_resolve_to_canonical_country():
+    kb = get_immigration_knowledge_base()
+
+    for alias in ("EEUU", "EE.UU.", "Estados Unidos", "USA", "united states of america"):
+        assert kb.resolve(alias) == "US"
+    assert kb.resolve("UK") == "UK"
+    assert kb.resolve("Reino Unido") == "UK"
+    # Sin acentos y sin distinguir mayúsculas
+    assert kb.resolve("canada") == kb.resolve("CANADÁ") == "CA"
+    assert kb.resolve("Narnia") is None
+
+
+def test_find_countries_matches_whole_tokens_in_order():
+    kb = get_immigration_knowledge_base()
+
+    assert kb.find_countries("Me mudo desde EE.UU. con mi pareja de Gran Bretaña") == ["US", "UK"]
+    assert kb.find_countries("New Zealand or Netherlands") == ["NZ", "NL"]
+    # Ya no hay falsos positivos por subcadena ("usando" contiene "usa")
+    assert kb.find_countries("estoy usando la app") == []
+
+
+def test_bot_uses_alias_index():
+    bot = get_immigration_bot("en")
+
+    assert bot.get_response("visa from EEUU").startswith("📋 **Visa Information for USA**")
+    assert bot.get_visa_info("Estados Unidos")["country"] == "USA"
+    assert get_immigration_bot("es").get_visa_info("Reino")["country"] == "Reino Unido"
+
+
+def test_knowledge_base_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "immigration_info.json"
+
+    def write(paises, mtime):
+        path.write_text(json.dumps({"visados_espana": {"paises": paises}}), encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    write({"Francia": {"nombre": "Francia", "codigo": "FR"}}, 1_000_000)
+    kb = ImmigrationKnowledgeBase(path, check_interval=0)
+    assert kb.resolve("Francia") == "FR"
+    assert kb.resolve("France") is None
+    version = kb.version
+
+    write({"Francia": {"nombre": "Francia", "codigo": "FR", "alias": ["France"]}}, 1_000_100)
+    assert kb.resolve("France") == "FR"
+    assert kb.version == version + 1
+
+    # Un fichero corrupto no borra la última versión válida
+    path.write_text("{", encoding="utf-8")
+    os.utime(path, (1_000_200, 1_000_200))
+    assert kb.resolve("France") == "FR"
+
+
+def test_visa_answers_follow_the_knowledge_base(tmp_path):
+    path = tmp_path / "immigration_info.json"
+
+    def write(visado, mtime):
+        ficha = {
+            "pais": "Francia",
+            "visado": visado,
+            "duracion": "Ilimitada",
+            "nie": "Sí",
+            "documentacion": ["DNI o pasaporte"],
+            "tiempo_tramite": "Inmediato",
+            "costo_estimado": "0€",
+        }
+        paises = {"Francia": {"nombre": "Francia", "codigo": "FR", "ficha": {"es": ficha}}}
+        path.write_text(json.dumps({"visados_espana": {"paises": paises}}), encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    write("No requerido (UE)", 1_000_000)
+    bot = ImmigrationBot("es")
+    bot.knowledge_base = ImmigrationKnowledgeBase(path, check_interval=0)
+    assert bot.countries == ["Francia"]
+    assert "**Visado:** No requerido (UE)" in bot.get_response("visado desde Francia")
+
+    # Editar el fichero cambia la respuesta sin reiniciar
+    write("Libre circulación", 1_000_100)
+    assert "**Visado:** Libre circulación" in bot.get_response("visado desde Francia")
+    # Sin ficha en inglés el país no tiene respuesta en ese idioma
+    bot_en = ImmigrationBot("en")
+    bot_en.knowledge_base = bot.knowledge_base
+    assert bot_en.countries == []
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from bots import json_fragments
+from bots.json_fragments import EncodedDict, EncodedList, encode_payload
+
+
+def test_encoded_containers_are_read_only_and_cache_bytes():
+    record = EncodedDict({"nombre": "Clínica", "beneficios": ["A", "B"]})
+    tips = EncodedList(["uno", "dos"])
+
+    assert record.encoded is record.encoded
+    assert json.loads(record.encoded) == {"nombre": "Clínica", "beneficios": ["A", "B"]}
+    assert json.loads(tips.encoded) == ["uno", "dos"]
+
+    with pytest.raises(TypeError):
+        record["nombre"] = "Otro"
+    with pytest.raises(TypeError):
+        tips.append("tres")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode_payload_splices_fragments(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_fragments, "orjson", None)
+    elif json_fragments.orjson is None:
+        pytest.skip("orjson no instalado")
+
+    payload = {
+        "respuesta": "Aquí tienes opciones en Gràcia",
+        "confidence": 0.9,
+        "json": [EncodedDict({"nombre": "Hotel Arts"}), {"nombre": "Maps", "rating": None}],
+        "tips": EncodedList(["Revisa el contrato"]),
+        "guias": [],
+        "next_offset": None,
+    }
+
+    encoded = encode_payload(payload)
+
+    assert json.loads(encoded) == json.loads(json.dumps(payload))
+    assert "Gràcia".encode("utf-8") in encoded  # sin escapes \\u
+
+
+def test_query_endpoint_uses_fragment_response(monkeypatch):
+    class FragmentOrchestrator:
+        def process_query(self, question, language, limit=None, offset=0):
+            return {
+                "respuesta": "ok",
+                "agente": "Healthcare",
+                "json": [EncodedDict({"nombre": "Dental Sonrisa"})],
+                "tips": EncodedList(["Confirma el seguro"]),
+            }
+
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main, "orchestrator", FragmentOrchestrator())
+
+    client = TestClient(main.app)
+    response = client.post("/api/query", json={"question": "dentista", "language": "es"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["json"] == [{"nombre": "Dental Sonrisa"}]
+    assert response.json()["tips"] == ["Confirma el seguro"]
@@ -0,0 +1,113 @@
+"""
+Tests for latency_sketch.py (mergeable quantile sketch)
+"""
+import json
+import random
+import sqlite3
+
+import pytest
+
+from latency_sketch import LatencySketch, SketchMergeAggregate
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.fixture
+def latencies():
+    rng = random.Random(42)
+    return [rng.lognormvariate(3, 1) for _ in range(20000)]
+
+
+def sketch_of(values):
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_quantiles_within_relative_accuracy(latencies):
+    sketch = sketch_of(latencies)
+
+    for q in (0.5, 0.9, 0.95, 0.99, 0.999):
+        exact = exact_quantile(latencies, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+    assert sketch.count == len(latencies)
+    assert sketch.avg == pytest.approx(sum(latencies) / len(latencies))
+    assert sketch.quantile(0) == min(latencies)
+    assert sketch.quantile(1) == max(latencies)
+
+
+def test_memory_is_bounded():
+    sketch = LatencySketch(max_bins=64)
+    for i in range(1, 100000):
+        sketch.add(i * 0.01)
+
+    assert len(sketch.bins) <= 64
+    # The high quantiles keep their accuracy
+    assert sketch.quantile(0.99) == pytest.approx(990, rel=0.02)
+
+
+def test_merge_equals_single_sketch(latencies):
+    half = len(latencies) // 2
+    merged = sketch_of(latencies[:half]).merge(sketch_of(latencies[half:]))
+
+    assert merged.quantiles() == sketch_of(latencies).quantiles()
+    assert merged.count == len(latencies)
+
+
+def test_delta_of_cumulative_sketch(latencies):
+    half = len(latencies) // 2
+    previous = sketch_of(latencies[:half])
+    current = previous.copy()
+    for value in latencies[half:]:
+        current.add(value)
+
+    interval = current.delta(previous)
+    assert interval.count == len(latencies) - half
+    assert interval.quantile(0.95) == pytest.approx(
+        sketch_of(latencies[half:]).quantile(0.95))
+
+    # A smaller sketch than the baseline means a restart: all of it counts
+    restarted = sketch_of(latencies[:10])
+    assert restarted.delta(previous).count == 10
+
+
+def test_empty_sketch():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.avg is None
+    assert LatencySketch.from_json(sketch.to_json()).count == 0
+
+
+def test_serialization_roundtrip(latencies):
+    sketch = sketch_of(latencies)
+    restored = LatencySketch.from_json(sketch.to_json())
+
+    assert restored.quantiles() == sketch.quantiles()
+    assert restored.sum == sketch.sum
+    assert json.loads(sketch.to_json())["count"] == len(latencies)
+
+
+def test_merging_different_accuracy_fails():
+    with pytest.raises(ValueError):
+        LatencySketch(0.01).merge(LatencySketch(0.02))
+
+
+def test_sqlite_aggregate_merges_rows(latencies):
+    conn = sqlite3.connect(":memory:")
+    conn.create_aggregate("sketch_merge", 1, SketchMergeAggregate)
+    conn.execute("CREATE TABLE t (sketch TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?)", [
+        (sketch_of(latencies[i:i + 5000]).to_json(),)
+        for i in range(0, len(latencies), 5000)
+    ] + [(None,)])
+
+    merged = conn.execute("SELECT sketch_merge(sketch) FROM t").fetchone()[0]
+    assert LatencySketch.from_json(merged).quantiles() == \
+        sketch_of(latencies).quantiles()
+    assert conn.execute(
+        "SELECT sketch_merge(sketch) FROM t WHERE 0").fetchone()[0] is None
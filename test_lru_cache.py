@@ -0,0 +1,53 @@
+from bots.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" pasa a ser la más reciente
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl_seconds=5, clock=clock)
+    cache.set("nie", "respuesta")
+
+    clock.now = 4.9
+    assert cache.get("nie") == "respuesta"
+
+    clock.now = 5.0
+    assert cache.get("nie") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_lru_cache_clear_and_disabled_cache():
+    cache = LRUCache(maxsize=4)
+    cache.set("x", 1)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 1
+
+    disabled = LRUCache(maxsize=0)
+    disabled.set("x", 1)
+    assert disabled.get("x") is None
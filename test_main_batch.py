@@ -0,0 +1,107 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+class DummyOrchestrator:
+    def __init__(self):
+        self.calls = []
+
+    def process_queries(self, questions, language, limit, offset):
+        self.calls.append(
+            {
+                "questions": questions,
+                "language": language,
+                "limit": limit,
+                "offset": offset,
+            }
+        )
+        return [
+            {
+                "agente": "Dummy",
+                "respuesta": f"ok: {question}",
+                "total_results": 0,
+                "json": [],
+            }
+            for question in questions
+        ]
+
+
+def build_client(monkeypatch, dummy):
+    monkeypatch.setattr(main, "get_orchestrator", lambda: dummy)
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    return TestClient(main.app)
+
+
+def test_batch_query_returns_one_result_per_question(monkeypatch):
+    dummy = DummyOrchestrator()
+    client = build_client(monkeypatch, dummy)
+
+    resp = client.post(
+        "/api/query/batch",
+        json={
+            "questions": [" dentista ", "NIE"],
+            "language": "fr",
+            "limit": 999,
+        },
+    )
+
+    assert resp.status_code == 200
+    payload = resp.json()
+    assert payload["total"] == 2
+    assert [r["respuesta"] for r in payload["results"]] == [
+        "ok: dentista",
+        "ok: NIE",
+    ]
+    assert dummy.calls == [{
+        "questions": ["dentista", "NIE"],
+        "language": "es",
+        "limit": 20,
+        "offset": 0,
+    }]
+
+
+def test_batch_query_rejects_empty_and_oversized_batches(monkeypatch):
+    dummy = DummyOrchestrator()
+    client = build_client(monkeypatch, dummy)
+
+    empty = client.post("/api/query/batch", json={"questions": []})
+    too_many = client.post(
+        "/api/query/batch",
+        json={"questions": ["hola"] * (main.MAX_BATCH_QUESTIONS + 1)},
+    )
+    blank = client.post("/api/query/batch", json={"questions": ["ok", " "]})
+
+    assert empty.status_code == 400
+    assert too_many.status_code == 400
+    assert blank.status_code == 400
+    assert "1" in blank.json()["error"]
+    assert dummy.calls == []
+
+
+def test_batch_query_requires_json_content_type(monkeypatch):
+    client = build_client(monkeypatch, DummyOrchestrator())
+
+    resp = client.post(
+        "/api/query/batch",
+        content="questions=hola",
+        headers={"Content-Type": "text/plain"},
+    )
+
+    assert resp.status_code == 415
+
+
+def test_batch_query_times_out_with_504(monkeypatch):
+    class SlowOrchestrator(DummyOrchestrator):
+        def process_queries(self, questions, language, limit, offset):
+            import time
+
+            time.sleep(0.3)
+            return super().process_queries(questions, language, limit, offset)
+
+    client = build_client(monkeypatch, SlowOrchestrator())
+    monkeypatch.setattr(main, "QUERY_TIMEOUT_SECONDS", 0.05)
+
+    resp = client.post("/api/query/batch", json={"questions": ["hola"]})
+
+    assert resp.status_code == 504
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 
 import main
@@ -41,3 +42,143 @@ def test_metrics_endpoint_reports_api_activity(monkeypatch):
     assert endpoints["/api/health"]["requests"] >= 1
     assert endpoints["/api/query"]["requests"] >= 1
     assert endpoints["/api/query"]["latency_avg_ms"] >= 0
+
+
+def test_metrics_endpoint_exposes_cache_stats(monkeypatch):
+    class CachedOrchestrator(DummyOrchestrator):
+        def get_cache_stats(self):
+            return {"response_cache": {"hits": 3, "misses": 1}}
+
+    monkeypatch.setattr(main, "orchestrator", CachedOrchestrator())
+
+    client = TestClient(main.app)
+    payload = client.get("/api/metrics").json()
+
+    assert payload["caches"]["response_cache"] == {"hits": 3, "misses": 1}
+
+
+def test_metrics_endpoint_exposes_tracking_stats(monkeypatch):
+    monkeypatch.setattr(main, "orchestrator", DummyOrchestrator())
+    monkeypatch.setattr(
+        main, "get_recommendation_tracker_stats",
+        lambda: {"enabled": True, "queue_depth": 2, "dropped": 1},
+    )
+
+    client = TestClient(main.app)
+    payload = client.get("/api/metrics").json()
+
+    assert payload["tracking"]["queue_depth"] == 2
+    assert payload["tracking"]["dropped"] == 1
+
+
+def test_save_metrics_to_db_persists_real_snapshot(monkeypatch, tmp_path):
+    from metrics_storage import MetricsDB
+
+    db = MetricsDB(str(tmp_path / "metrics.db"))
+    monkeypatch.setattr(main, "metrics_db", db)
+    client = TestClient(main.app)
+
+    main.save_metrics_to_db()
+    for _ in range(3):
+        assert client.get("/api/health").status_code == 200
+    main.save_metrics_to_db()
+
+    # La segunda fila guarda solo las peticiones del intervalo
+    records = db.get_history(hours=1)["/api/health"]
+    assert records[-1]["request_count"] == 3
+    assert records[-1]["latency_avg_ms"] is not None
+    db.close()
+
+
+def test_cleanup_metrics_db_prunes_raw_rows_and_rollups(monkeypatch, tmp_path):
+    from metrics_storage import MetricsDB
+
+    db = MetricsDB(str(tmp_path / "metrics.db"))
+    monkeypatch.setattr(main, "metrics_db", db)
+    client = TestClient(main.app)
+    assert client.get("/api/health").status_code == 200
+    main.save_metrics_to_db()
+
+    # Se envejecen las filas más allá de cualquier retención
+    with db.connections.writer() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM metrics_rollup_5m").fetchone()[0] > 0
+        conn.execute("UPDATE metrics_snapshot SET timestamp = '2000-01-01 00:00:00'")
+        conn.execute("UPDATE metrics_rollup_5m SET bucket_start = '2000-01-01 00:00:00'")
+        conn.execute("UPDATE metrics_rollup_1h SET bucket_start = '2000-01-01 00:00:00'")
+
+    main.cleanup_metrics_db()
+
+    with db.connections.writer() as conn:
+        for table in ("metrics_snapshot", "metrics_rollup_5m", "metrics_rollup_1h"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+    db.close()
+
+
+def test_metrics_snapshot_reports_sketch_percentiles():
+    for value in range(1, 1001):
+        main.api_latency_histogram.observe("/api/fake", float(value))
+        main.api_request_counter.inc("/api/fake")
+
+    values = main.get_metrics_snapshot()["endpoints"]["/api/fake"]
+    assert values["samples"] == 1000
+    assert values["latency_p50_ms"] == pytest.approx(500, rel=0.02)
+    assert values["latency_p99_ms"] == pytest.approx(990, rel=0.02)
+    assert values["latency_p999_ms"] == pytest.approx(999, rel=0.02)
+    assert "latency_sketch" not in values
+
+    assert "latency_sketch" in main.get_interval_snapshot()[
+        "endpoints"]["/api/fake"]
+
+
+def test_interval_snapshot_swaps_registry_baseline():
+    main.get_interval_snapshot()
+    for _ in range(4):
+        main.api_request_counter.inc("/api/interval")
+        main.api_latency_histogram.observe("/api/interval", 20.0)
+
+    values = main.get_interval_snapshot()["endpoints"]["/api/interval"]
+    assert values["requests"] == 4
+    assert main.LatencySketch.from_dict(values["latency_sketch"]).count == 4
+
+    # Nothing new since the swap
+    assert "/api/interval" not in main.get_interval_snapshot()["endpoints"]
+
+
+def test_save_metrics_to_db_does_not_repeat_lifetime_alerts(monkeypatch,
+                                                             tmp_path):
+    from metrics_storage import MetricsDB
+
+    db = MetricsDB(str(tmp_path / "metrics.db"))
+    monkeypatch.setattr(main, "metrics_db", db)
+    for _ in range(10):
+        main.api_request_counter.inc("/api/failing")
+        main.api_error_counter.inc("/api/failing")
+
+    main.save_metrics_to_db()
+    main.save_metrics_to_db()
+
+    assert db.get_alerts_history(hours=1) == []
+    db.close()
+
+
+def test_latency_and_alerts_use_recent_window():
+    for _ in range(1000):
+        main.api_request_counter.inc("/api/regression")
+        main.api_latency_histogram.observe("/api/regression", 10.0)
+    # Dos intervalos guardados: el tráfico rápido sale de la ventana
+    main.get_interval_snapshot()
+    main.get_interval_snapshot()
+    for _ in range(10):
+        main.api_request_counter.inc("/api/regression")
+        main.api_latency_histogram.observe("/api/regression", 2000.0)
+
+    snapshot = main.get_metrics_snapshot()
+    values = snapshot["endpoints"]["/api/regression"]
+    assert values["requests"] == 1010
+    assert values["recent_requests"] == 10
+    assert values["samples"] == 10
+    assert values["latency_p95_ms"] == pytest.approx(2000, rel=0.02)
+
+    alerts = main.build_metric_alerts(snapshot)
+    assert any(alert["endpoint"] == "/api/regression"
+               and alert["type"] == "latency_p95" for alert in alerts)
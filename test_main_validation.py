@@ -96,3 +96,39 @@ def test_analytics_rejects_too_long_session_id(monkeypatch):
 
     assert resp.status_code == 400
     assert "session_id" in resp.json()["error"]
+
+
+class SlowOrchestrator(DummyOrchestrator):
+    def process_query(self, question, language, limit, offset):
+        import time
+
+        time.sleep(0.3)
+        return super().process_query(question, language, limit, offset)
+
+
+def test_query_runs_off_event_loop_with_deadline(monkeypatch):
+    monkeypatch.setattr(main, "get_orchestrator", lambda: SlowOrchestrator())
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main, "QUERY_TIMEOUT_SECONDS", 0.05)
+
+    client = TestClient(main.app)
+    resp = client.post("/api/query", json={"question": "hola"})
+
+    assert resp.status_code == 504
+    assert "Tiempo de espera" in resp.json()["error"]
+
+
+def test_query_rejected_when_pending_limit_reached(monkeypatch):
+    import threading
+
+    dummy = DummyOrchestrator()
+    monkeypatch.setattr(main, "get_orchestrator", lambda: dummy)
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main, "query_slots", threading.BoundedSemaphore(1))
+    main.query_slots.acquire()
+
+    client = TestClient(main.app)
+    resp = client.post("/api/query", json={"question": "hola"})
+
+    assert resp.status_code == 503
+    assert dummy.calls == []
@@ -0,0 +1,119 @@
+from bots.maps_integration import HEALTHCARE_SEARCH_TERMS, MapsCache, MapsClient, RateLimiter, _file_lock
+
+PLACES = [
+    {"display_name": f"Hospital {i}, Eixample, Barcelona", "lat": "41.3", "lon": "2.1",
+     "address": {"suburb": "Eixample"}}
+    for i in range(5)
+]
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return PLACES
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(params["q"])
+        return FakeResponse()
+
+
+def make_client(tmp_path, ttl=3600):
+    client = MapsClient(cache=MapsCache(tmp_path / "maps_cache.json", ttl=ttl),
+                        rate_limiter=RateLimiter(min_interval=0))
+    client.http = FakeHTTP()
+    return client
+
+
+def wait_idle(client):
+    client._executor.submit(lambda: None).result(timeout=5)
+
+
+def test_results_are_cached_on_disk(tmp_path):
+    client = make_client(tmp_path)
+
+    results = client.search("hospital", limit=5)
+    assert [r["nombre"] for r in results] == [f"Hospital {i}" for i in range(5)]
+    assert results[0]["es_anunciante"] is False
+
+    # Otra instancia (p.ej. tras reiniciar) lee el fichero sin tocar la red
+    other = make_client(tmp_path)
+    assert other.search("hospital", limit=3) == results[:3]
+    assert other.http.calls == []
+
+
+def test_cold_miss_does_not_block_when_wait_is_false(tmp_path):
+    client = make_client(tmp_path)
+
+    assert client.search("dentist", limit=5, wait=False) == []
+    wait_idle(client)
+    assert client.http.calls == ["dentist Barcelona Spain"]
+    assert len(client.search("dentist", limit=5, wait=False)) == 5
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(tmp_path):
+    client = make_client(tmp_path, ttl=0)
+    client.cache.set("pharmacy", 5, [{"nombre": "Farmacia antigua"}])
+
+    assert client.search("pharmacy", wait=False) == [{"nombre": "Farmacia antigua"}]
+    wait_idle(client)
+    assert client.http.calls == ["pharmacy Barcelona Spain"]
+
+
+def test_prefetch_only_downloads_missing_terms(tmp_path):
+    client = make_client(tmp_path)
+    client.search("hospital")
+
+    assert client.prefetch(HEALTHCARE_SEARCH_TERMS) == len(HEALTHCARE_SEARCH_TERMS) - 1
+    assert client.prefetch(HEALTHCARE_SEARCH_TERMS) == 0
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(min_interval=0.05)
+
+    # Reservas seguidas: cada una espera un intervalo más que la anterior
+    delays = [limiter._reserve() for _ in range(3)]
+    assert delays[0] == 0
+    for previous, delay in zip(delays, delays[1:]):
+        assert 0.025 < delay - previous <= 0.05
+
+
+def test_rate_limiter_state_is_shared_between_instances(tmp_path):
+    # Dos limitadores sobre el mismo fichero = dos workers de gunicorn
+    state = tmp_path / "nominatim_rate.lock"
+    first = RateLimiter(min_interval=0.05, state_path=state)
+    second = RateLimiter(min_interval=0.05, state_path=state)
+
+    delays = [limiter._reserve() for limiter in (first, second, first, second)]
+    assert delays[0] == 0
+    for previous, delay in zip(delays, delays[1:]):
+        assert 0.025 < delay - previous <= 0.05
+
+
+def test_cache_picks_up_entries_written_by_another_process(tmp_path):
+    path = tmp_path / "maps_cache.json"
+    ours = MapsCache(path, ttl=3600, reload_interval=0)
+    theirs = MapsCache(path, ttl=3600, reload_interval=0)
+
+    theirs.set("hospital", 5, [{"nombre": "Hospital Clínic"}])
+    assert ours.get("hospital", 5) == ([{"nombre": "Hospital Clínic"}], True)
+
+    # Escribir no pisa lo que el otro proceso guardó
+    ours.set("pharmacy", 5, [{"nombre": "Farmacia"}])
+    assert set(MapsCache(path).get("hospital", 5)[0][0].values()) == {"Hospital Clínic"}
+
+
+def test_prefetch_is_skipped_while_another_process_runs_it(tmp_path):
+    client = make_client(tmp_path)
+    lock_path = client.cache.path.with_suffix(".prefetch.lock")
+
+    with _file_lock(lock_path):
+        assert client.prefetch(HEALTHCARE_SEARCH_TERMS) == 0
+    assert client.http.calls == []
+    assert client.prefetch(HEALTHCARE_SEARCH_TERMS) == len(HEALTHCARE_SEARCH_TERMS)
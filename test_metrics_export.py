@@ -19,17 +19,21 @@ def temp_db():
     sample_metrics = {
         "endpoints": {
             "/api/query": {
-                "request_count": 100,
-                "error_count": 5,
-                "latency_samples": [50, 75, 100, 125, 150]
+                "requests": 100,
+                "errors": 5,
+                "latency_avg_ms": 100.0,
+                "latency_p95_ms": 125.0,
+                "samples": 5
             },
             "/api/analytics": {
-                "request_count": 50,
-                "error_count": 2,
-                "latency_samples": [40, 60, 80]
+                "requests": 50,
+                "errors": 2,
+                "latency_avg_ms": 60.0,
+                "latency_p95_ms": 60.0,
+                "samples": 3
             }
         },
-        "query_agent_counts": {
+        "query_agents": {
             "immigration_bot": 30,
             "work_bot": 20
         },
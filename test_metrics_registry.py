@@ -0,0 +1,124 @@
+"""
+Tests for metrics_registry.py (per-thread counters and histograms)
+"""
+import threading
+
+import pytest
+
+from metrics_registry import MetricsRegistry, get_metrics_registry
+
+
+def run_threads(target, count=8):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_counters_aggregate_all_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests")
+
+    def work():
+        for _ in range(10000):
+            counter.inc("/api/query")
+        counter.inc("/api/health", 5)
+
+    run_threads(work)
+
+    assert counter.collect() == {"/api/query": 80000, "/api/health": 40}
+    assert registry.counter("requests") is counter
+
+
+def test_histograms_merge_thread_sketches():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_ms")
+
+    def work():
+        for value in range(1, 1001):
+            histogram.observe("/api/query", float(value))
+
+    run_threads(work, count=4)
+
+    sketch = histogram.collect()["/api/query"]
+    assert sketch.count == 4000
+    assert sketch.quantile(0.5) == pytest.approx(500, rel=0.02)
+
+
+def test_reads_while_writing_lose_nothing():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests")
+    histogram = registry.histogram("latency_ms")
+    done = threading.Event()
+
+    def write():
+        for i in range(20000):
+            counter.inc(f"/api/{i % 50}")
+            histogram.observe(f"/api/{i % 50}", 1.0 + i % 100)
+
+    def read():
+        while not done.is_set():
+            registry.collect()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    run_threads(write, count=4)
+    done.set()
+    reader.join()
+
+    counters, histograms = registry.collect()
+    assert sum(counters["requests"].values()) == 80000
+    assert sum(s.count for s in histograms["latency_ms"].values()) == 80000
+
+
+def test_swap_interval_returns_deltas():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests")
+    histogram = registry.histogram("latency_ms")
+
+    counter.inc("/api/query", 3)
+    histogram.observe("/api/query", 10.0)
+    counters, histograms = registry.swap_interval()
+    assert counters["requests"] == {"/api/query": 3}
+    assert histograms["latency_ms"]["/api/query"].count == 1
+
+    counter.inc("/api/health")
+    histogram.observe("/api/query", 500.0)
+    histogram.observe("/api/query", 500.0)
+    counters, histograms = registry.swap_interval()
+    assert counters["requests"] == {"/api/health": 1}
+    interval = histograms["latency_ms"]["/api/query"]
+    assert interval.count == 2
+    assert interval.quantile(0.5) == pytest.approx(500, rel=0.02)
+
+    counters, histograms = registry.swap_interval()
+    assert counters["requests"] == {}
+    assert histograms["latency_ms"] == {}
+
+    # Cumulative values are not affected by intervals
+    assert counter.collect() == {"/api/query": 3, "/api/health": 1}
+
+
+def test_global_registry_is_singleton():
+    assert get_metrics_registry() is get_metrics_registry()
+
+
+def test_recent_covers_last_and_current_interval():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests")
+
+    counter.inc("/api/query", 100)
+    counters, _ = registry.recent()
+    assert counters["requests"] == {"/api/query": 100}
+
+    registry.swap_interval()
+    counter.inc("/api/query", 5)
+    counters, _ = registry.recent()
+    assert counters["requests"] == {"/api/query": 105}
+
+    # After another swap the first interval leaves the window
+    registry.swap_interval()
+    counter.inc("/api/query", 1)
+    counters, _ = registry.recent()
+    assert counters["requests"] == {"/api/query": 6}
@@ -3,10 +3,12 @@ Test suite for metrics_storage.py persistent database layer
 """
 import sqlite3
 import tempfile
+import threading
 from pathlib import Path
 import pytest
 from datetime import datetime, timedelta
-from metrics_storage import MetricsDB
+from latency_sketch import LatencySketch
+from metrics_storage import MetricsDB, resolution_for_hours
 
 
 class TestMetricsStorage:
@@ -55,17 +57,21 @@ class TestMetricsStorage:
         metrics = {
             "endpoints": {
                 "/api/query": {
-                    "request_count": 100,
-                    "error_count": 5,
-                    "latency_samples": [10, 20, 30, 40, 50]
+                    "requests": 100,
+                    "errors": 5,
+                    "latency_avg_ms": 30.0,
+                    "latency_p95_ms": 40.0,
+                    "samples": 5
                 },
                 "/api/health": {
-                    "request_count": 200,
-                    "error_count": 0,
-                    "latency_samples": [5, 5, 5, 5, 5]
+                    "requests": 200,
+                    "errors": 0,
+                    "latency_avg_ms": 5.0,
+                    "latency_p95_ms": 5.0,
+                    "samples": 5
                 }
             },
-            "query_agent_counts": {
+            "query_agents": {
                 "Legal": 10,
                 "Healthcare": 5
             },
@@ -105,24 +111,28 @@ class TestMetricsStorage:
         metrics_old = {
             "endpoints": {
                 "/api/query": {
-                    "request_count": 50,
-                    "error_count": 2,
-                    "latency_samples": [10, 20, 30]
+                    "requests": 50,
+                    "errors": 2,
+                    "latency_avg_ms": 20.0,
+                    "latency_p95_ms": 20.0,
+                    "samples": 3
                 }
             },
-            "query_agent_counts": {},
+            "query_agents": {},
             "alerts": []
         }
 
         metrics_new = {
             "endpoints": {
                 "/api/query": {
-                    "request_count": 100,
-                    "error_count": 5,
-                    "latency_samples": [20, 30, 40]
+                    "requests": 100,
+                    "errors": 5,
+                    "latency_avg_ms": 30.0,
+                    "latency_p95_ms": 30.0,
+                    "samples": 3
                 }
             },
-            "query_agent_counts": {},
+            "query_agents": {},
             "alerts": []
         }
 
@@ -159,12 +169,14 @@ class TestMetricsStorage:
             metrics = {
                 "endpoints": {
                     "/api/query": {
-                        "request_count": 100 + i*10,
-                        "error_count": 5 + i,
-                        "latency_samples": [10 + i*5, 20 + i*5, 30 + i*5]
+                        "requests": 100 + i*10,
+                        "errors": 5 + i,
+                        "latency_avg_ms": 20 + i*5,
+                        "latency_p95_ms": 30 + i*5,
+                        "samples": 3
                     }
                 },
-                "query_agent_counts": {},
+                "query_agents": {},
                 "alerts": []
             }
             temp_db.save_snapshot(metrics)
@@ -188,7 +200,7 @@ class TestMetricsStorage:
         for i in range(3):
             metrics = {
                 "endpoints": {},
-                "query_agent_counts": {
+                "query_agents": {
                     "Legal": 10 + i,
                     "Healthcare": 5 + i
                 },
@@ -209,6 +221,235 @@ class TestMetricsStorage:
         assert history["Legal"][1]["count"] == 11
         assert history["Legal"][2]["count"] == 12
 
+    def test_snapshot_stores_interval_values(self, temp_db):
+        """Interval values are stored as given; idle intervals skipped"""
+        def snapshot(requests, errors, agents):
+            return {
+                "endpoints": {
+                    "/api/query": {
+                        "requests": requests,
+                        "errors": errors,
+                        "error_rate_pct": 0.0,
+                        "latency_avg_ms": 25.0,
+                        "latency_p95_ms": 40.0,
+                        "samples": requests
+                    }
+                },
+                "query_agents": agents
+            }
+
+        temp_db.save_snapshot(snapshot(100, 5, {"Legal": 8}))
+        temp_db.save_snapshot(snapshot(50, 10, {"Legal": 0}))
+        temp_db.save_snapshot(snapshot(0, 0, {}))  # idle
+        temp_db.save_snapshot(snapshot(20, 0, {"Legal": 2}))
+
+        records = temp_db.get_history(hours=24)["/api/query"]
+        assert [r["request_count"] for r in records] == [100, 50, 20]
+        assert [r["error_count"] for r in records] == [5, 10, 0]
+        assert records[1]["error_rate_pct"] == 20.0
+        assert records[0]["latency_p95_ms"] == 40.0
+
+        agents = temp_db.get_agent_history(hours=24)
+        assert [r["count"] for r in agents["Legal"]] == [8, 2]
+
+        summary = temp_db.get_summary(hours=24)["/api/query"]
+        assert summary["requests"] == 170
+        assert summary["errors"] == 15
+        assert summary["measurements"] == 3
+        assert summary["error_rate_peak_pct"] == 20.0
+
+    def _insert_raw(self, db, rows):
+        """Insert raw snapshot rows (minutes_ago, requests, errors, avg, p95)"""
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        with db.connections.writer() as conn:
+            conn.executemany("""
+            INSERT INTO metrics_snapshot
+            (timestamp, endpoint, request_count, error_count,
+             latency_avg_ms, latency_p95_ms, error_rate_pct)
+            VALUES (?, '/api/query', ?, ?, ?, ?, ?)
+            """, [
+                ((now - timedelta(minutes=ago)).strftime("%Y-%m-%d %H:%M:%S"),
+                 requests, errors, avg, p95, errors / requests * 100)
+                for ago, requests, errors, avg, p95 in rows
+            ])
+
+    def test_rollup_merges_buckets(self, temp_db):
+        """Rollups keep totals, weighted latency and peaks of raw data"""
+        self._insert_raw(temp_db, [
+            (130, 10, 1, 10.0, 20.0),
+            (70, 30, 0, 50.0, 90.0),
+            (10, 60, 6, 20.0, 30.0),
+        ])
+        temp_db.rollup()
+        # Running it again is idempotent
+        temp_db.rollup()
+
+        raw = temp_db.get_summary(hours=24)["/api/query"]
+        for resolution in ("5m", "1h", "1d"):
+            merged = temp_db.get_summary(hours=24, resolution=resolution)
+            merged = merged["/api/query"]
+            assert merged["requests"] == raw["requests"] == 100
+            assert merged["errors"] == raw["errors"] == 7
+            assert merged["measurements"] == 3
+            assert merged["latency_avg_ms"] == pytest.approx(
+                raw["latency_avg_ms"])
+            assert merged["latency_p95_peak_ms"] == 90.0
+            assert merged["error_rate_peak_pct"] == 10.0
+
+        five_minutes = temp_db.get_history(hours=24, resolution="5m")
+        assert len(five_minutes["/api/query"]) == 3
+
+    def test_rollup_is_incremental(self, temp_db):
+        """New snapshots update the open bucket instead of duplicating it"""
+        self._insert_raw(temp_db, [(0, 10, 0, 10.0, 10.0)])
+        temp_db.rollup()
+        self._insert_raw(temp_db, [(0, 30, 3, 30.0, 50.0)])
+        temp_db.rollup()
+
+        records = temp_db.get_history(hours=1, resolution="1h")["/api/query"]
+        assert len(records) == 1
+        assert records[0]["request_count"] == 40
+        assert records[0]["latency_avg_ms"] == pytest.approx(25.0)
+        assert records[0]["latency_p95_ms"] == 50.0
+
+    def test_rollup_counts_rows_committed_late(self, temp_db):
+        """A raw row committed after a later bucket was rolled up counts"""
+        self._insert_raw(temp_db, [(6, 10, 0, 10.0, 10.0)])
+        temp_db.rollup()
+        self._insert_raw(temp_db, [(0, 10, 0, 10.0, 10.0)])
+        temp_db.rollup()
+
+        # Another worker commits a row for the earlier bucket
+        self._insert_raw(temp_db, [(6, 5, 1, 10.0, 10.0)])
+        temp_db.rollup()
+
+        raw = temp_db.get_summary(hours=24)["/api/query"]
+        for resolution in ("5m", "1h", "1d"):
+            merged = temp_db.get_summary(hours=24, resolution=resolution)
+            assert merged["/api/query"]["requests"] == raw["requests"] == 25
+            assert merged["/api/query"]["errors"] == 1
+
+    def test_resolution_for_hours(self):
+        """Longer windows read coarser rollups"""
+        assert resolution_for_hours(1) == "raw"
+        assert resolution_for_hours(6) == "raw"
+        assert resolution_for_hours(24) == "5m"
+        assert resolution_for_hours(168) == "1h"
+        assert resolution_for_hours(720) == "1d"
+
+    def test_auto_resolution_bounds_points(self, temp_db):
+        """A 30-day window returns one point per day, not per snapshot"""
+        self._insert_raw(temp_db, [
+            (minutes, 10, 0, 20.0, 30.0)
+            for minutes in range(0, 30 * 24 * 60, 5)
+        ])
+        temp_db.rollup()
+
+        history = temp_db.get_history(hours=720, resolution="auto")
+        assert 30 <= len(history["/api/query"]) <= 31
+        trends = temp_db.get_trends("/api/query", hours=720,
+                                    resolution="auto")
+        assert trends["resolution"] == "1d"
+        assert trends["statistics"]["total_measurements"] == 30 * 24 * 12
+
+    def test_latency_sketches_persisted_and_merged(self, temp_db):
+        """Interval sketches are stored and merged into real percentiles"""
+        def snapshot(value, requests):
+            sketch = LatencySketch()
+            for _ in range(requests):
+                sketch.add(value)
+            return {"endpoints": {"/api/query": {
+                "requests": requests,
+                "errors": 0,
+                "latency_avg_ms": 0.0,
+                "latency_p95_ms": 0.0,
+                "samples": sketch.count,
+                "latency_sketch": sketch.to_dict()
+            }}}
+
+        temp_db.save_snapshot(snapshot(10.0, 90))
+        temp_db.save_snapshot(snapshot(1000.0, 10))
+
+        # Each row describes only its own interval
+        records = temp_db.get_history(hours=1)["/api/query"]
+        assert records[0]["latency_p95_ms"] == pytest.approx(10.0, rel=0.02)
+        assert records[1]["latency_p95_ms"] == pytest.approx(1000.0, rel=0.02)
+        assert records[1]["latency_avg_ms"] == pytest.approx(1000.0)
+
+        temp_db.rollup()
+        for resolution in ("raw", "5m", "1d"):
+            summary = temp_db.get_summary(
+                hours=1, resolution=resolution)["/api/query"]
+            assert summary["latency_p50_ms"] == pytest.approx(10.0, rel=0.02)
+            assert summary["latency_p99_ms"] == pytest.approx(1000.0,
+                                                              rel=0.02)
+
+    def test_sketch_column_added_to_existing_database(self, temp_db):
+        """Databases created before the sketch column are migrated"""
+        with temp_db.connections.writer() as conn:
+            conn.execute("DROP TABLE metrics_snapshot")
+            conn.execute("""
+            CREATE TABLE metrics_snapshot (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                endpoint TEXT NOT NULL,
+                request_count INTEGER DEFAULT 0,
+                error_count INTEGER DEFAULT 0,
+                latency_avg_ms REAL,
+                latency_p95_ms REAL,
+                error_rate_pct REAL
+            )
+            """)
+
+        temp_db.create_tables()
+        temp_db.save_snapshot({"endpoints": {"/api/query": {
+            "requests": 1, "errors": 0, "samples": 1,
+            "latency_avg_ms": 5.0, "latency_p95_ms": 5.0}}})
+        summary = temp_db.get_summary(hours=1)["/api/query"]
+        assert summary["requests"] == 1
+        assert summary["latency_p95_ms"] is None
+
+    def test_connections_use_wal_and_read_only_readers(self, temp_db):
+        """Pooled connections: WAL journal, read-only readers reused"""
+        with temp_db.connections.writer() as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+        with temp_db.connections.reader() as reader:
+            with pytest.raises(sqlite3.OperationalError):
+                reader.execute(
+                    "INSERT INTO agent_metrics (agent_name, count) "
+                    "VALUES ('x', 1)"
+                )
+        with temp_db.connections.reader() as again:
+            assert again is reader
+
+    def test_readers_do_not_wait_for_writer(self, temp_db):
+        """History reads proceed while a write transaction is open"""
+        temp_db.save_snapshot({
+            "endpoints": {"/api/query": {"requests": 1,
+                                         "errors": 0}},
+            "query_agents": {},
+            "alerts": []
+        })
+
+        with temp_db.connections.writer() as conn:
+            conn.execute(
+                "INSERT INTO metrics_snapshot (endpoint, request_count) "
+                "VALUES ('/api/query', 2)"
+            )
+            results = []
+            reader = threading.Thread(
+                target=lambda: results.append(temp_db.get_history(hours=24))
+            )
+            reader.start()
+            reader.join(timeout=2)
+            assert not reader.is_alive()
+
+        # The reader saw the last committed state, not the open transaction
+        assert len(results[0]["/api/query"]) == 1
+        assert len(temp_db.get_history(hours=24)["/api/query"]) == 2
+
 
 class TestMetricsStorageIntegration:
     """Integration tests with main.py"""
@@ -238,7 +479,7 @@ class TestMetricsStorageIntegration:
                     "samples": 5
                 }
             },
-            "query_agent_counts": {
+            "query_agents": {
                 "Legal": 8,
                 "Healthcare": 3
             },
@@ -252,21 +493,9 @@ class TestMetricsStorageIntegration:
             ]
         }
 
-        # Save multiple snapshots
+        # Save multiple snapshots (one per interval)
         for _ in range(5):
-            # Convert to MetricsDB format
-            metrics = {
-                "endpoints": {
-                    ep: {
-                        "request_count": data["requests"],
-                        "error_count": data["errors"],
-                        "latency_samples": [data["latency_avg_ms"]]
-                    } for ep, data in sample_snapshot["endpoints"].items()
-                },
-                "query_agent_counts": sample_snapshot["query_agent_counts"],
-                "alerts": sample_snapshot["alerts"]
-            }
-            temp_db.save_snapshot(metrics)
+            temp_db.save_snapshot(sample_snapshot)
 
         # Verify persistence
         history = temp_db.get_history(hours=24)
@@ -0,0 +1,50 @@
+import random
+import unicodedata
+
+from bots.response_format import _normalize_text
+from bots.utils import fold_accents, normalize
+
+
+def normalize_reference(s):
+    """Implementación original de normalize (referencia)."""
+    if not s:
+        return ""
+    s = str(s).strip()
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    return s.lower()
+
+
+def test_normalize_matches_reference_for_every_bmp_character():
+    for codepoint in range(0x10000):
+        if 0xD800 <= codepoint <= 0xDFFF:
+            continue
+        char = chr(codepoint)
+        assert normalize(char) == normalize_reference(char), hex(codepoint)
+
+
+def test_normalize_matches_reference_for_mixed_strings():
+    rng = random.Random(42)
+    alphabet = list("abcXYZ áéíóúàèçñÑÜü ΣσςΑİıǅﬁ한글\t\n") + ["́", "̧", "  "]
+    samples = [
+        "  ¿Dónde está la Clínica de Gràcia?  ",
+        "ΟΔΟΣ ΑΘΗΝΑΣ",  # sigma final depende del contexto al pasar a minúsculas
+        "Ｆｕｌｌｗｉｄｔｈ ﬁle",
+        "a" * 100 + "é",
+    ]
+    samples += [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 120)))
+        for _ in range(2000)
+    ]
+    for sample in samples:
+        assert normalize(sample) == normalize_reference(sample), repr(sample)
+
+
+def test_normalize_non_string_and_empty_inputs():
+    for value in (None, "", 0, 123, 4.5, True):
+        assert normalize(value) == normalize_reference(value)
+
+
+def test_fold_accents_keeps_case_and_response_format_uses_it():
+    assert fold_accents("Educación en Gràcia") == "Educacion en Gracia"
+    assert _normalize_text("  Médico ") == "Medico"
@@ -0,0 +1,237 @@
+import pytest
+
+from bots.keyword_matcher import KeywordMatcher
+from bots.orchestrator import Orchestrator
+from bots.utils import normalize
+
+
+@pytest.fixture(scope="module")
+def orchestrator():
+    mp = pytest.MonkeyPatch()
+    mp.setenv("FORCE_LOCAL_DIRECTORY", "true")
+    try:
+        yield Orchestrator()
+    finally:
+        mp.undo()
+
+
+def legacy_keyword_intent(orch, question, language):
+    """Implementación previa basada en bucles de subcadenas (sin ML)."""
+    qn = normalize(question)
+    critical = orch.critical_immigration_keywords.get(
+        language, orch.critical_immigration_keywords["en"]
+    )
+    if any(keyword in qn for keyword in critical):
+        return "Immigration", 0.95, None
+    for name, (category, business) in orch.business_name_index.items():
+        if name in qn:
+            return category, 0.9, business
+    best_cat, best_hits = None, 0
+    for cat, kws in orch.category_patterns.get(language, {}).items():
+        hits = sum(1 for kw in kws if kw in qn)
+        if hits > best_hits:
+            best_cat, best_hits = cat, hits
+    if best_cat and best_hits > 0:
+        return best_cat, max(0.25, min(0.9, 0.15 * best_hits + 0.25)), None
+    return "Desconocida", 0.0, None
+
+
+def test_keyword_matcher_finds_overlapping_patterns():
+    matcher = KeywordMatcher()
+    for pattern in ["bank", "bank account", "account", "nie", "ie"]:
+        matcher.add(pattern, pattern.upper())
+
+    found = matcher.find("open a bank account with my nie")
+
+    assert found == {"bank", "bank account", "account", "nie", "ie"}
+    assert matcher.tags("bank account") == ["BANK ACCOUNT"]
+    assert matcher.find("") == set()
+
+
+@pytest.mark.parametrize("question,language", [
+    ("Necesito un abogado de inmigración", "es"),
+    ("¿Dónde puedo encontrar un dentista?", "es"),
+    ("Busco un apartamento en Barcelona", "es"),
+    ("Quiero aprender español en una academia", "es"),
+    ("Necesito ayuda con mi NIE", "es"),
+    ("I need a lawyer to open a bank account", "en"),
+    ("Looking for a flat to rent near a good school", "en"),
+    ("best tapas restaurant for dinner", "en"),
+    ("Relocating from the UK next month", "en"),
+    ("hola", "es"),
+    ("a cocktail bar with terrace", "fr"),
+])
+def test_classify_intent_matches_legacy_loops(orchestrator, question, language):
+    assert orchestrator.classify_intent(question, language) == \
+        legacy_keyword_intent(orchestrator, question, language)
+
+
+def test_classify_intent_detects_business_names(orchestrator):
+    name, (category, business) = next(iter(orchestrator.business_name_index.items()))
+
+    result = orchestrator.classify_intent(f"info sobre {name} por favor", "es")
+
+    assert result == legacy_keyword_intent(orchestrator, f"info sobre {name} por favor", "es")
+
+
+def test_classify_intents_matches_single_question_path(orchestrator):
+    questions = [
+        "Necesito ayuda con mi NIE",
+        "¿Dónde puedo encontrar un dentista?",
+        "Busco un apartamento en Barcelona",
+        "hola",
+    ]
+
+    batch = orchestrator.classify_intents(questions, "es")
+
+    assert batch == [orchestrator.classify_intent(q, "es") for q in questions]
+
+
+def test_process_queries_returns_process_query_shape(orchestrator):
+    questions = ["Busco un apartamento", "Necesito un dentista"]
+
+    batch = orchestrator.process_queries(questions, "es", limit=2)
+    single = [orchestrator.process_query(q, "es", limit=2) for q in questions]
+
+    assert len(batch) == len(single)
+    for batch_item, single_item in zip(batch, single):
+        assert batch_item.keys() == single_item.keys()
+        assert batch_item["agente"] == single_item["agente"]
+        assert batch_item["total_results"] == single_item["total_results"]
+        assert batch_item["json"] == single_item["json"]
+
+
+def test_process_query_is_cached_and_paginated_after_lookup(orchestrator):
+    orchestrator.response_cache.clear()
+    before = orchestrator.response_cache.stats()
+
+    first = orchestrator.process_query("Busco un apartamento", "es", limit=1, offset=0)
+    second = orchestrator.process_query("busco un  APARTAMENTO ", "es", limit=1, offset=1)
+
+    stats = orchestrator.response_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+    assert first["total_results"] == second["total_results"]
+    if first["total_results"] > 1:
+        assert first["json"] != second["json"]
+
+
+def test_response_cache_invalidated_when_sources_reload(orchestrator):
+    orchestrator.process_query("Necesito un dentista", "es")
+    assert len(orchestrator.response_cache) > 0
+
+    orchestrator.rss_manager.version += 1
+    orchestrator.process_query("Necesito un dentista", "es")
+
+    assert len(orchestrator.response_cache) == 1
+    assert orchestrator.get_cache_stats()["response_cache"]["invalidations"] >= 1
+
+
+def test_healthcare_answer_without_maps_results_is_not_cached(orchestrator, monkeypatch):
+    import bots.bot_healthcare as bot_healthcare
+
+    question = "Necesito un pediatra urgente"
+    orchestrator.response_cache.clear()
+    monkeypatch.setattr(orchestrator, "advertisers", {**orchestrator.advertisers, "Healthcare": ()})
+    monkeypatch.setattr(bot_healthcare, "search_healthcare_barcelona", lambda *a, **k: [])
+
+    assert orchestrator.process_query(question, "es")["agente"] == "Healthcare"
+    assert len(orchestrator.response_cache) == 0
+
+    # Con el caché de Maps ya caliente la respuesta sí se cachea
+    place = {"nombre": "Hospital Sant Joan de Déu", "es_anunciante": False}
+    monkeypatch.setattr(bot_healthcare, "search_healthcare_barcelona", lambda *a, **k: [place])
+    assert orchestrator.process_query(question, "es")["json"][0]["nombre"] == place["nombre"]
+    assert len(orchestrator.response_cache) == 1
+    orchestrator.response_cache.clear()
+
+
+def test_friendly_message_is_chosen_per_request_on_cache_hits(orchestrator, monkeypatch):
+    import bots.orchestrator as orchestrator_module
+
+    question = "Busco un apartamento"
+    orchestrator.response_cache.clear()
+    first = orchestrator.process_query(question, "es")
+    messages = orchestrator.responses_map["es"][first["agente"]]
+
+    monkeypatch.setattr(orchestrator_module.random, "choice", lambda options: options[-1])
+    hit = orchestrator.process_query(question, "es")
+    assert orchestrator.response_cache.stats()["hits"] >= 1
+    assert hit["respuesta"].startswith(messages[-1])
+    orchestrator.response_cache.clear()
+
+
+def test_result_computed_across_a_reload_is_not_cached(orchestrator, monkeypatch):
+    compute = orchestrator._compute_query_result
+
+    def compute_during_reload(*args):
+        # Los artículos RSS se recargan mientras se calcula la respuesta
+        orchestrator.rss_manager.version += 1
+        return compute(*args)
+
+    orchestrator.response_cache.clear()
+    monkeypatch.setattr(orchestrator, "_compute_query_result", compute_during_reload)
+    orchestrator.process_query("Busco un apartamento", "es")
+    assert len(orchestrator.response_cache) == 0
+
+    monkeypatch.setattr(orchestrator, "_compute_query_result", compute)
+    orchestrator.process_query("Busco un apartamento", "es")
+    assert len(orchestrator.response_cache) == 1
+    orchestrator.response_cache.clear()
+
+
+def test_semantic_path_memoizes_only_the_encoder(orchestrator, monkeypatch):
+    torch = pytest.importorskip("torch")
+    from bots import orchestrator as orchestrator_module
+    from bots.lru_cache import LRUCache
+
+    class FakeModel:
+        def __init__(self):
+            self.encoded = []
+
+        def encode(self, sentences, convert_to_tensor=True):
+            self.encoded.extend(sentences)
+            return torch.ones(len(sentences), 4)
+
+    model = FakeModel()
+    monkeypatch.setattr(orchestrator_module, "ML_AVAILABLE", True)
+    monkeypatch.setattr(orchestrator_module, "_question_embedding_cache", LRUCache(maxsize=8))
+    monkeypatch.setattr(orchestrator, "model", model)
+    monkeypatch.setattr(orchestrator, "category_info", [{"name": "Retail"}, {"name": "Healthcare"}])
+    monkeypatch.setattr(
+        orchestrator,
+        "category_embeddings_normalized",
+        torch.nn.functional.normalize(torch.tensor([[1.0, 1, 1, 1], [1.0, 0, 0, 0]]), dim=1),
+    )
+
+    first = orchestrator.classify_intents(["qwerty zzz", "Qwerty  ZZZ"], "es")
+    again = orchestrator.classify_intent("qwerty zzz", "es")
+    keyword = orchestrator.classify_intent("Necesito un dentista", "es")
+
+    assert model.encoded == ["qwerty zzz", "Necesito un dentista"]
+    assert [category for category, _, _ in first] == ["Retail", "Retail"]
+    assert again[0] == "Retail"
+    # Los overrides por palabra clave siguen ejecutándose en cada petición
+    assert keyword[0] == "Healthcare"
+
+
+def test_queries_do_not_mutate_shared_advertiser_store(orchestrator):
+    snapshot = {
+        category: [dict(a) for a in advertisers]
+        for category, advertisers in orchestrator.advertisers.items()
+    }
+    assert all(isinstance(v, tuple) for v in orchestrator.advertisers.values())
+
+    results = []
+    for _ in range(3):
+        orchestrator.response_cache.clear()
+        results.append(orchestrator.process_query("Necesito un dentista", "es", limit=5))
+        orchestrator.process_query("Busco un colegio para mis hijos", "es", limit=5)
+
+    current = {
+        category: [dict(a) for a in advertisers]
+        for category, advertisers in orchestrator.advertisers.items()
+    }
+    assert current == snapshot
+    # Misma respuesta en cada repetición (el almacén no cambia entre peticiones)
+    assert results[0]["json"] == results[1]["json"] == results[2]["json"]
@@ -0,0 +1,136 @@
+import json
+import threading
+
+from bots.recommendation_tracker import RecommendationTracker
+
+
+def make_event(i):
+    return {"advertiser_id": f"adv-{i}", "query": "q", "session_id": "s"}
+
+
+class FakeSender:
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.batches = []
+        self.calls = 0
+        self.sent_event = threading.Event()
+
+    def __call__(self, events):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            return False
+        self.batches.append(list(events))
+        self.sent_event.set()
+        return True
+
+
+def test_track_does_not_block_and_sends_in_batches(tmp_path):
+    sender = FakeSender()
+    tracker = RecommendationTracker(
+        sender, tmp_path / "spill.jsonl", batch_size=10, flush_interval=0.05
+    )
+
+    for i in range(25):
+        assert tracker.track(make_event(i)) is True
+    tracker.flush()
+
+    sent = [e["advertiser_id"] for batch in sender.batches for e in batch]
+    assert sent == [f"adv-{i}" for i in range(25)]
+    assert all(len(batch) <= 10 for batch in sender.batches)
+    assert tracker.stats()["sent"] == 25
+    assert tracker.stats()["queue_depth"] == 0
+
+
+def test_full_queue_drops_events():
+    tracker = RecommendationTracker(lambda events: True, "unused.jsonl", max_queue=2)
+    # Sin arrancar el worker, la cola se llena
+    tracker._ensure_worker = lambda: None
+
+    assert tracker.track(make_event(1)) is True
+    assert tracker.track(make_event(2)) is True
+    assert tracker.track(make_event(3)) is False
+
+    stats = tracker.stats()
+    assert stats["dropped"] == 1
+    assert stats["queue_depth"] == 2
+
+
+def test_retries_with_backoff_before_succeeding(tmp_path):
+    sender = FakeSender(fail_times=2)
+    tracker = RecommendationTracker(
+        sender, tmp_path / "spill.jsonl", flush_interval=0.05, backoff_base=0.01
+    )
+
+    tracker.track(make_event(1))
+    assert sender.sent_event.wait(2)
+    tracker.flush()
+
+    assert tracker.stats()["retries"] == 2
+    assert tracker.stats()["spilled"] == 0
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_failed_batches_spill_to_disk_and_replay(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    sender = FakeSender(fail_times=10**6)
+    tracker = RecommendationTracker(
+        sender, spill, flush_interval=0.05, max_retries=1, backoff_base=0.01
+    )
+
+    tracker.track(make_event(1))
+    tracker.track(make_event(2))
+    tracker.flush()
+
+    lines = spill.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["advertiser_id"] for line in lines] == ["adv-1", "adv-2"]
+    assert tracker.stats()["spilled"] == 2
+
+    # La API vuelve: el siguiente envío correcto reenvía lo pendiente
+    sender.fail_times = 0
+    tracker.track(make_event(3))
+    tracker.flush()
+
+    sent = [e["advertiser_id"] for batch in sender.batches for e in batch]
+    assert sent == ["adv-3", "adv-1", "adv-2"]
+    assert tracker.stats()["replayed"] == 2
+    assert not spill.exists()
+
+
+def test_interrupted_replay_is_recovered_at_startup(tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    # Un reenvío anterior murió a medias y además hay pendientes nuevos
+    spill.with_suffix(".replaying").write_text(
+        json.dumps(make_event(1)) + "\n", encoding="utf-8"
+    )
+    spill.write_text(json.dumps(make_event(2)) + "\n", encoding="utf-8")
+
+    sender = FakeSender()
+    tracker = RecommendationTracker(sender, spill, flush_interval=0.05)
+    assert not spill.with_suffix(".replaying").exists()
+
+    tracker.track(make_event(3))
+    tracker.flush()
+
+    sent = sorted(e["advertiser_id"] for batch in sender.batches for e in batch)
+    assert sent == ["adv-1", "adv-2", "adv-3"]
+    assert not spill.exists()
+
+
+def test_failed_replay_keeps_counters_consistent(tmp_path, monkeypatch):
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text(
+        "".join(json.dumps(make_event(i)) + "\n" for i in range(3)),
+        encoding="utf-8",
+    )
+    sender = FakeSender()
+    tracker = RecommendationTracker(sender, spill, batch_size=10)
+
+    # El reenvío falla y tampoco se puede volver a escribir a disco
+    sender.fail_times = 10**6
+    monkeypatch.setattr(tracker, "_write_spill", lambda events: False)
+    tracker._replay_spill()
+
+    stats = tracker.stats()
+    assert stats["spilled"] == 0
+    assert stats["dropped"] == 3
+    assert stats["replayed"] == 0
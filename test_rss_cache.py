@@ -0,0 +1,82 @@
+import json
+
+import bots.rss_manager as rss_module
+from bots.rss_manager import RSSManager
+
+
+class FakeFeed:
+    def __init__(self, names):
+        self.entries = [
+            {"link": f"https://example.com/{name}", "title": f"Article {name}", "summary": "texto"}
+            for name in names
+        ]
+        self.feed = {"title": "Test feed"}
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_legacy_json_cache_is_migrated_without_internal_fields(tmp_path):
+    legacy = [{
+        "url": "https://example.com/a",
+        "title": "A",
+        "description": "desc",
+        "categories": ["legal"],
+        "synced_at": "2024-01-01",
+        "cached_search_text": "a desc legal",
+    }]
+    (tmp_path / "articles.json").write_text(json.dumps(legacy, indent=2), encoding="utf-8")
+
+    manager = RSSManager(cache_dir=tmp_path)
+
+    assert [a["url"] for a in manager.articles] == ["https://example.com/a"]
+    lines = read_lines(tmp_path / "articles.jsonl")
+    assert lines == [{k: v for k, v in legacy[0].items() if k != "cached_search_text"}]
+    # Formato compacto: una línea por artículo, sin indentación
+    assert "\n  " not in (tmp_path / "articles.jsonl").read_text(encoding="utf-8")
+
+
+def test_sync_appends_new_articles_incrementally(tmp_path, monkeypatch):
+    manager = RSSManager(cache_dir=tmp_path)
+    manager.feed_urls = ["https://example.com/feed"]
+
+    monkeypatch.setattr(manager, "_fetch_feed", lambda url: (FakeFeed(["a", "b"]), {}))
+    manager.sync_feeds()
+    monkeypatch.setattr(manager, "_fetch_feed", lambda url: (FakeFeed(["b", "c"]), {}))
+
+    writes = []
+    monkeypatch.setattr(manager, "_write_cache", lambda articles: writes.append(articles))
+    manager.sync_feeds()
+
+    assert writes == []  # sin reescritura completa
+    urls = [a["url"] for a in read_lines(tmp_path / "articles.jsonl")]
+    assert urls == [f"https://example.com/{n}" for n in ("a", "b", "c")]
+
+    reloaded = RSSManager(cache_dir=tmp_path)
+    assert [a["url"] for a in reloaded.articles] == urls
+
+
+def test_retention_cap_compacts_cache_atomically(tmp_path, monkeypatch):
+    monkeypatch.setattr(rss_module, "MAX_CACHED_ARTICLES", 3)
+    manager = RSSManager(cache_dir=tmp_path)
+    manager.feed_urls = ["https://example.com/feed"]
+
+    for batch in (["a", "b"], ["c", "d"]):
+        monkeypatch.setattr(manager, "_fetch_feed", lambda url, b=batch: (FakeFeed(b), {}))
+        manager.sync_feeds()
+
+    lines = read_lines(tmp_path / "articles.jsonl")
+    assert len(lines) == 3
+    assert len(manager.articles) == 3
+    assert len(manager.search_index) == 3
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    cache = tmp_path / "articles.jsonl"
+    cache.write_text('{"url":"https://example.com/a","title":"A"}\n{"url":"https://exa', encoding="utf-8")
+
+    manager = RSSManager(cache_dir=tmp_path)
+
+    assert [a["url"] for a in manager.articles] == ["https://example.com/a"]
@@ -54,10 +54,10 @@ def test_rss_manager():
     print("TEST 5: Verificar caché persistente")
     print("=" * 60)
 
-    cache_file = Path(__file__).parent / "data" / "cache" / "articles.json"
+    cache_file = Path(__file__).parent / "data" / "cache" / "articles.jsonl"
     if cache_file.exists():
         with open(cache_file, 'r', encoding='utf-8') as f:
-            cached = json.load(f)
+            cached = [json.loads(line) for line in f if line.strip()]
         print(f"✅ Caché guardado: {len(cached)} artículos en {cache_file}\n")
     else:
         print(f"⚠️ Caché no encontrado en {cache_file}\n")
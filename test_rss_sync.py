@@ -0,0 +1,97 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bots.rss_manager import RSSManager
+
+RSS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Feed {name}</title>
+<item><title>Article {name}</title><link>https://example.com/{name}</link>
+<description>Salud y hospitales en Barcelona</description></item>
+</channel></rss>"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    delay = 0.0
+
+    def do_GET(self):
+        FeedHandler.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        time.sleep(FeedHandler.delay)
+        etag = f'"{self.path}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = RSS_TEMPLATE.format(name=self.path.strip("/")).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    FeedHandler.requests_seen = []
+    FeedHandler.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_uses_conditional_get_on_second_run(feed_server, tmp_path):
+    manager = RSSManager(cache_dir=tmp_path)
+    manager.feed_urls = [f"{feed_server}/a", f"{feed_server}/b"]
+
+    assert manager.sync_feeds() == 2
+    assert manager.feed_state[f"{feed_server}/a"] == {"etag": '"/a-v1"'}
+
+    # Segunda sync: el servidor responde 304 y no se añade nada
+    version = manager.version
+    assert manager.sync_feeds() == 0
+    assert manager.version == version
+    assert FeedHandler.requests_seen[-2:] in (
+        [("/a", '"/a-v1"'), ("/b", '"/b-v1"')],
+        [("/b", '"/b-v1"'), ("/a", '"/a-v1"')],
+    )
+
+    # El estado persiste entre instancias
+    reloaded = RSSManager(cache_dir=tmp_path)
+    assert reloaded.feed_state == manager.feed_state
+
+
+def test_sync_fetches_feeds_concurrently(feed_server, tmp_path):
+    FeedHandler.delay = 0.3
+    manager = RSSManager(cache_dir=tmp_path)
+    manager.feed_urls = [f"{feed_server}/feed{i}" for i in range(6)]
+
+    started = time.monotonic()
+    assert manager.sync_feeds() == 6
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 6 * FeedHandler.delay * 0.6
+    # Orden de procesado estable: el de feed_urls
+    assert [a["url"] for a in manager.articles] == [
+        f"https://example.com/feed{i}" for i in range(6)
+    ]
+
+
+def test_failing_feed_does_not_stop_sync(feed_server, tmp_path):
+    manager = RSSManager(cache_dir=tmp_path)
+    manager.feed_urls = ["http://127.0.0.1:9/unreachable", f"{feed_server}/ok"]
+
+    assert manager.sync_feeds() == 1
+    assert "http://127.0.0.1:9/unreachable" not in manager.feed_state
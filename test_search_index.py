@@ -0,0 +1,101 @@
+from bots.rss_manager import RSSManager
+from bots.search_index import BM25Index, tokenize
+
+
+def make_article(url, title, description="", categories=None, synced_at="2024-01-01"):
+    return {
+        "url": url,
+        "title": title,
+        "description": description,
+        "categories": categories or [],
+        "synced_at": synced_at,
+    }
+
+
+def test_tokenize_folds_accents_and_case():
+    assert tokenize("Educación en BARCELONA, ¿sí?") == ["educacion", "en", "barcelona", "si"]
+
+
+def test_bm25_ranks_by_relevance_and_prefix():
+    index = BM25Index()
+    index.add("a", "visa", "Visado de estudiante en España")
+    index.add("b", "visa-x2", "Visa y visado: guía de visados")
+    index.add("c", "other", "Restaurantes en Gràcia")
+
+    assert index.search(["visa"], limit=5) == ["visa-x2", "visa"]
+    assert index.search(["gracia"]) == ["other"]
+    assert index.search(["no"]) == []  # palabras cortas ignoradas
+
+
+def test_bm25_ties_keep_insertion_order_and_remove_updates_postings():
+    index = BM25Index()
+    for key in ("a", "b", "c"):
+        index.add(key, key, "salud dental")
+
+    assert index.search(["salud"]) == ["a", "b", "c"]
+
+    index.remove("b")
+    assert index.search(["salud"]) == ["a", "c"]
+    assert len(index) == 2
+
+    index.add("a", "a2", "hospital")
+    assert index.search(["salud"]) == ["c"]
+    assert index.search(["hospital"]) == ["a2"]
+
+
+def test_rss_manager_search_uses_index(tmp_path):
+    manager = RSSManager(cache_dir=tmp_path)
+    for article in (
+        make_article("u1", "Guía de colegios", "Escuelas internacionales", ["education"]),
+        make_article("u2", "Mejores restaurantes", "Comida local", ["food"]),
+    ):
+        manager.articles.append(article)
+        manager._index_article(article)
+
+    results = manager.search_articles(["escuela", "school", "education"], limit=3)
+    assert [a["url"] for a in results] == ["u1"]
+    assert "cached_search_text" not in results[0]
+
+
+def test_sync_feeds_updates_index_incrementally(tmp_path, monkeypatch):
+    class FakeFeed:
+        def __init__(self, entries):
+            self.entries = entries
+            self.feed = {"title": "Test feed"}
+
+    entries = [
+        {"link": f"https://example.com/{i}", "title": f"Hospital news {i}", "summary": "salud"}
+        for i in range(3)
+    ]
+    manager = RSSManager(cache_dir=tmp_path)
+    monkeypatch.setattr(manager, "_fetch_feed", lambda url: (FakeFeed(entries), {}))
+    manager.feed_urls = ["https://example.com/feed"]
+    assert manager.sync_feeds() == 3
+
+    results = manager.search_articles(["hospital"], limit=5)
+    assert len(results) == 3
+    assert len(manager.search_index) == 3
+
+
+def test_category_articles_are_precomputed_and_rebuilt_on_sync(tmp_path, monkeypatch):
+    class FakeFeed:
+        entries = [{"link": "https://example.com/clinic", "title": "New clinic opens", "summary": ""}]
+        feed = {"title": "Test feed"}
+
+    manager = RSSManager(cache_dir=tmp_path)
+    assert manager.get_articles_by_category("Healthcare") == []
+
+    calls = []
+    monkeypatch.setattr(manager.search_index, "search",
+                        lambda *a, **k: calls.append(a) or [])
+    manager.get_articles_by_category("Healthcare", limit=3)
+    assert calls == []  # lectura O(1), sin búsqueda por consulta
+    monkeypatch.undo()
+
+    monkeypatch.setattr(manager, "_fetch_feed", lambda url: (FakeFeed(), {}))
+    manager.feed_urls = ["https://example.com/feed"]
+    manager.sync_feeds()
+
+    results = manager.get_articles_by_category("Healthcare", limit=3)
+    assert [a["url"] for a in results] == ["https://example.com/clinic"]
+    assert manager.get_articles_by_category("Unknown") == []
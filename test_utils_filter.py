@@ -0,0 +1,70 @@
+from bots import utils
+from bots.utils import (
+    AdvertiserSearchProfile,
+    filter_advertisers_by_keywords,
+    get_search_profile,
+    normalize,
+    register_search_profiles,
+)
+
+
+def legacy_filter(pregunta, anunciantes, keywords, search_fields=('nombre', 'descripcion', 'perfil', 'ubicacion')):
+    """Implementación anterior (referencia de comportamiento)."""
+    pregunta_norm = normalize(pregunta or "")
+    matching, others = [], []
+    for a in anunciantes:
+        combined_norm = normalize(' '.join([str(a.get(k, '')) for k in search_fields]))
+        found = any(kw in pregunta_norm or kw in combined_norm for kw in keywords)
+        (matching if found else others).append(a)
+
+    def sponsor_key(item):
+        return 1 if (item.get('es_anunciante') or item.get('sponsored') or item.get('featured')) else 0
+
+    result = matching or others
+    result.sort(key=sponsor_key, reverse=True)
+    return result
+
+
+ADVERTISERS = [
+    {"nombre": "Clínica Dental Sonrisa", "descripcion": "Dentistas en Gràcia", "ubicacion": "Barcelona"},
+    {"nombre": "Escuelas Bilingües", "descripcion": "Colegio internacional", "featured": True},
+    {"nombre": "Gestoría López", "descripcion": "Cuenta bancaria y declaración renta"},
+    {"nombre": "Bar Central", "perfil": "Copas y tapas"},
+]
+
+KEYWORDS = ["dentista", "escuela", "colegio", "cuenta bancaria", "tapas", "clinica"]
+
+
+def test_profile_matches_tokens_substrings_and_phrases():
+    profile = AdvertiserSearchProfile(ADVERTISERS[2])
+
+    assert "gestoria" in profile.tokens
+    assert profile.matches(["gestoria"])          # token exacto
+    assert profile.matches(["declaracion renta"])  # frase
+    assert profile.matches(["banc"])              # subcadena
+    assert not profile.matches(["hotel"])
+
+
+def test_filter_matches_legacy_behaviour():
+    register_search_profiles({"Mixed": ADVERTISERS})
+    questions = ["", "Busco dentista", "quiero algo", "colegios?", "tapas y copas", "ninguna"]
+    for question in questions:
+        for keywords in (KEYWORDS, ["hotel"], ["cuenta bancaria"], ["escuela"]):
+            assert filter_advertisers_by_keywords(question, list(ADVERTISERS), keywords) == \
+                legacy_filter(question, list(ADVERTISERS), keywords)
+
+
+def test_registered_profiles_are_reused_and_checked_by_identity(monkeypatch):
+    register_search_profiles({"Mixed": ADVERTISERS})
+    assert get_search_profile(ADVERTISERS[0]) is get_search_profile(ADVERTISERS[0])
+
+    # Una copia del anunciante no reutiliza el perfil del original
+    copy = dict(ADVERTISERS[0])
+    assert get_search_profile(copy) is not get_search_profile(ADVERTISERS[0])
+
+    calls = []
+    original_normalize = utils.normalize
+    monkeypatch.setattr(utils, "normalize", lambda s: calls.append(s) or original_normalize(s))
+    filter_advertisers_by_keywords("algo", ADVERTISERS, KEYWORDS)
+    # Solo se normaliza la pregunta, no el texto de cada anunciante
+    assert calls == ["algo"]